@@ -0,0 +1,238 @@
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".word_for_spelling_errors.db")
+DEFAULT_LEARNER = "default"
+NEAR_MISS_RATIO = 0.25  # 错的字母不超过单词长度的 1/4（至少 1 个）算“很接近”
+
+
+def near_miss_limit(word):
+    return max(1, round(len(word) * NEAR_MISS_RATIO))
+
+
+def edit_operations(typed, target, band):
+    """
+    带状 Damerau-Levenshtein（相邻交换算一次）对齐，只计算 |i-j| <= band 的格子
+    :return: (距离, [(类型, 目标中的位置, 正确字母, 输入的字母), ...])；距离超过 band 返回 None
+    类型：substitution 写错 / omission 漏写 / insertion 多写 / transposition 顺序颠倒 /
+          undoubled 该双写没双写 / doubled 不该双写却双写
+    """
+    n, m = len(target), len(typed)
+    if abs(n - m) > band:
+        return None
+    inf = band + 1
+    rows = [[inf] * (m + 1) for _ in range(n + 1)]
+    for j in range(min(m, band) + 1):
+        rows[0][j] = j
+    for i in range(1, n + 1):
+        prev, cur, ti = rows[i - 1], rows[i], target[i - 1]
+        if i <= band:
+            cur[0] = i
+        lo, hi = max(1, i - band), min(m, i + band)
+        for j in range(lo, hi + 1):
+            tj = typed[j - 1]
+            d = prev[j - 1] + (ti != tj)
+            if prev[j] + 1 < d:
+                d = prev[j] + 1
+            if cur[j - 1] + 1 < d:
+                d = cur[j - 1] + 1
+            if i > 1 and j > 1 and ti == typed[j - 2] and target[i - 2] == tj and ti != tj and rows[i - 2][j - 2] + 1 < d:
+                d = rows[i - 2][j - 2] + 1
+            cur[j] = d
+        if min(cur[max(0, lo - 1):hi + 1]) > band:
+            return None  # 这一行已经全部超出，后面只会更大
+    distance = rows[n][m]
+    if distance > band:
+        return None
+
+    ops = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        d = rows[i][j]
+        if (i > 1 and j > 1 and target[i - 1] == typed[j - 2] and target[i - 2] == typed[j - 1]
+                and target[i - 1] != typed[j - 1] and d == rows[i - 2][j - 2] + 1):
+            ops.append(("transposition", i - 2, target[i - 2:i], typed[j - 2:j]))
+            i, j = i - 2, j - 2
+        elif i > 0 and j > 0 and d == rows[i - 1][j - 1] + (target[i - 1] != typed[j - 1]):
+            if target[i - 1] != typed[j - 1]:
+                ops.append(("substitution", i - 1, target[i - 1], typed[j - 1]))
+            i, j = i - 1, j - 1
+        elif i > 0 and d == rows[i - 1][j] + 1:
+            letter = target[i - 1]
+            doubled = (i > 1 and target[i - 2] == letter) or (i < n and target[i] == letter)
+            ops.append(("undoubled" if doubled else "omission", i - 1, letter, ""))
+            i -= 1
+        else:
+            letter = typed[j - 1]
+            doubled = (j > 1 and typed[j - 2] == letter) or (j < m and typed[j] == letter)
+            ops.append(("doubled" if doubled else "insertion", i, "", letter))
+            j -= 1
+    ops.reverse()
+    return distance, ops
+
+
+def analyze_answer(answer, word):
+    """
+    分析一次作答（不区分大小写）
+    :return: {"kind": "correct" / "near" / "miss", "distance": 编辑距离（miss 时为 None）, "errors": [...]}
+    """
+    typed, target = answer.strip().lower(), word.lower()
+    if typed == target:
+        return {"kind": "correct", "distance": 0, "errors": []}
+    result = edit_operations(typed, target, near_miss_limit(target))
+    if result is None:
+        return {"kind": "miss", "distance": None, "errors": []}
+    distance, errors = result
+    return {"kind": "near", "distance": distance, "errors": errors}
+
+
+def describe_errors(analysis):
+    """把错误列表写成一句提示，例如：第5个字母 m 应该双写"""
+    parts = []
+    for kind, pos, expected, typed in analysis["errors"]:
+        if kind == "substitution":
+            parts.append(f"第{pos+1}个字母 {expected} 写成了 {typed}")
+        elif kind == "transposition":
+            parts.append(f"第{pos+1}-{pos+2}个字母 {expected} 写成了 {typed}（顺序颠倒）")
+        elif kind == "omission":
+            parts.append(f"漏了第{pos+1}个字母 {expected}")
+        elif kind == "undoubled":
+            parts.append(f"第{pos+1}个字母 {expected} 应该双写")
+        elif kind == "doubled":
+            parts.append(f"{typed} 不用双写")
+        else:
+            parts.append(f"多了字母 {typed}")
+    return "，".join(parts)
+
+
+class ConfusionIndex:
+    """
+    持久化的错误统计（按学习者区分），存的是累计次数而不是每次作答，
+    作答再多查询也只扫几百行：
+    - confusions：(正确字母, 输入的字母, 错误类型) → 次数
+    - letters：每个字母 出现次数 / 写错次数
+    - words：每个单词 作答次数 / 答对 / 很接近 / 完全错
+    写入先在内存累加，每 flush_every 次作答批量写一次，查询前和关闭时也会写入
+    """
+    def __init__(self, db_path=DEFAULT_DB_PATH, learner=DEFAULT_LEARNER, flush_every=50):
+        self.learner = learner
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._confusions = Counter()
+        self._letters = Counter()
+        self._words = Counter()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS confusions (
+                    learner TEXT NOT NULL, expected TEXT NOT NULL, typed TEXT NOT NULL, kind TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (learner, expected, typed, kind)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS letters (
+                    learner TEXT NOT NULL, letter TEXT NOT NULL,
+                    seen INTEGER NOT NULL, wrong INTEGER NOT NULL,
+                    PRIMARY KEY (learner, letter)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS words (
+                    learner TEXT NOT NULL, word TEXT NOT NULL,
+                    attempts INTEGER NOT NULL, correct INTEGER NOT NULL, near INTEGER NOT NULL, miss INTEGER NOT NULL,
+                    PRIMARY KEY (learner, word)
+                ) WITHOUT ROWID
+            """)
+
+    def record(self, word, analysis):
+        word = word.lower()
+        kind = analysis["kind"]
+        with self._lock:
+            self._words[(word, "attempts")] += 1
+            self._words[(word, kind)] += 1
+            for letter in word:
+                self._letters[(letter, "seen")] += 1
+            for error_kind, pos, expected, typed in analysis["errors"]:
+                self._confusions[(expected, typed, error_kind)] += 1
+                for letter in expected:
+                    self._letters[(letter, "wrong")] += 1
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        words = {}
+        for (word, field), count in self._words.items():
+            words.setdefault(word, Counter())[field] += count
+        letters = {}
+        for (letter, field), count in self._letters.items():
+            letters.setdefault(letter, Counter())[field] += count
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO confusions (learner, expected, typed, kind, count) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(learner, expected, typed, kind) DO UPDATE SET count = count + excluded.count
+            """, [(self.learner, expected, typed, kind, count)
+                  for (expected, typed, kind), count in self._confusions.items()])
+            self.conn.executemany("""
+                INSERT INTO letters (learner, letter, seen, wrong) VALUES (?, ?, ?, ?)
+                ON CONFLICT(learner, letter) DO UPDATE SET seen = seen + excluded.seen, wrong = wrong + excluded.wrong
+            """, [(self.learner, letter, c["seen"], c["wrong"]) for letter, c in letters.items()])
+            self.conn.executemany("""
+                INSERT INTO words (learner, word, attempts, correct, near, miss) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(learner, word) DO UPDATE SET
+                    attempts = attempts + excluded.attempts, correct = correct + excluded.correct,
+                    near = near + excluded.near, miss = miss + excluded.miss
+            """, [(self.learner, word, c["attempts"], c["correct"], c["near"], c["miss"]) for word, c in words.items()])
+        self._confusions.clear()
+        self._letters.clear()
+        self._words.clear()
+        self._pending = 0
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def top_confusions(self, limit=10):
+        """最常见的错误：[(正确字母, 输入的字母, 类型, 次数), ...]"""
+        with self._lock:
+            self._flush_locked()
+            return self.conn.execute("""
+                SELECT expected, typed, kind, count FROM confusions WHERE learner = ?
+                ORDER BY count DESC LIMIT ?
+            """, (self.learner, limit)).fetchall()
+
+    def kind_counts(self):
+        """各类错误的次数：{类型: 次数}"""
+        with self._lock:
+            self._flush_locked()
+            return dict(self.conn.execute(
+                "SELECT kind, SUM(count) FROM confusions WHERE learner = ? GROUP BY kind", (self.learner,)))
+
+    def letter_error_rates(self, min_seen=20, limit=10):
+        """最容易写错的字母：[(字母, 写错率, 出现次数), ...]"""
+        with self._lock:
+            self._flush_locked()
+            return self.conn.execute("""
+                SELECT letter, CAST(wrong AS REAL) / seen AS rate, seen FROM letters
+                WHERE learner = ? AND seen >= ? ORDER BY rate DESC LIMIT ?
+            """, (self.learner, min_seen, limit)).fetchall()
+
+    def hardest_words(self, limit=10):
+        """答错最多的单词：[(单词, 作答次数, 答对, 很接近, 完全错), ...]"""
+        with self._lock:
+            self._flush_locked()
+            return self.conn.execute("""
+                SELECT word, attempts, correct, near, miss FROM words WHERE learner = ?
+                ORDER BY attempts - correct DESC, attempts DESC LIMIT ?
+            """, (self.learner, limit)).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self.conn.close()
@@ -0,0 +1,119 @@
+import os
+import mmap
+import hashlib
+import threading
+from collections import OrderedDict
+import zip_source
+
+OUTPUT_RATE = 24000     # 统一输出采样率（gTTS 原生采样率，无需重采样）
+OUTPUT_CHANNELS = 1     # 统一单声道
+SAMPLE_WIDTH = 2        # int16
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def decode_pcm(source, sample_rate=OUTPUT_RATE, channels=OUTPUT_CHANNELS):
+    """把音频（文件路径或文件对象）解码并重采样成连续的 int16 交错PCM字节"""
+    import av  # 延迟导入：第一次解码时才加载，程序启动时先显示界面
+    container = av.open(source)
+    resampler = av.AudioResampler(format="s16", layout="mono" if channels == 1 else "stereo", rate=sample_rate)
+    chunks = []
+    try:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                chunks.append(out.to_ndarray().tobytes())
+        for out in resampler.resample(None):
+            chunks.append(out.to_ndarray().tobytes())
+    finally:
+        container.close()
+    return b"".join(chunks)
+
+
+class PcmBank:
+    """
+    解码后的PCM缓存：每个音频只解码一次，重播时直接把缓冲区写给声卡
+    - 所有音频统一为 sample_rate / channels / int16，输出流参数固定
+    - 超过 max_bytes 按最近使用（LRU）淘汰
+    - 指定 mmap_dir 时，PCM 写到磁盘并内存映射，重启后不用重新解码
+    """
+    def __init__(self, sample_rate=OUTPUT_RATE, channels=OUTPUT_CHANNELS, max_bytes=DEFAULT_MAX_BYTES, mmap_dir=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.max_bytes = max_bytes
+        self.mmap_dir = mmap_dir
+        self.total_bytes = 0
+        self._buffers = OrderedDict()
+        self._lock = threading.Lock()
+        if mmap_dir:
+            os.makedirs(mmap_dir, exist_ok=True)
+
+    @property
+    def bytes_per_frame(self):
+        return SAMPLE_WIDTH * self.channels
+
+    def _cache_key(self, path):
+        return zip_source.stat_key(path)
+
+    def _decode(self, path):
+        # 压缩包成员也直接交给解码器，不解压到磁盘
+        with zip_source.open_audio(path) as f:
+            return decode_pcm(f, self.sample_rate, self.channels)
+
+    def _load(self, path, key):
+        if not self.mmap_dir:
+            return self._decode(path)
+        name = hashlib.sha1(repr((key, self.sample_rate, self.channels)).encode("utf-8")).hexdigest() + ".pcm"
+        pcm_path = os.path.join(self.mmap_dir, name)
+        if not os.path.exists(pcm_path):
+            tmp_path = f"{pcm_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(self._decode(path))
+            os.replace(tmp_path, pcm_path)
+        if os.path.getsize(pcm_path) == 0:
+            return b""
+        with open(pcm_path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, path):
+        """取出 path 的PCM（bytes 或 mmap），未缓存时当场解码"""
+        key = self._cache_key(path)
+        with self._lock:
+            pcm = self._buffers.get(key)
+            if pcm is not None:
+                self._buffers.move_to_end(key)
+                return pcm
+        pcm = self._load(path, key)
+        with self._lock:
+            if key not in self._buffers:
+                self._buffers[key] = pcm
+                self.total_bytes += len(pcm)
+                self._evict_locked(keep=key)
+            return self._buffers[key]
+
+    def contains(self, path):
+        try:
+            key = self._cache_key(path)
+        except (OSError, KeyError):
+            return False
+        with self._lock:
+            return key in self._buffers
+
+    def preload(self, paths):
+        """预先解码一批音频（在后台线程调用），出错的文件跳过，播放时再报错"""
+        for path in paths:
+            try:
+                self.get(path)
+            except Exception:
+                pass
+
+    def _evict_locked(self, keep):
+        while self.total_bytes > self.max_bytes and len(self._buffers) > 1:
+            key = next(iter(self._buffers))
+            if key == keep:
+                self._buffers.move_to_end(key)
+                continue
+            self.total_bytes -= len(self._buffers.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._buffers.clear()
+            self.total_bytes = 0
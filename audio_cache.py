@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".word_for_spelling_cache")
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 默认缓存上限 2GB
+
+
+def normalize_word(word):
+    """缓存键用的单词规范化：去首尾空格、合并连续空白、统一小写"""
+    return " ".join(word.split()).casefold()
+
+
+class AudioCache:
+    """
+    本地音频缓存，多个单词表文件夹、多个TTS后端共用
+    - 键：(规范化单词, 后端, 语言/口音, 语速) 的 sha1
+    - 文件：<root>/objects/<键前两位>/<键>.mp3
+    - 索引：<root>/manifest.json，记录每个键的单词、参数、大小、最近使用时间
+    - 超过 max_bytes 时按最近使用时间（LRU）淘汰
+    """
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self._lock = threading.Lock()
+        self._dirty = False
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self.entries = self._load_manifest()
+        self.total_bytes = sum(e["size"] for e in self.entries.values())
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            print(f"警告：缓存索引 {self.manifest_path} 损坏，将重新建立")
+            return {}
+        # 丢弃文件已被手动删除的条目
+        return {k: e for k, e in entries.items() if os.path.exists(self._object_path(k))}
+
+    @staticmethod
+    def make_key(word, backend, lang, speed):
+        raw = "\x1f".join([normalize_word(word), backend, str(lang), str(speed)])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _object_path(self, key):
+        return os.path.join(self.root, "objects", key[:2], key + ".mp3")
+
+    def lookup(self, key):
+        """命中返回缓存文件路径（并刷新最近使用时间），未命中返回 None"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            path = self._object_path(key)
+            if not os.path.exists(path):
+                self.total_bytes -= entry["size"]
+                del self.entries[key]
+                self._dirty = True
+                return None
+            entry["last_used"] = time.time()
+            self._dirty = True
+            return path
+
+    def materialize(self, key, dest_path):
+        """
+        把缓存中的音频放到目标文件夹：优先硬链接（不占额外空间），跨磁盘时退回复制
+        :return: 是否命中缓存
+        """
+        path = self.lookup(key)
+        if path is None:
+            return False
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        try:
+            os.link(path, dest_path)
+        except OSError:
+            shutil.copyfile(path, dest_path)
+        return True
+
+    def store(self, key, src_path, word="", backend="", lang="", speed=""):
+        """把新下载的文件复制进缓存（先写临时文件再原子替换）"""
+        path = self._object_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            old = self.entries.get(key)
+            if old is not None:
+                self.total_bytes -= old["size"]
+            self.entries[key] = {
+                "word": word,
+                "backend": backend,
+                "lang": lang,
+                "speed": speed,
+                "size": size,
+                "last_used": time.time(),
+            }
+            self.total_bytes += size
+            self._dirty = True
+            self._evict_locked()
+
+    def _evict_locked(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key in sorted(self.entries, key=lambda k: self.entries[k]["last_used"]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            entry = self.entries.pop(key)
+            self.total_bytes -= entry["size"]
+            try:
+                os.remove(self._object_path(key))
+            except OSError:
+                pass
+
+    def save(self):
+        """写回索引（先写临时文件再原子替换，避免中途退出损坏索引）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.manifest_path)
+            self._dirty = False
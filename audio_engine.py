@@ -0,0 +1,324 @@
+import io
+import os
+import sys
+import time
+import threading
+import importlib.util
+from audio_bank import PcmBank
+from audio_output import AudioOutput, FileSink, DEFAULT_FRAMES_PER_BUFFER
+from zip_source import read_audio
+from telemetry import Telemetry
+
+# 强制指定播放后端：pcm / pygame / null / file[:输出wav路径]（无声卡环境测试用）
+AUDIO_BACKEND_ENV = "SPELLING_AUDIO_BACKEND"
+
+
+class AudioEngine:
+    """
+    播放后端的统一接口，两个界面都只通过它播放
+    - open() 第一次播放前导入模块、打开设备（启动时不做，先显示界面）
+    - load(path) 把音频准备成可以直接播放的数据，预取线程调用
+    - play_file() 播放；已预取或加载很快的直接播放，否则在后台加载，期间有新的播放/停止就丢弃
+    - capabilities() 报告延迟、支持的格式、是否值得预加载，用来挑选最快的后端
+    - 停止、加载、开始播放、第一个缓冲送出等阶段的耗时记进 telemetry（界面可以换成自己的 Telemetry 共用）
+    """
+    name = "base"
+    modules = []              # 需要的第三方模块（检查是否可用、启动后预导入）
+    formats = ()
+    preload = False           # load() 的结果能否提前准备好，减少播放时的等待
+    headless = False          # 不需要声卡
+    expected_latency = None   # 估计的起播延迟（秒），None 表示不参与自动选择
+
+    def __init__(self, on_error=None, frames_per_buffer=DEFAULT_FRAMES_PER_BUFFER):
+        self.on_error = on_error or (lambda message: None)
+        self.frames_per_buffer = frames_per_buffer
+        self.last_start_latency = None  # 最近一次播放从调用到声音开始输出的耗时（秒）
+        self.telemetry = Telemetry()
+        self._generation = 0  # 每次播放/停止加一，丢弃过期的后台加载结果
+
+    @classmethod
+    def available(cls):
+        """所需模块都已安装（只查找不导入，不拖慢启动）"""
+        return all(importlib.util.find_spec(module) is not None for module in cls.modules)
+
+    def capabilities(self):
+        return {
+            "name": self.name,
+            "latency": self.latency(),
+            "formats": list(self.formats),
+            "preload": self.preload,
+            "headless": self.headless,
+        }
+
+    def latency(self):
+        """实际测到的起播延迟，还没播放过时返回估计值"""
+        if self.last_start_latency is not None:
+            return self.last_start_latency
+        return self.expected_latency
+
+    def open(self):
+        pass
+
+    def load(self, path):
+        raise NotImplementedError
+
+    def is_ready(self, path):
+        """path 能否不等待直接播放（已缓存或加载本身很快）"""
+        return True
+
+    def play(self, prepared, path):
+        raise NotImplementedError
+
+    @property
+    def is_playing(self):
+        return False
+
+    def play_file(self, path, prepared=None):
+        """打断当前播放，开始播放 path；prepared 是预取线程 load() 的结果"""
+        self._generation += 1
+        if prepared is None and self.is_ready(path):
+            with self.telemetry.span("audio.load"):
+                prepared = self.load(path)
+        if prepared is not None:
+            self.play(prepared, path)
+        else:
+            threading.Thread(target=self._play_later, args=(path, self._generation), daemon=True).start()
+
+    def _play_later(self, path, generation):
+        try:
+            with self.telemetry.span("audio.load"):
+                prepared = self.load(path)
+            if generation == self._generation:
+                self.play(prepared, path)
+        except Exception as e:
+            self.on_error(f"❌ 播放错误: {str(e)}")
+
+    def stop(self):
+        self._generation += 1
+        with self.telemetry.span("audio.stop"):
+            self._stop_output()
+
+    def _stop_output(self):
+        pass
+
+    def close(self):
+        self.stop()
+
+
+class PygameEngine(AudioEngine):
+    """pygame.mixer.music 播放，每次播放都要重新解码，音频先整段读进内存"""
+    name = "pygame"
+    modules = ["pygame"]
+    formats = ("mp3", "ogg", "wav", "flac")
+    preload = True
+    expected_latency = 0.1
+
+    def __init__(self, on_error=None, frames_per_buffer=DEFAULT_FRAMES_PER_BUFFER):
+        super().__init__(on_error, frames_per_buffer)
+        self.mixer = None
+        self._buffer = None  # 正在播放的内存音频，播放期间必须保持引用
+
+    def open(self):
+        if self.mixer is None:
+            with self.telemetry.span("audio.open"):
+                import pygame
+                pygame.mixer.init(buffer=self.frames_per_buffer)
+                self.mixer = pygame.mixer
+
+    def load(self, path):
+        return read_audio(path)
+
+    def play(self, data, path):
+        started = time.perf_counter()
+        self._buffer = io.BytesIO(data)
+        with self.telemetry.span("audio.mixer_load"):
+            self.mixer.music.load(self._buffer, os.path.splitext(path)[1][1:].lower())
+        with self.telemetry.span("audio.play"):
+            self.mixer.music.play()
+        self.last_start_latency = time.perf_counter() - started
+        self.telemetry.end_pending()
+
+    @property
+    def is_playing(self):
+        return self.mixer is not None and self.mixer.music.get_busy()
+
+    def _stop_output(self):
+        if self.mixer is not None:
+            self.mixer.music.stop()
+
+    def close(self):
+        self.stop()
+        if self.mixer is not None:
+            self.mixer.quit()
+            self.mixer = None
+
+
+class PcmEngine(AudioEngine):
+    """av 解码成PCM缓存 + pyaudio 常驻输出流，重播和切换单词几乎没有延迟"""
+    name = "pcm"
+    modules = ["av", "numpy", "pyaudio"]
+    formats = ("mp3", "wav", "ogg", "flac", "m4a", "aac", "opus")
+    preload = True
+    expected_latency = 0.03
+
+    def __init__(self, on_error=None, frames_per_buffer=DEFAULT_FRAMES_PER_BUFFER, bank=None):
+        super().__init__(on_error, frames_per_buffer)
+        self.bank = bank or PcmBank()  # 解码后的PCM缓存，每个单词只解码一次
+        self.output = None
+
+    def _create_output(self):
+        return AudioOutput(self.bank.sample_rate, self.bank.channels, frames_per_buffer=self.frames_per_buffer)
+
+    def open(self):
+        if self.output is None:
+            with self.telemetry.span("audio.open"):
+                self.output = self._create_output()
+            self.output.on_start = self._on_output_start
+
+    def _on_output_start(self, latency):
+        """输出流回调线程里调用：新内容的第一个缓冲已经送进声卡"""
+        self.telemetry.record("audio.first_buffer", latency)
+        self.telemetry.end_pending()
+
+    @property
+    def last_start_latency(self):
+        return self.output.last_start_latency if self.output is not None else None
+
+    @last_start_latency.setter
+    def last_start_latency(self, value):
+        pass  # 由输出流的回调测量
+
+    def latency(self):
+        if self.output is None:
+            return self.expected_latency
+        start = self.output.last_start_latency
+        if start is None:
+            start = self.frames_per_buffer / self.bank.sample_rate
+        return start + self.output.output_latency
+
+    def load(self, path):
+        return self.bank.get(path)
+
+    def is_ready(self, path):
+        return self.bank.contains(path)
+
+    def play(self, pcm, path):
+        # 直接替换正在播放的内容，不需要先等旧的播放结束
+        with self.telemetry.span("audio.play"):
+            self.output.play(pcm)
+
+    @property
+    def is_playing(self):
+        return self.output is not None and self.output.is_playing
+
+    def _stop_output(self):
+        if self.output is not None:
+            self.output.stop()
+
+    def close(self):
+        self.stop()
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+
+
+class FileSinkEngine(PcmEngine):
+    """和 pcm 后端一样解码，但按真实速度输出到 WAV 文件（或丢弃），无声卡也能测延迟"""
+    name = "file"
+    modules = ["av", "numpy"]
+    headless = True
+    expected_latency = None
+
+    def __init__(self, on_error=None, frames_per_buffer=DEFAULT_FRAMES_PER_BUFFER, bank=None, path=None):
+        super().__init__(on_error, frames_per_buffer, bank)
+        self.path = path
+
+    def _create_output(self):
+        return FileSink(self.bank.sample_rate, self.bank.channels, frames_per_buffer=self.frames_per_buffer, path=self.path)
+
+
+class NullEngine(AudioEngine):
+    """不出声：只读取音频数据，记录播放了什么（没有可用后端时兜底）"""
+    name = "null"
+    headless = True
+
+    def __init__(self, on_error=None, frames_per_buffer=DEFAULT_FRAMES_PER_BUFFER):
+        super().__init__(on_error, frames_per_buffer)
+        self.played = []
+
+    def load(self, path):
+        return read_audio(path)
+
+    def play(self, data, path):
+        self.last_start_latency = 0.0
+        self.played.append(path)
+        self.telemetry.end_pending()
+
+
+ENGINES = {
+    "pcm": PcmEngine,
+    "pygame": PygameEngine,
+    "file": FileSinkEngine,
+    "null": NullEngine,
+}
+
+
+def available_engines():
+    """当前环境能用的后端，按估计延迟从低到高"""
+    candidates = [cls for cls in ENGINES.values() if cls.expected_latency is not None and cls.available()]
+    return sorted(candidates, key=lambda cls: cls.expected_latency)
+
+
+def create_engine(preferred=None, on_error=None, frames_per_buffer=DEFAULT_FRAMES_PER_BUFFER):
+    """
+    创建播放后端：环境变量 > preferred > 可用后端中延迟最低的 > null
+    :param preferred: 后端名称，"file" 可写成 "file:输出.wav"；写错时提示一下，改为自动选择
+    """
+    choice = os.environ.get(AUDIO_BACKEND_ENV) or preferred
+    name, _, arg = (choice or "").partition(":")
+    if name == "file":
+        return FileSinkEngine(on_error, frames_per_buffer, path=arg or None)
+    if name in ENGINES:
+        return ENGINES[name](on_error, frames_per_buffer)
+    if name:
+        (on_error or print)(f"⚠️ 未知的音频后端: {name}（可选 {', '.join(ENGINES)}），改为自动选择")
+    candidates = available_engines()
+    engine_cls = candidates[0] if candidates else NullEngine
+    return engine_cls(on_error, frames_per_buffer)
+
+
+def measure_start_latency(engine, paths, timeout=2.0):
+    """
+    依次播放 paths（先 load 好，不计解码时间），返回每次从 play_file 到声音开始输出的耗时（秒）
+    配合 file / null 后端可以在没有声卡的机器上测
+    """
+    engine.open()
+    latencies = []
+    for path in paths:
+        prepared = engine.load(path)
+        engine.stop()
+        engine.last_start_latency = None
+        engine.play_file(path, prepared)
+        deadline = time.perf_counter() + timeout
+        while engine.last_start_latency is None and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        if engine.last_start_latency is not None:
+            latencies.append(engine.last_start_latency)
+    engine.stop()
+    return latencies
+
+
+if __name__ == "__main__":
+    # 用法: python audio_engine.py [音频文件...]  列出可用后端；给了文件就测起播延迟
+    # 无声卡时: SPELLING_AUDIO_BACKEND=file python audio_engine.py a.mp3 b.mp3
+    print("可用后端：" + (", ".join(cls.name for cls in available_engines()) or "无"))
+    engine = create_engine()
+    try:
+        engine.open()
+        print(f"使用后端：{engine.capabilities()}")
+        if len(sys.argv) > 1:
+            latencies = sorted(measure_start_latency(engine, sys.argv[1:]))
+            if latencies:
+                print(f"起播延迟：最快 {latencies[0]*1000:.1f}ms，中位数 {latencies[len(latencies)//2]*1000:.1f}ms，最慢 {latencies[-1]*1000:.1f}ms")
+    finally:
+        engine.close()
@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import audio_split
+from audio_cache import DEFAULT_CACHE_DIR
+
+DEFAULT_PROCESSED_DIR = os.path.join(DEFAULT_CACHE_DIR, "processed")
+TARGET_RMS = 0.1        # 有声部分的目标响度（约 -20 dBFS）
+PEAK_LIMIT = 0.95       # 放大后峰值不超过这个值，避免削波
+DEFAULT_BIT_RATE = 32000
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def trim_silence(samples, sample_rate=audio_split.SAMPLE_RATE, frame_ms=10, threshold_ratio=0.05,
+                 lead_pad_ms=30, tail_pad_ms=80):
+    """
+    去掉开头和结尾的静音，前面只留很短一点，单词一播放就能听到
+    :return: (裁剪后的数组, 开头去掉的毫秒数)；整段都是静音时原样返回
+    """
+    rms, hop = audio_split.frame_rms(samples, sample_rate, frame_ms)
+    if len(rms) == 0 or rms.max() <= 0:
+        return samples, 0
+    voiced = np.flatnonzero(rms > rms.max() * threshold_ratio)
+    begin = max(0, voiced[0] * hop - int(sample_rate * lead_pad_ms / 1000))
+    end = min(len(samples), (voiced[-1] + 1) * hop + int(sample_rate * tail_pad_ms / 1000))
+    return samples[begin:end], int(begin * 1000 / sample_rate)
+
+
+def normalize_loudness(samples, sample_rate=audio_split.SAMPLE_RATE, target_rms=TARGET_RMS, peak_limit=PEAK_LIMIT):
+    """
+    按有声部分的 RMS 统一响度，峰值受 peak_limit 限制
+    :return: (调整后的数组, 增益dB)
+    """
+    rms, _ = audio_split.frame_rms(samples, sample_rate)
+    voiced = rms[rms > rms.max() * 0.05] if len(rms) and rms.max() > 0 else rms
+    level = float(np.sqrt((voiced ** 2).mean())) if len(voiced) else 0.0
+    peak = float(np.abs(samples).max()) if len(samples) else 0.0
+    if level <= 0 or peak <= 0:
+        return samples, 0.0
+    gain = min(target_rms / level, peak_limit / peak)
+    return samples * gain, round(20 * float(np.log10(gain)), 2)
+
+
+def process_audio(src_path, out_path, bit_rate=DEFAULT_BIT_RATE, target_rms=TARGET_RMS):
+    """
+    进程池里执行：解码 → 去首尾静音 → 统一响度 → 重新编码成单声道低码率 MP3
+    :return: 统计信息 dict
+    """
+    samples = audio_split.decode_mono(src_path)
+    if len(samples) == 0:
+        raise Exception("解码后没有声音")
+    trimmed, lead_ms = trim_silence(samples)
+    normalized, gain_db = normalize_loudness(trimmed, target_rms=target_rms)
+    audio_split.encode_mp3(normalized, out_path, bit_rate=bit_rate)
+    return {
+        "trimmed_ms": int((len(samples) - len(trimmed)) * 1000 / audio_split.SAMPLE_RATE),
+        "lead_ms": lead_ms,
+        "gain_db": gain_db,
+    }
+
+
+class AudioProcessor:
+    """
+    下载后的音频处理：去首尾静音、统一响度、转成低码率单声道 MP3，直接替换原文件
+    - 按CPU核数开进程池并行处理（解码/编码是CPU密集的）
+    - 按 (源文件sha1, 处理参数) 缓存结果：<root>/objects/<前两位>/<sha1>.mp3，
+      同一个源文件（其他单词表下载过的同一单词）直接链接/复制，不再处理
+    - 记录处理后文件的 sha1，已经处理过的文件再次运行时直接跳过
+    """
+    def __init__(self, root=DEFAULT_PROCESSED_DIR, workers=None, bit_rate=DEFAULT_BIT_RATE, target_rms=TARGET_RMS):
+        self.root = root
+        self.workers = workers or os.cpu_count() or 1
+        self.bit_rate = bit_rate
+        self.target_rms = target_rms
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        manifest = self._load_manifest()
+        self.sources = manifest.get("sources", {})  # 源文件键 → 处理后文件的sha1
+        self.outputs = set(manifest.get("outputs", []))  # 处理后文件的sha1
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print(f"警告：处理缓存索引 {self.manifest_path} 损坏，将重新建立")
+            return {}
+
+    def _source_key(self, digest):
+        return hashlib.sha1(f"{digest}\x1f{self.bit_rate}\x1f{self.target_rms}".encode("utf-8")).hexdigest()
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest + ".mp3")
+
+    @staticmethod
+    def _link_or_copy(src, dest):
+        tmp_path = dest + ".part"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+
+    def run(self, paths):
+        """
+        处理一批文件（已处理过的跳过）
+        :return: {"processed": 处理数, "cached": 缓存命中数, "skipped": 已处理跳过数,
+                  "failed": 失败数, "bytes_before": ..., "bytes_after": ...}
+        """
+        stats = {"processed": 0, "cached": 0, "skipped": 0, "failed": 0, "bytes_before": 0, "bytes_after": 0}
+        jobs = {}
+        for path in dict.fromkeys(paths):
+            if not os.path.exists(path):
+                continue
+            digest = file_sha1(path)
+            if digest in self.outputs:
+                stats["skipped"] += 1
+                continue
+            key = self._source_key(digest)
+            stats["bytes_before"] += os.path.getsize(path)
+            cached = self.sources.get(key)
+            if cached is not None and os.path.exists(self._object_path(cached)):
+                self._link_or_copy(self._object_path(cached), path)
+                stats["cached"] += 1
+                stats["bytes_after"] += os.path.getsize(path)
+                continue
+            jobs[path] = key
+
+        if jobs:
+            print(f"处理音频：{len(jobs)} 个文件（{self.workers}进程）...")
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as executor:
+                futures = {
+                    executor.submit(process_audio, path, path + ".processing", self.bit_rate, self.target_rms): path
+                    for path in jobs
+                }
+                for future in as_completed(futures):
+                    path = futures[future]
+                    out_path = path + ".processing"
+                    try:
+                        info = future.result()
+                    except Exception as e:
+                        stats["failed"] += 1
+                        stats["bytes_after"] += os.path.getsize(path)
+                        print(f"处理失败，保留原文件：{os.path.basename(path)}（{str(e)}）")
+                        if os.path.exists(out_path):
+                            os.remove(out_path)
+                        continue
+                    digest = file_sha1(out_path)
+                    object_path = self._object_path(digest)
+                    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                    if not os.path.exists(object_path):
+                        self._link_or_copy(out_path, object_path)
+                    os.replace(out_path, path)
+                    with self._lock:
+                        self.sources[jobs[path]] = digest
+                        self.outputs.add(digest)
+                    stats["processed"] += 1
+                    stats["bytes_after"] += os.path.getsize(path)
+                    print(f"已处理：{os.path.basename(path)}（去掉静音 {info['trimmed_ms']}ms，"
+                          f"开头 {info['lead_ms']}ms，增益 {info['gain_db']:+.1f}dB）")
+        self.save()
+        if stats["bytes_before"]:
+            print(f"音频处理完成：处理 {stats['processed']}，缓存命中 {stats['cached']}，已处理跳过 {stats['skipped']}，"
+                  f"失败 {stats['failed']}；{stats['bytes_before'] // 1024}KB → {stats['bytes_after'] // 1024}KB")
+        return stats
+
+    def save(self):
+        """原子写入索引"""
+        with self._lock:
+            data = {"sources": self.sources, "outputs": sorted(self.outputs)}
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.manifest_path)
+
+
+if __name__ == "__main__":
+    # 处理已经下载好的文件夹：python audio_normalize.py gtts_mp3 [更多文件夹...]
+    parser = argparse.ArgumentParser(description="去掉单词音频首尾静音、统一响度、转成低码率MP3")
+    parser.add_argument("folders", nargs="+", help="包含MP3的文件夹")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认CPU核数）")
+    parser.add_argument("--bit-rate", type=int, default=DEFAULT_BIT_RATE, help="输出码率（默认 32000）")
+    args = parser.parse_args()
+
+    processor = AudioProcessor(workers=args.workers, bit_rate=args.bit_rate)
+    paths = []
+    for folder in args.folders:
+        if not os.path.isdir(folder):
+            print(f"错误：文件夹 {folder} 不存在！")
+            sys.exit(1)
+        paths += [os.path.join(folder, name) for name in sorted(os.listdir(folder)) if name.lower().endswith(".mp3")]
+    processor.run(paths)
@@ -0,0 +1,149 @@
+import time
+import threading
+from collections import deque
+
+DEFAULT_FRAMES_PER_BUFFER = 512  # 越小首个声音越快出来，太小在慢机器上可能爆音
+
+
+class AudioOutput:
+    """
+    常驻的音频输出流：程序启动时打开一次，之后每次播放只是把PCM交给回调
+    - play() 立即替换正在播放的内容（打断不需要等待线程、不需要 sleep）
+    - enqueue() 排在当前内容后面播放
+    - 回调里没有数据时输出静音，流一直保持打开
+    """
+    def __init__(self, sample_rate, channels=1, frames_per_buffer=DEFAULT_FRAMES_PER_BUFFER):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frames_per_buffer = frames_per_buffer
+        self.bytes_per_frame = 2 * channels
+        self.last_start_latency = None  # 最近一次 play() 到声音数据送进声卡的耗时（秒）
+        self.on_start = None  # 新内容的第一个缓冲送出时在回调线程里调用 on_start(耗时秒)，要非常快
+        self._queue = deque()
+        self._current = None
+        self._offset = 0
+        self._requested_at = None
+        self._lock = threading.Lock()
+        self._open_stream()
+
+    def _open_stream(self):
+        import pyaudio  # 延迟导入：第一次播放时才加载，程序启动时先显示界面
+        self._continue = pyaudio.paContinue
+        self._pyaudio = pyaudio.PyAudio()
+        self.stream = self._pyaudio.open(
+            format=pyaudio.paInt16,
+            channels=self.channels,
+            rate=self.sample_rate,
+            output=True,
+            frames_per_buffer=self.frames_per_buffer,
+            stream_callback=self._callback
+        )
+        self.stream.start_stream()
+
+    @property
+    def output_latency(self):
+        """声卡本身的输出延迟（秒），加上 last_start_latency 才是听到声音的时间"""
+        return self.stream.get_output_latency()
+
+    @property
+    def is_playing(self):
+        with self._lock:
+            return self._current is not None or bool(self._queue)
+
+    def play(self, pcm):
+        """打断当前播放，立即开始播放 pcm（int16 交错数据）"""
+        with self._lock:
+            self._queue.clear()
+            self._current = memoryview(pcm).cast("B")
+            self._offset = 0
+            self._requested_at = time.perf_counter()
+            self.last_start_latency = None
+
+    def enqueue(self, pcm):
+        with self._lock:
+            if self._current is None:
+                self._current = memoryview(pcm).cast("B")
+                self._offset = 0
+                self._requested_at = time.perf_counter()
+                self.last_start_latency = None
+            else:
+                self._queue.append(memoryview(pcm).cast("B"))
+
+    def stop(self):
+        with self._lock:
+            self._queue.clear()
+            self._current = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        need = frame_count * self.bytes_per_frame
+        out = bytearray()
+        started = None
+        with self._lock:
+            if self._requested_at is not None and self._current is not None:
+                self.last_start_latency = started = time.perf_counter() - self._requested_at
+                self._requested_at = None
+            while len(out) < need and self._current is not None:
+                chunk = self._current[self._offset:self._offset + need - len(out)]
+                out += chunk
+                self._offset += len(chunk)
+                if self._offset >= len(self._current):
+                    self._current = self._queue.popleft() if self._queue else None
+                    self._offset = 0
+        if len(out) < need:
+            out += bytes(need - len(out))  # 补静音
+        if started is not None and self.on_start is not None:
+            self.on_start(started)
+        return bytes(out), self._continue
+
+    def close(self):
+        self.stop()
+        try:
+            self.stream.stop_stream()
+            self.stream.close()
+        finally:
+            self._pyaudio.terminate()
+
+
+class FileSink(AudioOutput):
+    """
+    不需要声卡的输出：按真实播放速度每 frames_per_buffer 帧调用一次回调，
+    取到的PCM写进 WAV 文件（path 为 None 时直接丢弃）
+    用于无声卡环境下测播放延迟、检查实际输出的声音
+    """
+    def __init__(self, sample_rate, channels=1, frames_per_buffer=DEFAULT_FRAMES_PER_BUFFER, path=None):
+        self.path = path
+        super().__init__(sample_rate, channels, frames_per_buffer)
+
+    def _open_stream(self):
+        self._continue = 0
+        self._wave = None
+        if self.path:
+            import wave
+            self._wave = wave.open(self.path, "wb")
+            self._wave.setnchannels(self.channels)
+            self._wave.setsampwidth(2)
+            self._wave.setframerate(self.sample_rate)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def output_latency(self):
+        return self.frames_per_buffer / self.sample_rate
+
+    def _run(self):
+        period = self.frames_per_buffer / self.sample_rate
+        next_tick = time.perf_counter()
+        while not self._closed.is_set():
+            data, _ = self._callback(None, self.frames_per_buffer, None, 0)
+            if self._wave is not None:
+                self._wave.writeframes(data)
+            next_tick += period
+            self._closed.wait(max(0.0, next_tick - time.perf_counter()))
+
+    def close(self):
+        self.stop()
+        self._closed.set()
+        self._thread.join()
+        if self._wave is not None:
+            self._wave.close()
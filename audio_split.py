@@ -0,0 +1,99 @@
+import os
+import av
+import numpy as np
+
+SAMPLE_RATE = 24000  # gTTS 输出就是 24kHz 单声道 32kbps
+
+
+def decode_mono(source, sample_rate=SAMPLE_RATE):
+    """把音频（文件路径或文件对象）解码成单声道 float32 数组"""
+    container = av.open(source)
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=sample_rate)
+    chunks = []
+    try:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                chunks.append(out.to_ndarray().reshape(-1))
+        for out in resampler.resample(None):
+            chunks.append(out.to_ndarray().reshape(-1))
+    finally:
+        container.close()
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks)
+
+
+def frame_rms(samples, sample_rate=SAMPLE_RATE, frame_ms=10):
+    """按 frame_ms 分帧计算每帧能量（RMS），返回 (rms数组, 每帧采样数)"""
+    hop = max(1, int(sample_rate * frame_ms / 1000))
+    count = len(samples) // hop
+    frames = samples[:count * hop].reshape(count, hop)
+    return np.sqrt((frames ** 2).mean(axis=1)), hop
+
+
+def split_on_silence(samples, count, sample_rate=SAMPLE_RATE, frame_ms=10,
+                     threshold_ratio=0.05, min_gap_ms=120, pad_ms=40):
+    """
+    在静音处把一段音频切成 count 段
+    取有声区间内最长的 count-1 段静音作为分界，词组内部的短停顿不会被切开
+    :param threshold_ratio: 能量低于 最大帧能量*threshold_ratio 视为静音
+    :param min_gap_ms: 选中的分界静音最短长度，不够说明停顿不明显，切分不可靠
+    :param pad_ms: 每段前后保留的静音（不超过相邻停顿的一半）
+    :return: [(起始采样, 结束采样), ...]，无法可靠切分时返回 None
+    """
+    rms, hop = frame_rms(samples, sample_rate, frame_ms)
+    if len(rms) == 0 or rms.max() <= 0:
+        return None
+    voiced = rms > rms.max() * threshold_ratio
+    voiced_idx = np.flatnonzero(voiced)
+    first, last = voiced_idx[0], voiced_idx[-1] + 1
+
+    # 有声区间内的所有静音段：starts 为静音开始帧，ends 为声音恢复帧
+    diff = np.diff(voiced[first:last].astype(np.int8))
+    starts = np.flatnonzero(diff == -1) + 1 + first
+    ends = np.flatnonzero(diff == 1) + 1 + first
+    if len(starts) < count - 1:
+        return None
+    lengths = ends - starts
+    chosen = np.sort(np.argsort(lengths, kind="stable")[::-1][:count - 1])
+    if count > 1 and lengths[chosen].min() * frame_ms < min_gap_ms:
+        return None
+
+    pad = int(pad_ms / frame_ms)
+    bounds = [first] + [b for i in chosen for b in (starts[i], ends[i])] + [last]
+    gaps = [0] + [int(lengths[i]) for i in chosen] + [0]
+    segments = []
+    for n in range(count):
+        begin, end = bounds[2 * n], bounds[2 * n + 1]
+        pad_before = min(pad, gaps[n] // 2) if n > 0 else pad
+        pad_after = min(pad, gaps[n + 1] // 2) if n < count - 1 else pad
+        segments.append((max(0, (begin - pad_before) * hop), min(len(samples), (end + pad_after) * hop)))
+    return segments
+
+
+def validate_segment(samples, sample_rate=SAMPLE_RATE, min_duration=0.15, max_duration=5.0, min_rms=0.01):
+    """按时长和能量检查切出来的一段是否像一个完整的单词"""
+    duration = len(samples) / sample_rate
+    if not (min_duration <= duration <= max_duration):
+        return False
+    return float(np.sqrt((samples ** 2).mean())) >= min_rms
+
+
+def encode_mp3(samples, save_path, sample_rate=SAMPLE_RATE, bit_rate=32000):
+    """把单声道 float32 数组编码成 MP3（先写临时文件再原子重命名）"""
+    tmp_path = save_path + ".part"
+    try:
+        with av.open(tmp_path, "w", format="mp3") as container:
+            stream = container.add_stream("libmp3lame", rate=sample_rate)
+            stream.layout = "mono"
+            stream.bit_rate = bit_rate
+            frame = av.AudioFrame.from_ndarray(samples.astype(np.float32).reshape(1, -1), format="flt", layout="mono")
+            frame.sample_rate = sample_rate
+            for packet in stream.encode(frame):
+                container.mux(packet)
+            for packet in stream.encode(None):
+                container.mux(packet)
+        os.replace(tmp_path, save_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
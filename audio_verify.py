@@ -0,0 +1,204 @@
+import io
+import os
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import av
+import numpy as np
+from zip_source import read_audio, split_member_path
+from word_library import WordLibrary
+from job_queue import JobQueue, queue_name, DEFAULT_DB_PATH as QUEUE_DB_PATH
+
+MIN_DURATION = 0.1      # 短于这个时长（秒）的算损坏
+SILENCE_PEAK = 0.02     # 整个文件峰值低于这个值（约 -34 dBFS）算没有声音
+TRUNCATED_RATIO = 0.8   # 解码出来的时长不到文件头（Xing/Info 帧数）记录时长的这个比例，算文件被截断
+CHUNK_SIZE = 64         # 每个进程任务校验的文件数（减少进程间通信）
+WRITE_EVERY = 1000      # 每校验这么多个文件写一次索引
+# MP3 帧头的码率表（kbps）：MPEG1 Layer III、MPEG2/2.5 Layer III
+MP3_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def mp3_frame_size(header):
+    """
+    按 MP3（Layer III）帧头算出这一帧应有的字节数，不是 Layer III 帧头时返回 None
+    gTTS、百度下载的 MP3 没有 Xing/Info 头，文件头时长是按文件大小估的，被截断也对得上；
+    最后一帧不完整是截断最可靠的迹象（解码器会把剩下的半帧照样交出来）
+    """
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03  # 3: MPEG1，2: MPEG2，0: MPEG2.5
+    layer = (header[1] >> 1) & 0x03     # 1: Layer III
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = MP3_BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 0x01
+    return (144 if version == 3 else 72) * bitrate // sample_rate + padding
+
+
+def verify_audio(data):
+    """
+    完整解码一遍，检查能否解码、时长、是否有声音、是否被截断
+    :return: (时长秒, status, 问题描述)；status 为 "ok" / "broken" / "silent"
+    """
+    if not data:
+        return 0.0, "broken", "空文件"
+    try:
+        container = av.open(io.BytesIO(data))
+    except (av.error.FFmpegError, OSError, ValueError) as e:
+        return 0.0, "broken", f"无法打开：{str(e).splitlines()[0]}"
+    samples = 0
+    peak = 0.0
+    sample_rate = 0
+    last_packet = None
+    try:
+        if not container.streams.audio:
+            return 0.0, "broken", "没有音频流"
+        header_duration = container.duration / av.time_base if container.duration else None
+        for packet in container.demux(audio=0):
+            if packet.size:
+                last_packet = packet
+            for frame in packet.decode():
+                array = frame.to_ndarray()
+                if np.issubdtype(array.dtype, np.integer):
+                    array = array / float(np.iinfo(array.dtype).max)
+                if array.size:
+                    peak = max(peak, float(np.abs(array).max()))
+                samples += frame.samples
+                sample_rate = frame.sample_rate
+    except (av.error.FFmpegError, OSError, ValueError) as e:
+        return samples / sample_rate if sample_rate else 0.0, "broken", f"解码出错：{str(e).splitlines()[0]}"
+    finally:
+        container.close()
+    duration = samples / sample_rate if sample_rate else 0.0
+    if duration < MIN_DURATION:
+        return duration, "broken", f"太短（{duration * 1000:.0f}ms）"
+    if header_duration and duration < header_duration * TRUNCATED_RATIO:
+        return duration, "broken", f"文件被截断（{duration:.2f}s / {header_duration:.2f}s）"
+    if last_packet is not None:
+        expected = mp3_frame_size(bytes(last_packet)[:4])
+        if expected and last_packet.size < expected:
+            return duration, "broken", f"文件被截断（最后一帧只有 {last_packet.size}/{expected} 字节）"
+    if peak < SILENCE_PEAK:
+        return duration, "silent", f"没有声音（峰值 {peak:.4f}）"
+    return duration, "ok", None
+
+
+def verify_chunk(rows):
+    """
+    进程池里执行：校验一组文件（普通文件或压缩包成员）
+    :param rows: [(路径, 大小, 修改时间), ...]
+    :return: [(路径, 大小, 修改时间, 时长, sha1, status, 问题描述), ...]
+    """
+    results = []
+    for path, size, mtime in rows:
+        try:
+            data = bytes(read_audio(path))
+        except (OSError, KeyError) as e:
+            results.append((path, size, mtime, None, None, "broken", f"无法读取：{str(e)}"))
+            continue
+        duration, status, problem = verify_audio(data)
+        results.append((path, size, mtime, round(duration, 3), hashlib.sha1(data).hexdigest(), status, problem))
+    return results
+
+
+def verify_library(library, source, workers=None, verbose=True):
+    """
+    校验来源（文件夹或压缩包，含文件夹里的压缩包）中还没校验过的文件，结果写进索引
+    - 大小和修改时间没变的文件只校验一次，再次运行直接跳过
+    - 按CPU核数开进程池，每个任务一组文件，结果攒一批写一次索引
+    :return: {"checked": 本次校验数, "ok": ..., "broken": ..., "silent": ..., "seconds": ...}
+    """
+    source = library.normalize_folder(source)
+    library.scan(source)
+    rows = library.unverified(source)
+    stats = {"checked": 0, "ok": 0, "broken": 0, "silent": 0, "seconds": 0.0}
+    if not rows:
+        return stats
+    workers = workers or os.cpu_count() or 1
+    chunks = [rows[i:i + CHUNK_SIZE] for i in range(0, len(rows), CHUNK_SIZE)]
+    if verbose:
+        print(f"校验音频：{len(rows)} 个文件（{workers}进程）...")
+    start = time.perf_counter()
+    pending = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        futures = [executor.submit(verify_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            for result in future.result():
+                pending.append(result)
+                stats[result[5]] += 1
+                if verbose and result[5] != "ok":
+                    print(f"{'损坏' if result[5] == 'broken' else '没有声音'}：{result[0]}（{result[6]}）")
+            stats["checked"] += len(future.result())
+            if len(pending) >= WRITE_EVERY:
+                library.record_verification(pending)
+                pending = []
+                if verbose:
+                    print(f"已校验 {stats['checked']}/{len(rows)}")
+    library.record_verification(pending)
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    return stats
+
+
+def queue_repairs(library, source, queue):
+    """
+    把损坏、没有声音的文件加入下载队列（之后用下载脚本的 --resume 重新下载，覆盖原文件）
+    压缩包里的文件没法直接替换，只报告不排队
+    :return: (加入队列的数量, 压缩包里无法修复的数量)
+    """
+    jobs = []
+    in_zip = 0
+    for index, (word, path, status, problem) in enumerate(library.problems(source), 1):
+        if split_member_path(path) is not None:
+            in_zip += 1
+            continue
+        jobs.append((index, word, path))
+    if jobs:
+        queue.add(jobs)
+    return len(jobs), in_zip
+
+
+if __name__ == "__main__":
+    # 校验单词库：python audio_verify.py gtts_mp3 [更多文件夹或压缩包...] --repair
+    parser = argparse.ArgumentParser(description="逐个解码单词音频，找出损坏、被截断或没有声音的文件")
+    parser.add_argument("sources", nargs="+", help="单词文件夹或压缩包")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认CPU核数）")
+    parser.add_argument("--library-db", default=None, help="单词库索引（默认和练习程序共用）")
+    parser.add_argument("--recheck", action="store_true", help="忽略之前的校验结果，全部重新校验")
+    parser.add_argument("--repair", action="store_true", help="把有问题的文件加入下载队列，之后用下载脚本 --resume 重新下载")
+    parser.add_argument("--provider", default="gtts", help="重新下载用的下载脚本：gtts / baidu / espeak-ng / piper")
+    parser.add_argument("--options", nargs="*", default=["en", "normal"],
+                        help="下载队列名里的语音设置，要和下载时一致（gtts 默认 en normal，百度 uk 3）")
+    parser.add_argument("--queue-db", default=QUEUE_DB_PATH, help="下载队列数据库")
+    args = parser.parse_args()
+
+    library = WordLibrary(args.library_db) if args.library_db else WordLibrary()
+    for source in args.sources:
+        if not os.path.exists(source):
+            print(f"错误：{source} 不存在！")
+            continue
+        source = library.normalize_folder(source)
+        if args.recheck:
+            library.scan(source)
+            library.reset_verification(source)
+        stats = verify_library(library, source, args.workers)
+        summary = library.verification_summary(source)
+        print(f"{source}：本次校验 {stats['checked']} 个（{stats['seconds']}秒），"
+              f"正常 {summary.get('ok', 0)}，损坏 {summary.get('broken', 0)}，没有声音 {summary.get('silent', 0)}")
+        if args.repair and (summary.get("broken") or summary.get("silent")):
+            queue = JobQueue(args.queue_db, queue_name(args.provider, source, *args.options))
+            queued, in_zip = queue_repairs(library, source, queue)
+            queue.close()
+            if queued:
+                print(f"已加入下载队列 {queued} 个，运行 python dowload_gtts.py --save-dir {source} --resume 重新下载"
+                      if args.provider == "gtts" else f"已加入下载队列 {queued} 个（队列：{queue.name}）")
+            if in_zip:
+                print(f"压缩包里的 {in_zip} 个文件无法直接修复，请重新打包")
+    library.close()
@@ -0,0 +1,483 @@
+import os
+import sys
+import json
+import time
+import base64
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import contextlib
+import statistics
+import subprocess
+import tracemalloc
+import importlib.util
+from urllib.parse import parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from audio_engine import create_engine, FileSinkEngine
+from audio_bank import PcmBank
+from prefetch import Prefetcher
+from word_library import WordLibrary
+from scheduler import ReviewScheduler
+from session_journal import SessionJournal
+from practice_session import PracticeSession
+from practice_server import PracticeServer
+from telemetry import ANSWER_TO_AUDIO
+
+# 用法：
+#   python benchmark.py                         跑全部测试，结果写入 benchmark_results.json
+#   python benchmark.py --only load,decode      只跑部分测试（load / decode / answer / download / server）
+#   python benchmark.py --compare old.json      和之前的结果对比，变慢超过阈值时返回码为 1
+# 不需要显示器和声卡：播放走 file 后端（按真实速度消费PCM但不写文件），下载走本地假TTS服务器
+
+DEFAULT_RESULTS = "benchmark_results.json"
+LOAD_SIZES = (1000, 10000, 100000)
+SECTIONS = ("load", "decode", "answer", "download", "server")
+
+try:
+    import numpy as np
+    import audio_split
+    audio_support = True
+except ImportError:
+    audio_support = False
+
+
+def summarize(prefix, samples, metrics):
+    """把一组耗时（秒）整理成 中位数 / p95 / 最大值（毫秒）"""
+    samples = sorted(samples)
+    if not samples:
+        return
+    metrics[f"{prefix}.median_ms"] = round(statistics.median(samples) * 1000, 3)
+    metrics[f"{prefix}.p95_ms"] = round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3)
+    metrics[f"{prefix}.max_ms"] = round(samples[-1] * 1000, 3)
+
+
+def tone_mp3(path, words=1, tone_s=0.5, gap_s=0.3, freq=440.0):
+    """生成 words 段正弦音（中间隔静音）的MP3，模拟一个或几个单词的发音"""
+    rate = audio_split.SAMPLE_RATE
+    t = np.arange(int(rate * tone_s), dtype=np.float32) / rate
+    tone = 0.5 * np.sin(2 * np.pi * freq * t).astype(np.float32)
+    gap = np.zeros(int(rate * gap_s), dtype=np.float32)
+    parts = [gap]
+    for _ in range(words):
+        parts += [tone, gap]
+    audio_split.encode_mp3(np.concatenate(parts), path)
+
+
+def make_audio_folder(folder, count):
+    """count 个可解码的MP3（音高各不相同，文件内容互不相同）"""
+    os.makedirs(folder, exist_ok=True)
+    for i in range(count):
+        tone_mp3(os.path.join(folder, f"word{i:05d}.mp3"), freq=300.0 + 7 * i)
+    return folder
+
+
+def make_placeholder_folder(folder, count):
+    """count 个占位MP3：扫描只看文件名和 stat，不读内容"""
+    os.makedirs(folder, exist_ok=True)
+    data = b"\xff\xfb" + bytes(1022)
+    for i in range(count):
+        with open(os.path.join(folder, f"word{i:06d}.mp3"), "wb") as f:
+            f.write(data)
+    return folder
+
+
+def bench_load(workdir, metrics, sizes=LOAD_SIZES):
+    """
+    load_words 的非界面部分：索引扫描 + 按字母顺序取出 + 生成本轮复习计划
+    - cold：第一次打开（空索引）
+    - warm：文件夹没有变化（直接用索引）
+    - incremental：新增一个文件后重新打开
+    - memory_mb：单词表 + 复习计划占用的内存（单独跑一次，tracemalloc 会拖慢计时）
+    """
+    for size in sizes:
+        folder = make_placeholder_folder(os.path.join(workdir, f"load_{size}"), size)
+        library = WordLibrary(os.path.join(workdir, f"library_{size}.db"))
+        scheduler = ReviewScheduler(os.path.join(workdir, f"review_{size}.db"))
+
+        def load_words():
+            start = time.perf_counter()
+            library.scan(folder)
+            words = library.load(folder)
+            scheduler.start(words)
+            return time.perf_counter() - start, len(words)
+
+        try:
+            metrics[f"load_words.{size}.cold_s"], _ = load_words()
+            metrics[f"load_words.{size}.warm_s"] = min(load_words()[0] for _ in range(3))
+            with open(os.path.join(folder, "zzz_new_word.mp3"), "wb") as f:
+                f.write(b"\xff\xfb" + bytes(1022))
+            metrics[f"load_words.{size}.incremental_s"], count = load_words()
+            assert count == size + 1
+            tracemalloc.start()
+            try:
+                words = library.load(folder)
+                scheduler.start(words)
+                metrics[f"load_words.{size}.memory_mb"] = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+            finally:
+                tracemalloc.stop()
+        finally:
+            scheduler.close()
+            library.close()
+            shutil.rmtree(folder, ignore_errors=True)
+        print(f"load_words {size}: 首次 {metrics[f'load_words.{size}.cold_s']:.3f}s，"
+              f"无变化 {metrics[f'load_words.{size}.warm_s']:.3f}s，新增一个 {metrics[f'load_words.{size}.incremental_s']:.3f}s，"
+              f"内存 {metrics[f'load_words.{size}.memory_mb']:.1f}MB")
+
+
+def bench_decode(workdir, metrics, count=100):
+    """播放线程里 av 解码 + 重采样成PCM的吞吐（不经过缓存）"""
+    folder = make_audio_folder(os.path.join(workdir, "decode"), count)
+    paths = sorted(os.path.join(folder, name) for name in os.listdir(folder))
+    bank = PcmBank()
+    start = time.perf_counter()
+    total_bytes = sum(len(bank.get(path)) for path in paths)
+    elapsed = time.perf_counter() - start
+    audio_seconds = total_bytes / bank.bytes_per_frame / bank.sample_rate
+    metrics["decode.files_per_s"] = round(count / elapsed, 2)
+    metrics["decode.realtime_factor_per_s"] = round(audio_seconds / elapsed, 2)
+    print(f"解码：{metrics['decode.files_per_s']} 个文件/秒，{metrics['decode.realtime_factor_per_s']} 倍实时")
+
+
+def bench_answer(workdir, metrics, count=50, think_ms=300):
+    """
+    答对一个单词 → 下一个单词开始出声 的耗时，按界面的 check_spelling 流程：
+    PracticeSession.check()（记录作答、更新复习计划、取下一个到期单词）、播放（优先用预取结果）、调整预取窗口
+    think_ms 模拟用户输入的时间，预取线程在这段时间里工作
+    """
+    folder = make_audio_folder(os.path.join(workdir, "answer"), count)
+    library = WordLibrary(os.path.join(workdir, "answer_library.db"))
+    scheduler = ReviewScheduler(os.path.join(workdir, "answer_review.db"))
+    journal = SessionJournal(os.path.join(workdir, "answer_journal"))
+    session = PracticeSession(scheduler, journal)
+    engine = create_engine("file" if FileSinkEngine.available() else "null")
+    prefetcher = Prefetcher(engine.load)
+    samples = []
+    hits = 0
+
+    def present():
+        path = session.current["path"]
+        prepared = prefetcher.get(path)
+        engine.last_start_latency = None
+        engine.play_file(path, prepared)
+        prefetcher.schedule(session.upcoming(prefetcher.depth))
+        return prepared is not None
+
+    try:
+        engine.open()
+        library.scan(folder)
+        session.start(folder, library.load(folder))
+        present()
+        while True:
+            time.sleep(think_ms / 1000)
+            start = time.perf_counter()
+            engine.telemetry.begin(ANSWER_TO_AUDIO)
+            session.check(session.current["word"])
+            if session.current is None:
+                break
+            hits += present()
+            while engine.last_start_latency is None and time.perf_counter() - start < 5:
+                time.sleep(0.0005)
+            samples.append(time.perf_counter() - start)
+    finally:
+        prefetcher.close()
+        engine.close()
+        journal.close()
+        scheduler.close()
+        library.close()
+    summarize(f"answer_to_audio.{engine.name}", samples, metrics)
+    metrics["answer_to_audio.prefetch_hit_ratio"] = round(hits / max(1, len(samples)), 3)
+    # 播放后端内置的分阶段统计（和界面 F12 浮层里的一样）
+    for name, stats in engine.telemetry.snapshot().items():
+        metrics[f"answer_to_audio.{engine.name}.stage.{name}.p95_ms"] = stats["p95_ms"]
+    print(f"答题到出声（{engine.name} 后端）：中位数 {metrics[f'answer_to_audio.{engine.name}.median_ms']}ms，"
+          f"p95 {metrics[f'answer_to_audio.{engine.name}.p95_ms']}ms，预取命中 {metrics['answer_to_audio.prefetch_hit_ratio']:.0%}")
+
+
+class FakeTtsServer(ThreadingHTTPServer):
+    """
+    本地假TTS服务器：GET 按百度 gettts 接口返回MP3，POST 按 gTTS 的 batchexecute 接口返回
+    每个请求先等 delay 秒模拟网络延迟；gTTS 批量请求按文本里的单词数返回多段声音，能走通静音切分
+    """
+    daemon_threads = True
+
+    def __init__(self, workdir, delay=0.05):
+        super().__init__(("127.0.0.1", 0), FakeTtsHandler)
+        self.workdir = workdir
+        self.delay = delay
+        self.requests = 0
+        self._clips = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def clip(self, words):
+        with self._lock:
+            self.requests += 1
+            if words not in self._clips:
+                path = os.path.join(self.workdir, f"fake_tts_{words}.mp3")
+                tone_mp3(path, words)
+                with open(path, "rb") as f:
+                    self._clips[words] = f.read()
+            return self._clips[words]
+
+
+class FakeTtsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        self._send(self.server.clip(1), "audio/mpeg")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        rpc = json.loads(parse_qs(body)["f.req"][0])
+        text = json.loads(rpc[0][0][1])[0]
+        words = max(1, len([part for part in text.split(".") if part.strip()]))
+        time.sleep(self.server.delay)
+        audio = base64.b64encode(self.server.clip(words)).decode("ascii")
+        line = json.dumps([["wrb.fr", "jQ1olc", json.dumps([audio]), None, None, None, "generic"]], separators=(",", ":"))
+        self._send((")]}'\n\n" + line + "\n").encode("utf-8"), "application/json")
+
+
+def load_script(name, filename):
+    """按文件路径导入脚本（dowload-new.py 的文件名不能直接 import）"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(os.path.dirname(os.path.abspath(__file__)), filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bench_download(workdir, metrics, count=200, delay=0.05, workers=4, batch_size=5):
+    """两个下载脚本对本地假TTS服务器的吞吐（单词/秒），不用缓存、不限速"""
+    words = [f"word{i:04d}" for i in range(count)]
+    word_file = os.path.join(workdir, "words.txt")
+    with open(word_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(words))
+    server = FakeTtsServer(workdir, delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        baidu = load_script("dowload_new", "dowload-new.py")
+        save_dir = os.path.join(workdir, "baidu_mp3")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(open(os.devnull, "w", encoding="utf-8")):
+            baidu.batch_download_tts(word_file, save_dir, base_url=server.base_url + "/gettts",
+                                     interval=0, use_selenium_fallback=False)
+        elapsed = time.perf_counter() - start
+        metrics["download.baidu.words_per_s"] = round(len(os.listdir(save_dir)) / elapsed, 2)
+        print(f"下载（百度接口）：{metrics['download.baidu.words_per_s']} 个单词/秒")
+
+        import gtts.tts
+        import dowload_gtts
+        original_url = gtts.tts._translate_url
+        gtts.tts._translate_url = lambda tld="com", path="": f"{server.base_url}/{path}"
+        try:
+            for size in (1, batch_size):
+                save_dir = os.path.join(workdir, f"gtts_mp3_{size}")
+                server.requests = 0
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(open(os.devnull, "w", encoding="utf-8")):
+                    dowload_gtts.batch_download_gtts(word_file, save_dir, workers=workers, rate=1000, batch_size=size)
+                elapsed = time.perf_counter() - start
+                done = len([name for name in os.listdir(save_dir) if name.endswith(".mp3")])
+                metrics[f"download.gtts.batch{size}.words_per_s"] = round(done / elapsed, 2)
+                metrics[f"download.gtts.batch{size}.requests"] = server.requests
+                print(f"下载（gTTS，每次 {size} 个单词）：{metrics[f'download.gtts.batch{size}.words_per_s']} 个单词/秒，"
+                      f"{server.requests} 次请求")
+        finally:
+            gtts.tts._translate_url = original_url
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+async def http_request(reader, writer, method, path, body=None, headers=None):
+    """在一个 keep-alive 连接上发一个请求，返回 (状态码, 响应头, 响应体)"""
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+    writer.write((head + "\r\n").encode("latin-1") + data)
+    status_line, *lines = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    response_headers = {}
+    for line in lines:
+        if line:
+            name, _, value = line.partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+    payload = await reader.readexactly(int(response_headers.get("content-length", 0))) if method != "HEAD" else b""
+    return int(status_line.split(" ")[1]), response_headers, payload
+
+
+def bench_server(workdir, metrics, learners=200, count=20, think_ms=200, accuracy=0.8):
+    """
+    多人练习服务器压力测试：learners 个模拟学习者同时连到本机的 PracticeServer，各练完一轮 count 个单词
+    每个单词：取音频（第一次完整下载，再用 If-None-Match 重新验证、用 Range 取一段），等 think_ms 左右，
+    按 accuracy 的概率答对（答错时服务器给提示，错满3次换下一个）
+    统计 作答请求 和 音频请求 的响应时间、整体每秒处理的作答数
+    """
+    import random
+    folder = make_placeholder_folder(os.path.join(workdir, "server"), count)
+    server = PracticeServer(folder, ephemeral=True)
+    answer_samples = []
+    audio_samples = []
+    errors = []
+
+    async def learner(number, port):
+        rng = random.Random(number)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            status, _, payload = await http_request(reader, writer, "POST", "/api/sessions",
+                                                    {"learner": f"learner{number:04d}"})
+            state = json.loads(payload)
+            etags = {}
+            while not state["completed"]:
+                audio = state["audio"]
+                start = time.perf_counter()
+                if audio in etags:
+                    status, _, _ = await http_request(reader, writer, "GET", audio, headers={"If-None-Match": etags[audio]})
+                    expected = 304
+                else:
+                    _, headers, _ = await http_request(reader, writer, "GET", audio)
+                    etags[audio] = headers["etag"]
+                    status, _, _ = await http_request(reader, writer, "GET", audio, headers={"Range": "bytes=0-511"})
+                    expected = 206
+                audio_samples.append(time.perf_counter() - start)
+                if status != expected:
+                    raise RuntimeError(f"音频返回 {status}，应该是 {expected}")
+                await asyncio.sleep(rng.uniform(0.5, 1.5) * think_ms / 1000)
+                word = server.words.word(int(audio.rsplit("/", 1)[1]))
+                answer = word if rng.random() < accuracy else word[::-1] + "x"
+                start = time.perf_counter()
+                status, _, payload = await http_request(reader, writer, "POST", f"/api/sessions/{state['session']}/answer",
+                                                        {"answer": answer})
+                answer_samples.append(time.perf_counter() - start)
+                if status != 200:
+                    raise RuntimeError(f"作答返回 {status}: {payload[:200]!r}")
+                state = json.loads(payload)["state"]
+            await http_request(reader, writer, "DELETE", f"/api/sessions/{state['session']}")
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        finally:
+            writer.close()
+
+    async def run():
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*(learner(number, port) for number in range(learners)))
+            return time.perf_counter() - start
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            await server.close()
+
+    elapsed = asyncio.run(run())
+    summarize("server.answer", answer_samples, metrics)
+    summarize("server.audio", audio_samples, metrics)
+    metrics["server.answers_per_s"] = round(len(answer_samples) / elapsed, 2)
+    metrics["server.audio_cache_hit_ratio"] = round(server.audio.hits / max(1, server.audio.hits + server.audio.misses), 3)
+    metrics["server.errors"] = len(errors)
+    print(f"练习服务器（{learners} 个学习者）：{metrics['server.answers_per_s']} 次作答/秒，"
+          f"作答 p95 {metrics.get('server.answer.p95_ms')}ms，音频 p95 {metrics.get('server.audio.p95_ms')}ms，"
+          f"失败 {len(errors)} 个学习者")
+    for error in errors[:5]:
+        print(f"  {error}")
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(old_metrics, new_metrics, threshold=0.1):
+    """
+    对比两次结果：*_per_s 越大越好，其余耗时越小越好
+    :return: 变差超过 threshold 的指标名列表
+    """
+    regressions = []
+    for name in sorted(set(old_metrics) & set(new_metrics)):
+        old, new = old_metrics[name], new_metrics[name]
+        if not isinstance(old, (int, float)) or not old or name.endswith((".requests", "_ratio")):
+            continue
+        change = (new - old) / old
+        worse = -change if name.endswith("_per_s") else change
+        mark = "⚠️ 变差" if worse > threshold else ("✅ 变好" if worse < -threshold else "")
+        if worse > threshold:
+            regressions.append(name)
+        print(f"  {name}: {old} → {new}（{change:+.1%}）{mark}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="单词拼写练习性能测试（无需显示器和声卡）")
+    parser.add_argument("--only", default=",".join(SECTIONS), help=f"要跑的测试，逗号分隔：{', '.join(SECTIONS)}")
+    parser.add_argument("--sizes", default=",".join(map(str, LOAD_SIZES)), help="load 测试的单词数量，逗号分隔")
+    parser.add_argument("--output", default=DEFAULT_RESULTS, help="结果文件（JSON）")
+    parser.add_argument("--compare", help="和之前的结果文件对比")
+    parser.add_argument("--threshold", type=float, default=0.1, help="对比时超过这个比例算变差（默认 0.1）")
+    parser.add_argument("--think-ms", type=int, default=300, help="answer 测试中模拟的用户输入时间（毫秒）")
+    parser.add_argument("--server-delay-ms", type=int, default=50, help="假TTS服务器每个请求的延迟（毫秒）")
+    parser.add_argument("--learners", type=int, default=200, help="server 测试中同时练习的学习者数量")
+    args = parser.parse_args()
+
+    sections = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"未知的测试：{', '.join(sorted(unknown))}")
+    if not audio_support and set(sections) & {"decode", "answer", "download"}:
+        print("提示：未安装 av / numpy，只能跑 load / server 测试")
+        sections = [name for name in sections if name in ("load", "server")]
+
+    metrics = {}
+    workdir = tempfile.mkdtemp(prefix="spelling_bench_")
+    try:
+        if "load" in sections:
+            bench_load(workdir, metrics, [int(size) for size in args.sizes.split(",")])
+        if "decode" in sections:
+            bench_decode(workdir, metrics)
+        if "answer" in sections:
+            bench_answer(workdir, metrics, think_ms=args.think_ms)
+        if "download" in sections:
+            bench_download(workdir, metrics, delay=args.server_delay_ms / 1000)
+        if "server" in sections:
+            bench_server(workdir, metrics, learners=args.learners)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    metrics = {name: round(value, 4) if isinstance(value, float) else value for name, value in metrics.items()}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment_info(), "metrics": metrics}, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存：{args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        print(f"与 {args.compare} 对比：")
+        regressions = compare(old["metrics"], metrics, args.threshold)
+        if regressions:
+            print(f"有 {len(regressions)} 项变差超过 {args.threshold:.0%}")
+            sys.exit(1)
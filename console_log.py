@@ -0,0 +1,28 @@
+from collections import deque
+
+LOG_MAX_LINES = 1000  # 控制台最多保留的行数
+LOG_FLUSH_MS = 50     # UI 线程刷新控制台的间隔（毫秒）
+
+
+class LogBuffer:
+    """
+    控制台日志缓冲：任何线程都可以 write()，UI 线程定时 drain() 一次性写进控件
+    - deque 的 append/popleft 是线程安全的，后台线程写日志不用碰 UI 控件
+    - 积压超过 max_lines 时只保留最新的，控件本身也按 max_lines 截断
+    """
+    def __init__(self, max_lines=LOG_MAX_LINES):
+        self.max_lines = max_lines
+        self._pending = deque(maxlen=max_lines)
+
+    def write(self, message):
+        self._pending.append(message)
+
+    def drain(self):
+        """取出所有待显示的消息（UI 线程调用）"""
+        lines = []
+        try:
+            while True:
+                lines.append(self._pending.popleft())
+        except IndexError:
+            pass
+        return lines
@@ -1,40 +1,62 @@
 # //https://fanyi.baidu.com/gettts?lan=uk&text=singer&spd=3
 import os
 import time
-import glob
 from urllib.parse import quote  # 用于URL编码（处理空格、特殊字符）
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+import requests
+from requests.adapters import HTTPAdapter
+from audio_cache import AudioCache
+from word_list import build_plan, describe_plan, missing_sources
+from job_queue import JobQueue, ProgressReporter, queue_name, describe_progress
 
-def batch_download_tts(word_file_path, save_dir, lan="uk", spd=3):
+TTS_BASE_URL = "https://fanyi.baidu.com/gettts"
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Referer": "https://fanyi.baidu.com/",
+}
+
+
+def create_http_session(pool_size=4):
+    """创建复用长连接的HTTP会话（连接池），所有单词共用"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HTTP_HEADERS)
+    return session
+
+
+def fetch_tts_http(session, tts_url, save_path, min_size=1000, timeout=15):
     """
-    批量下载百度翻译TTS音频
-    :param word_file_path: words.txt的路径
-    :param save_dir: MP3文件的保存目录
-    :param lan: 语言类型（uk=英语，zh=中文，更多语言可查百度TTS文档）
-    :param spd: 语速（1-9，数字越大越快，默认4）
+    直接请求TTS接口，边下载边写入临时文件，校验通过后原子重命名为目标文件
+    :return: 成功返回文件大小（字节），失败抛出异常
     """
-    # 1. 检查单词文件是否存在
-    if not os.path.exists(word_file_path):
-        print(f"错误：单词文件 {word_file_path} 不存在！")
-        return
+    tmp_path = save_path + ".part"
+    try:
+        with session.get(tts_url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "")
+            if content_type and not content_type.startswith(("audio/", "application/octet-stream")):
+                raise Exception(f"返回的不是音频（Content-Type: {content_type}）")
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=16384):
+                    f.write(chunk)
+        size = os.path.getsize(tmp_path)
+        if size <= min_size:
+            raise Exception(f"下载的文件过小（{size}字节），可能无效")
+        os.replace(tmp_path, save_path)
+        return size
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-    # 2. 创建保存MP3的目录（不存在则自动创建）
-    if not os.path.exists(save_dir):
-        os.makedirs(save_dir)
-        print(f"已创建保存目录：{save_dir}")
 
-    # 3. 读取单词列表（按行读取，去除空行和前后空格）
-    with open(word_file_path, "r", encoding="utf-8") as f:
-        words = [line.strip() for line in f if line.strip()]  # 过滤空行
-    if not words:
-        print("错误：words.txt中没有有效单词！")
-        return
-    print(f"共读取到 {len(words)} 个单词/词组，开始下载...")
+def create_selenium_driver(save_dir):
+    """备用方案：启动Chrome浏览器下载（仅在HTTP直连失败时才会用到）"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
 
-    # 4. 配置浏览器下载选项
     chrome_options = Options()
-    
+
     # 设置下载路径
     prefs = {
         "download.default_directory": os.path.abspath(save_dir),
@@ -43,70 +65,171 @@ def batch_download_tts(word_file_path, save_dir, lan="uk", spd=3):
         "safebrowsing.enabled": True
     }
     chrome_options.add_experimental_option("prefs", prefs)
-    
+
     # 启动浏览器（有头模式）
-    driver = webdriver.Chrome(options=chrome_options)
+    return webdriver.Chrome(options=chrome_options)
 
-    try:
-        # 5. 循环下载每个单词的MP3
-        for index, word in enumerate(words, start=1):
-            try:
-                # 生成目标文件名
-                safe_filename = word.replace("/", "-").replace("\\", "-").replace("?", "").replace("*", "").replace(":", "").replace("\"", "").replace("<", "").replace(">", "").replace("|", "") + ".mp3"
-                save_path = os.path.join(save_dir, safe_filename)
-                
-                # 检查文件是否已存在
-                if os.path.exists(save_path) and os.path.getsize(save_path) > 1000:
-                    print(f"[{index}/{len(words)}] 已存在，跳过：{word}")
+
+def fetch_tts_selenium(driver, tts_url, save_dir, save_path):
+    """备用方案：用浏览器访问TTS地址，等待下载完成后重命名"""
+    # 记录下载前的文件列表
+    before_download = set(os.listdir(save_dir))
+
+    # 直接访问TTS URL，浏览器会自动下载
+    driver.get(tts_url)
+
+    # 等待下载完成
+    time.sleep(5)
+
+    # 查找新下载的文件
+    after_download = set(os.listdir(save_dir))
+    new_files = after_download - before_download
+
+    # 重命名新下载的MP3文件
+    if new_files:
+        for new_file in new_files:
+            if new_file.endswith('.mp3'):
+                old_path = os.path.join(save_dir, new_file)
+                # 重命名为单词名称
+                os.replace(old_path, save_path)
+                break
+
+
+def batch_download_tts(word_file_path, save_dir, lan="uk", spd=3, cache=None,
+                       base_url=TTS_BASE_URL, interval=0.5, use_selenium_fallback=True, processor=None,
+                       queue=None, resume=False, retry_failed=False, limit=None, max_wait=120):
+    """
+    批量下载百度翻译TTS音频
+    :param word_file_path: words.txt的路径，或多个单词表的列表（跨单词表去重）
+    :param save_dir: MP3文件的保存目录
+    :param lan: 语言类型（uk=英语，zh=中文，更多语言可查百度TTS文档）
+    :param spd: 语速（1-9，数字越大越快，默认4）
+    :param cache: AudioCache 实例，命中时直接从缓存链接/复制，不打开网页；None 表示不用缓存
+    :param base_url: TTS接口地址，测试时可指向本地HTTP服务
+    :param interval: 两次请求之间的间隔（秒）
+    :param use_selenium_fallback: HTTP直连失败时是否改用浏览器下载
+    :param processor: AudioProcessor 实例，下载完成后去掉首尾静音、统一响度；None 表示不处理
+    :param queue: JobQueue 实例，持久保存每个单词的下载状态（中断后继续、多个进程一起下载）；None 表示只在内存里排队
+    :param resume: 不读单词表，直接继续队列里没完成的单词
+    :param retry_failed: 之前超过重试次数的单词重新排队
+    :param limit: 本次最多下载的单词数（很大的单词表分几次下载），None 表示不限
+    :param max_wait: 剩下的单词都在等待重试时，最多等多少秒，超过就先退出（下次运行再试）
+    """
+    if queue is None:
+        queue = JobQueue(":memory:", queue_name("baidu", save_dir, lan, spd))
+
+    # 1. 创建保存MP3的目录（不存在则自动创建）
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+        print(f"已创建保存目录：{save_dir}")
+
+    # 2. 读取单词列表：跨单词表去重、检查文件名冲突、过滤掉已有的有效文件，需要下载的加入队列
+    plan = None
+    if not resume:
+        word_files = [word_file_path] if isinstance(word_file_path, str) else list(word_file_path)
+        missing = missing_sources(word_files)
+        if missing:
+            print(f"错误：单词文件 {missing[0]} 不存在！")
+            return
+        plan = build_plan(word_files, save_dir, min_size=1001)
+        if not plan["words"]:
+            print("错误：words.txt中没有有效单词！")
+            return
+        print(describe_plan(plan))
+
+        jobs = []
+        total = len(plan["words"])
+        pending = {save_path for _, _, save_path in plan["jobs"]}
+        skipped = [save_path for _, save_path in plan["words"] if save_path not in pending]  # 已有有效文件
+        for index, word, save_path in plan["jobs"]:
+            # 其他单词表已经下载过的单词，直接从缓存取（不占 limit 的名额）
+            if cache is not None:
+                cache_key = AudioCache.make_key(word, "baidu", lan, spd)
+                if cache.materialize(cache_key, save_path) and os.path.getsize(save_path) > 1000:
+                    print(f"[{index}/{total}] 缓存命中，跳过下载：{word}")
+                    skipped.append(save_path)
                     continue
+            jobs.append((index, word, save_path))
+        queue.add(jobs)
+        queue.skip(skipped)  # 之前中断时还没下载、这次已经有文件的单词
+
+    if retry_failed:
+        print(f"之前失败的 {queue.retry_failed()} 个单词重新排队")
+    progress = queue.progress()
+    print(describe_progress(progress))
+    total = len(plan["words"]) if plan is not None else progress["total"]
+    print("开始下载...")
 
+    # 3. HTTP会话（长连接复用）；浏览器只在第一次需要备用方案时才启动
+    session = create_http_session()
+    driver = None
+    reporter = ProgressReporter(queue)
+    downloaded = 0
+
+    try:
+        # 4. 从队列逐个领取单词下载，队列空了（或到了 limit）就结束
+        while limit is None or downloaded < limit:
+            claimed = queue.claim(1)
+            if not claimed:
+                wait = queue.next_wait()
+                if wait is None or wait > max_wait:
+                    break
+                time.sleep(min(max(wait, 0.1), 1.0))
+                continue
+            index, word, save_path = claimed[0]
+            downloaded += 1
+            try:
                 # 构造TTS请求URL
                 encoded_word = quote(word, encoding="utf-8")
-                tts_url = f"https://fanyi.baidu.com/gettts?lan={lan}&text={encoded_word}&spd={spd}"
-
-                print(f"[{index}/{len(words)}] 正在下载：{word}")
-                
-                # 记录下载前的文件列表
-                before_download = set(os.listdir(save_dir))
-                
-                # 直接访问TTS URL，浏览器会自动下载
-                driver.get(tts_url)
-                
-                # 等待下载完成
-                time.sleep(5)
-                
-                # 查找新下载的文件
-                after_download = set(os.listdir(save_dir))
-                new_files = after_download - before_download
-                
-                # 重命名新下载的MP3文件
-                if new_files:
-                    for new_file in new_files:
-                        if new_file.endswith('.mp3'):
-                            old_path = os.path.join(save_dir, new_file)
-                            # 重命名为单词名称
-                            os.rename(old_path, save_path)
-                            break
-                
+                tts_url = f"{base_url}?lan={lan}&text={encoded_word}&spd={spd}"
+
+                print(f"[{index}/{total}] 正在下载：{word}")
+
+                try:
+                    fetch_tts_http(session, tts_url, save_path)
+                except Exception as e:
+                    if not use_selenium_fallback:
+                        raise
+                    print(f"[{index}/{total}] 直连失败（{str(e)}），改用浏览器下载...")
+                    if driver is None:
+                        driver = create_selenium_driver(save_dir)
+                    fetch_tts_selenium(driver, tts_url, save_dir, save_path)
+
                 # 检查文件是否下载成功
                 if os.path.exists(save_path) and os.path.getsize(save_path) > 1000:
                     file_size = os.path.getsize(save_path) // 1024
-                    print(f"[{index}/{len(words)}] 成功下载：{safe_filename} ({file_size}KB)")
+                    print(f"[{index}/{total}] 成功下载：{os.path.basename(save_path)} ({file_size}KB)")
+                    queue.complete(save_path)
+                    if cache is not None:
+                        cache.store(AudioCache.make_key(word, "baidu", lan, spd), save_path, word, "baidu", lan, spd)
                 else:
-                    print(f"[{index}/{len(words)}] 下载失败：{word}")
+                    print(f"[{index}/{total}] 下载失败：{word}")
+                    queue.fail(save_path, "下载的文件不存在或过小")
 
                 # 下载间隔
-                if index < len(words):
-                    print("等待5秒...")
-                    time.sleep(5)
+                if interval > 0:
+                    time.sleep(interval)
 
             except Exception as e:
-                print(f"[{index}/{len(words)}] 失败：{word}，错误信息：{str(e)}")
+                print(f"[{index}/{total}] 失败：{word}，错误信息：{str(e)}")
+                queue.fail(save_path, str(e))
+            reporter.maybe_report()
 
     finally:
-        # 关闭浏览器
-        driver.quit()
-        print("浏览器已关闭")
+        queue.release()
+        session.close()
+        if driver is not None:
+            # 关闭浏览器
+            driver.quit()
+            print("浏览器已关闭")
+        if cache is not None:
+            cache.save()
+    print(describe_progress(queue.progress()))
+
+    # 下载后处理：去掉首尾静音、统一响度（已处理过的文件直接跳过）
+    if processor is not None:
+        paths = [path for _, path in plan["words"]] if plan is not None else queue.paths("done")
+        processor.run([path for path in paths if os.path.exists(path)])
 
     print(f"\n批量下载完成！MP3文件已保存至：{os.path.abspath(save_dir)}")
 
@@ -117,6 +240,18 @@ if __name__ == "__main__":
     SAVE_DIRECTORY = "tts_mp3"  # 保存MP3的文件夹名
     SPEED = 3  # 语速（1-9，建议4-5）
     LANGUAGE = "uk"  # 语言（uk=英语，zh=中文，jp=日语等）
+    PROCESS_AUDIO = False  # 下载后去掉首尾静音、统一响度、转成低码率MP3（需要安装 av）
+    RESUME = False  # True：不读单词表，继续上次没下载完的单词（可以同时开几个进程一起下载）
+    RETRY_FAILED = False  # True：之前多次失败的单词重新下载
+    LIMIT = None  # 本次最多下载多少个单词（大单词表分批下载），None 表示不限
+
+    processor = None
+    if PROCESS_AUDIO:
+        from audio_normalize import AudioProcessor
+        processor = AudioProcessor()
 
-    # 调用函数开始下载
-    batch_download_tts(WORD_FILE, SAVE_DIRECTORY, LANGUAGE, SPEED)
\ No newline at end of file
+    # 调用函数开始下载（共享缓存默认放在用户目录下，多个单词表文件夹共用）
+    # 下载进度保存在用户目录下的队列数据库里，中断后重新运行会接着下载
+    queue = JobQueue(name=queue_name("baidu", SAVE_DIRECTORY, LANGUAGE, SPEED))
+    batch_download_tts(WORD_FILE, SAVE_DIRECTORY, LANGUAGE, SPEED, cache=AudioCache(), processor=processor,
+                       queue=queue, resume=RESUME, retry_failed=RETRY_FAILED, limit=LIMIT)
\ No newline at end of file
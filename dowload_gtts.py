@@ -1,93 +1,331 @@
 import os
+import io
 import time
 import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from gtts import gTTS
 from gtts.tokenizer import pre_processors
 import requests
 from urllib3.exceptions import ReadTimeoutError
+from audio_cache import AudioCache, DEFAULT_CACHE_DIR
+from word_list import build_plan, describe_plan, missing_sources
+from job_queue import JobQueue, ProgressReporter, queue_name, describe_progress, DEFAULT_DB_PATH as QUEUE_DB_PATH
 
-def batch_download_gtts(word_file_path, save_dir, lang="en", slow=False, max_retries=3, file_min_size=100):
+# 批量合成需要 av/numpy 做解码和切分，缺少时只能逐个下载
+try:
+    import audio_split
+    batch_support = True
+except ImportError:
+    batch_support = False
+
+
+class TokenBucket:
+    """
+    全局令牌桶限速器（线程安全），所有下载线程共用一个
+    :param rate: 每秒允许的请求数
+    :param burst: 允许的突发请求数（桶容量）
+    """
+    def __init__(self, rate, burst=1):
+        if not rate > 0:
+            raise ValueError(f"请求速率必须大于0: {rate}")
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取得一个令牌，桶空时阻塞到下一个令牌生成"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+
+def download_one_gtts(word, save_path, tag, lang="en", slow=False, max_retries=3, file_min_size=100, limiter=None,
+                      errors=None):
+    """
+    下载单个单词（在工作线程中执行），每次请求前先向限速器取令牌
+    :param tag: 日志前缀，如 "[3/120]"
+    :param errors: 失败时把最后的错误写进 errors[save_path]
+    :return: 是否成功
+    """
+    safe_filename = os.path.basename(save_path)
+    # 先写临时文件再原子替换：目标可能是共享缓存的硬链接，原地写会把缓存和其他单词表里的同一个文件一起截断
+    tmp_path = save_path + ".part"
+    for main_try in range(max_retries):  # 主循环：最多完整重试max_retries次
+        try:
+            print(f"{tag} 第{main_try+1}轮尝试生成：{word}")
+            if limiter is not None:
+                limiter.acquire()
+
+            # 生成语音
+            processed_text = pre_processors.word_sub(word)
+            tts = gTTS(text=processed_text, lang=lang, slow=slow, lang_check=True)
+            tts.save(tmp_path)
+
+            # 检查文件大小（关键：确保非空）
+            if os.path.getsize(tmp_path) < file_min_size:
+                raise Exception(f"生成的文件过小（{os.path.getsize(tmp_path)}字节），可能无效")
+            os.replace(tmp_path, save_path)
+
+            # 验证通过
+            file_size = os.path.getsize(save_path) // 1024
+            print(f"{tag} 成功生成：{safe_filename}（{file_size}KB）")
+            return True
+
+        except (requests.exceptions.RequestException, ReadTimeoutError, Exception) as e:
+            error_msg = str(e).split("\n")[0]
+            # 无论何种错误，先删除可能的无效文件
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            # 决定是否继续重试（退避只阻塞当前线程，带随机抖动避免各线程同时重试）
+            if main_try < max_retries - 1:
+                wait_time = random.uniform(2, 5) * (main_try + 1)
+                print(f"{tag} 第{main_try+1}次失败：{error_msg}，{wait_time:.1f}秒后重试...")
+                time.sleep(wait_time)
+            else:
+                print(f"{tag} 达到最大重试次数，跳过：{word}（最后错误：{error_msg}）")
+                if errors is not None:
+                    errors[save_path] = error_msg
+    return False
+
+
+def download_batch_gtts(batch, total, lang="en", slow=False, max_retries=3, file_min_size=100, limiter=None,
+                        errors=None):
+    """
+    一次请求合成一组单词（单词之间用句号隔开产生停顿），再按静音切成单个MP3
+    切分或校验不通过时，这一组退回逐个下载
+    :param batch: [(序号, 单词, 保存路径), ...]
+    :return: 与 batch 一一对应的成功标志列表
+    """
+    def one_by_one():
+        return [download_one_gtts(word, save_path, f"[{index}/{total}]", lang, slow, max_retries, file_min_size, limiter,
+                                  errors)
+                for index, word, save_path in batch]
+
+    if len(batch) == 1 or not batch_support:
+        return one_by_one()
+
+    tag = f"[{batch[0][0]}-{batch[-1][0]}/{total}]"
+    try:
+        print(f"{tag} 批量生成 {len(batch)} 个单词")
+        if limiter is not None:
+            limiter.acquire()
+        text = ". ".join(pre_processors.word_sub(word) for _, word, _ in batch)
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang, slow=slow, lang_check=True).write_to_fp(buffer)
+        buffer.seek(0)
+
+        # 按静音切分，并逐段检查时长和音量
+        samples = audio_split.decode_mono(buffer)
+        segments = audio_split.split_on_silence(samples, len(batch))
+        if segments is None:
+            raise Exception("无法按静音切分成单个单词")
+        pieces = [samples[start:end] for start, end in segments]
+        if not all(audio_split.validate_segment(piece) for piece in pieces):
+            raise Exception("切分后的片段时长或音量异常")
+
+        for (index, word, save_path), piece in zip(batch, pieces):
+            audio_split.encode_mp3(piece, save_path)
+            if os.path.getsize(save_path) < file_min_size:
+                raise Exception(f"{word} 的文件过小（{os.path.getsize(save_path)}字节），可能无效")
+        print(f"{tag} 批量生成成功：{', '.join(word for _, word, _ in batch)}")
+        return [True] * len(batch)
+
+    except (requests.exceptions.RequestException, ReadTimeoutError, Exception) as e:
+        error_msg = str(e).split("\n")[0]
+        for _, _, save_path in batch:
+            if os.path.exists(save_path):
+                os.remove(save_path)
+        print(f"{tag} 批量生成失败：{error_msg}，改为逐个下载")
+        return one_by_one()
+
+
+def pack_batches(jobs, batch_size, max_chars=gTTS.GOOGLE_TTS_MAX_CHARS):
+    """
+    把待下载单词按顺序分组：每组不超过 batch_size 个，拼接后的文本不超过 max_chars
+    （gTTS 超过 100 字符会拆成多次请求，批量就没有意义了）
+    """
+    batches = []
+    current = []
+    length = 0
+    for job in jobs:
+        extra = len(job[1]) + (2 if current else 0)
+        if current and (len(current) >= batch_size or length + extra > max_chars):
+            batches.append(current)
+            current = []
+            extra = len(job[1])
+            length = 0
+        current.append(job)
+        length += extra
+    if current:
+        batches.append(current)
+    return batches
+
+
+def batch_download_gtts(word_file_path, save_dir, lang="en", slow=False, max_retries=3, file_min_size=100,
+                        workers=4, rate=1.0, cache=None, batch_size=1, processor=None,
+                        queue=None, resume=False, retry_failed=False, limit=None, max_wait=120):
     """
     批量使用gTTS生成语音文件（增加空文件检查和自动重试）
+    :param word_file_path: 单词表路径，或多个单词表的列表（跨单词表去重）
+    :param max_retries: 每个单词最多尝试几次（不用持久队列时）；重试都由队列按退避时间安排，
+                        传了 queue 时按 queue 的 max_attempts 计数
     :param file_min_size: 最小文件大小（字节），小于此值视为无效文件
+    :param workers: 并发下载线程数
+    :param rate: 全局请求速率上限（次/秒），所有线程共享
+    :param cache: AudioCache 实例，命中时直接从缓存链接/复制，不发请求；None 表示不用缓存
+    :param batch_size: 每次请求合成的单词数，大于1时按静音切分（需要安装 av）
+    :param processor: AudioProcessor 实例，下载完成后去掉首尾静音、统一响度；None 表示不处理
+    :param queue: JobQueue 实例，持久保存每个单词的下载状态（中断后继续、多个进程一起下载）；None 表示只在内存里排队
+    :param resume: 不读单词表，直接继续队列里没完成的单词
+    :param retry_failed: 之前超过重试次数的单词重新排队
+    :param limit: 本次最多下载的单词数（很大的单词表分几次下载），None 表示不限
+    :param max_wait: 剩下的单词都在等待重试时，最多等多少秒，超过就先退出（下次运行再试）
     """
-    if not os.path.exists(word_file_path):
-        print(f"错误：单词文件 {word_file_path} 不存在！")
-        return
+    speed = "slow" if slow else "normal"
+    if queue is None:
+        queue = JobQueue(":memory:", queue_name("gtts", save_dir, lang, speed), max_attempts=max_retries)
     os.makedirs(save_dir, exist_ok=True)
     print(f"保存目录：{os.path.abspath(save_dir)}")
 
-    with open(word_file_path, "r", encoding="utf-8") as f:
-        words = [line.strip() for line in f if line.strip()]
-    if not words:
-        print("错误：未找到有效单词！")
-        return
-    print(f"共读取到 {len(words)} 个单词，开始生成语音...\n")
-
-    for index, word in enumerate(words, 1):
-        safe_filename = word.replace("/", "-").replace("\\", "-").replace("?", "").replace("*", "").replace(":", "").replace("\"", "").replace("<", "").replace(">", "").replace("|", "") + ".mp3"
-        save_path = os.path.join(save_dir, safe_filename)
-
-        # 检查已有文件是否有效（即使存在，若为空也需要重新下载）
-        if os.path.exists(save_path):
-            if os.path.getsize(save_path) >= file_min_size:
-                print(f"[{index}/{len(words)}] 已存在有效文件，跳过：{word}")
-                continue
-            else:
-                print(f"[{index}/{len(words)}] 发现空文件，将重新下载：{word}")
+    plan = None
+    if not resume:
+        word_files = [word_file_path] if isinstance(word_file_path, str) else list(word_file_path)
+        missing = missing_sources(word_files)
+        if missing:
+            print(f"错误：单词文件 {missing[0]} 不存在！")
+            return
+
+        # 一次遍历所有单词表：去重、检查文件名冲突、过滤掉已有的有效文件
+        plan = build_plan(word_files, save_dir, file_min_size)
+        if not plan["words"]:
+            print("错误：未找到有效单词！")
+            return
+        print(describe_plan(plan))
+
+        jobs = []
+        invalid = set(plan["invalid"])
+        total = len(plan["words"])
+        pending = {save_path for _, _, save_path in plan["jobs"]}
+        skipped = [save_path for _, save_path in plan["words"] if save_path not in pending]  # 已有有效文件
+        for index, word, save_path in plan["jobs"]:
+            if save_path in invalid:
+                print(f"[{index}/{total}] 发现空文件，将重新下载：{word}")
                 os.remove(save_path)  # 删除无效文件
 
-        # 核心下载逻辑（增加空文件检查的重试）
-        success = False
-        for main_try in range(max_retries):  # 主循环：最多完整重试max_retries次
-            try:
-                print(f"[{index}/{len(words)}] 第{main_try+1}轮尝试生成：{word}")
-                
-                # 生成语音
-                processed_text = pre_processors.word_sub(word)
-                tts = gTTS(text=processed_text, lang=lang, slow=slow, lang_check=True)
-                tts.save(save_path)
-                
-                # 检查文件大小（关键：确保非空）
-                if os.path.getsize(save_path) < file_min_size:
-                    raise Exception(f"生成的文件过小（{os.path.getsize(save_path)}字节），可能无效")
-
-                # 验证通过
-                file_size = os.path.getsize(save_path) // 1024
-                print(f"[{index}/{len(words)}] 成功生成：{safe_filename}（{file_size}KB）")
-                success = True
-                break
-
-            except (requests.exceptions.RequestException, ReadTimeoutError, Exception) as e:
-                error_msg = str(e).split("\n")[0]
-                # 无论何种错误，先删除可能的无效文件
-                if os.path.exists(save_path):
-                    os.remove(save_path)
-                # 决定是否继续重试
-                if main_try < max_retries - 1:
-                    wait_time = random.uniform(2, 5) * (main_try + 1)
-                    print(f"[{index}/{len(words)}] 第{main_try+1}次失败：{error_msg}，{wait_time:.1f}秒后重试...")
-                    time.sleep(wait_time)
-                else:
-                    print(f"[{index}/{len(words)}] 达到最大重试次数，跳过：{word}（最后错误：{error_msg}）")
-
-        # 最终检查：如果所有尝试都失败，记录下来（方便后续手动处理）
-        if not success:
-            with open(os.path.join(save_dir, "failed_words.txt"), "a", encoding="utf-8") as f:
-                f.write(f"{word}\n")
-
-        # 随机延迟
-        if index < len(words):
-            time.sleep(random.uniform(1, 3))
+            # 其他单词表已经下载过的单词，直接从缓存取
+            if cache is not None:
+                cache_key = AudioCache.make_key(word, "gtts", lang, speed)
+                if cache.materialize(cache_key, save_path) and os.path.getsize(save_path) >= file_min_size:
+                    print(f"[{index}/{total}] 缓存命中，跳过下载：{word}")
+                    skipped.append(save_path)
+                    continue
+            jobs.append((index, word, save_path))
+        queue.add(jobs)
+        queue.skip(skipped)  # 之前中断时还没下载、这次已经有文件的单词
 
-    # 提示失败的单词（如果有）
+    if retry_failed:
+        print(f"之前失败的 {queue.retry_failed()} 个单词重新排队")
+    progress = queue.progress()
+    print(describe_progress(progress))
+    if progress["failed"] and not retry_failed:
+        print(f"（{progress['failed']} 个单词之前多次失败，加 --retry-failed 重新下载）")
+    total = len(plan["words"]) if plan is not None else progress["total"]
+    print(f"开始生成语音（{workers}线程，限速{rate}次/秒）...\n")
+
+    if batch_size > 1 and not batch_support:
+        print("提示：未安装 av，无法批量合成，改为逐个下载")
+    batch_size = batch_size if batch_support else 1
+
+    limiter = TokenBucket(rate)
+    reporter = ProgressReporter(queue)
+    stop = threading.Event()
+    budget_lock = threading.Lock()
+    budget = [float("inf") if limit is None else limit]  # 本次还能领取的单词数
+    failed_words = {}
+    errors = {}
+
+    def take_budget(count):
+        with budget_lock:
+            count = int(min(count, budget[0]))
+            budget[0] -= count
+            return count
+
+    def give_back(count):
+        with budget_lock:
+            budget[0] += count
+
+    def worker():
+        """每个线程从队列领取一组单词下载，队列空了（或到了 limit）就退出"""
+        while not stop.is_set():
+            count = take_budget(batch_size)
+            if count == 0:
+                return
+            claimed = queue.claim(count)
+            give_back(count - len(claimed))
+            if not claimed:
+                wait = queue.next_wait()
+                if wait is None or wait > max_wait:
+                    return
+                stop.wait(min(max(wait, 0.1), 1.0))
+                continue
+            for batch in pack_batches(claimed, batch_size):
+                # 每次只试一次，失败交给队列退避重试，不在线程里再嵌套一层重试
+                results = download_batch_gtts(batch, total, lang, slow, 1, file_min_size, limiter, errors)
+                for (index, word, save_path), ok in zip(batch, results):
+                    if ok:
+                        queue.complete(save_path)
+                        if cache is not None:
+                            cache.store(AudioCache.make_key(word, "gtts", lang, speed), save_path, word, "gtts", lang, speed)
+                    elif queue.fail(save_path, errors.pop(save_path, "下载失败")) == "failed":
+                        failed_words[index] = word
+                reporter.maybe_report()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(worker) for _ in range(max(1, workers))]
+            for future in as_completed(futures):
+                future.result()
+    except KeyboardInterrupt:
+        stop.set()
+        print("\n已中断，正在下载的单词放回队列，下次运行会继续")
+        raise
+    finally:
+        stop.set()
+        queue.release()
+        if cache is not None:
+            cache.save()
+    print(describe_progress(queue.progress()))
+
+    # 最终检查：如果所有尝试都失败，记录下来（方便后续手动处理），按原列表顺序写入
     failed_file = os.path.join(save_dir, "failed_words.txt")
+    if failed_words:
+        with open(failed_file, "a", encoding="utf-8") as f:
+            for index in sorted(failed_words):
+                f.write(f"{failed_words[index]}\n")
+
+    # 提示失败的单词（如果有）
     if os.path.exists(failed_file) and os.path.getsize(failed_file) > 0:
         print(f"\n注意：部分单词下载失败，已记录至 {failed_file}")
     else:
         if os.path.exists(failed_file):
             os.remove(failed_file)  # 删除空的失败记录
 
+    # 下载后处理：去掉首尾静音、统一响度（已处理过的文件直接跳过）
+    if processor is not None:
+        paths = [path for _, path in plan["words"]] if plan is not None else queue.paths("done")
+        processor.run([path for path in paths if os.path.exists(path)])
+
     print(f"\n全部处理完成！文件保存至：{os.path.abspath(save_dir)}")
 
 # 执行脚本
@@ -96,11 +334,54 @@ if __name__ == "__main__":
     SAVE_DIRECTORY = "gtts_mp3"
     LANGUAGE = "en"  # 英语
     SLOW_SPEECH = False
+
+    parser = argparse.ArgumentParser(description="批量使用gTTS生成单词语音")
+    parser.add_argument("--words", nargs="+", default=[WORD_FILE], help="单词文件路径（可以多个，也可以是压缩包，跨文件去重）")
+    parser.add_argument("--save-dir", default=SAVE_DIRECTORY, help="MP3保存目录")
+    parser.add_argument("--lang", default=LANGUAGE, help="语言")
+    parser.add_argument("--slow", action="store_true", default=SLOW_SPEECH, help="慢速朗读")
+    parser.add_argument("--workers", type=int, default=4, help="并发下载线程数")
+    parser.add_argument("--rate", type=float, default=1.0, help="全局请求速率上限（次/秒）")
+    parser.add_argument("--batch-size", type=int, default=1, help="每次请求合成的单词数（>1 时按静音切分）")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="共享音频缓存目录")
+    parser.add_argument("--cache-size-mb", type=int, default=2048, help="缓存容量上限（MB），超出按LRU淘汰")
+    parser.add_argument("--no-cache", action="store_true", help="不使用共享缓存")
+    parser.add_argument("--process", action="store_true", help="下载后去掉首尾静音、统一响度、转成低码率MP3（需要安装 av）")
+    parser.add_argument("--process-workers", type=int, default=None, help="音频处理进程数（默认CPU核数）")
+    parser.add_argument("--bit-rate", type=int, default=32000, help="处理后的MP3码率")
+    parser.add_argument("--queue-db", default=QUEUE_DB_PATH, help="下载队列数据库（记录每个单词的下载状态）")
+    parser.add_argument("--no-queue", action="store_true", help="不保存下载进度（只在内存里排队）")
+    parser.add_argument("--resume", action="store_true", help="不读单词表，继续上次没下载完的单词")
+    parser.add_argument("--retry-failed", action="store_true", help="之前多次失败的单词重新下载")
+    parser.add_argument("--limit", type=int, default=None, help="本次最多下载多少个单词（大单词表分批下载）")
+    args = parser.parse_args()
+    if not args.rate > 0:
+        parser.error(f"--rate 必须大于0（当前 {args.rate}）")
+    if args.batch_size < 1:
+        parser.error(f"--batch-size 必须大于等于1（当前 {args.batch_size}）")
+
+    processor = None
+    if args.process:
+        from audio_normalize import AudioProcessor
+        processor = AudioProcessor(workers=args.process_workers, bit_rate=args.bit_rate)
+    queue = None
+    if not args.no_queue:
+        queue = JobQueue(args.queue_db, queue_name("gtts", args.save_dir, args.lang, "slow" if args.slow else "normal"))
+
     batch_download_gtts(
-        word_file_path=WORD_FILE,
-        save_dir=SAVE_DIRECTORY,
-        lang=LANGUAGE,
-        slow=SLOW_SPEECH,
+        word_file_path=args.words,
+        save_dir=args.save_dir,
+        lang=args.lang,
+        slow=args.slow,
         max_retries=3,  # 最多重试3次
-        file_min_size=200  # 最小文件大小（字节），可根据实际情况调整
+        file_min_size=200,  # 最小文件大小（字节），可根据实际情况调整
+        workers=args.workers,
+        rate=args.rate,
+        batch_size=args.batch_size,
+        cache=None if args.no_cache else AudioCache(args.cache_dir, args.cache_size_mb * 1024 * 1024),
+        processor=processor,
+        queue=queue,
+        resume=args.resume,
+        retry_failed=args.retry_failed,
+        limit=args.limit
     )
@@ -0,0 +1,343 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from audio_cache import AudioCache, DEFAULT_CACHE_DIR
+from word_list import build_plan, describe_plan, missing_sources
+from job_queue import JobQueue, ProgressReporter, queue_name, describe_progress, DEFAULT_DB_PATH as QUEUE_DB_PATH
+
+# 合成的 WAV 要解码、重新编码成 MP3，需要 av/numpy
+try:
+    import audio_split
+    encode_support = True
+except ImportError:
+    encode_support = False
+
+ENGINES = ("espeak-ng", "piper")
+DEFAULT_VOICES = {"espeak-ng": "en-us", "piper": None}  # piper 的 voice 是模型文件（.onnx）路径，必须指定
+ESPEAK_WPM = {"normal": 150, "slow": 110}  # 每分钟单词数
+PIPER_LENGTH_SCALE = {"normal": 1.0, "slow": 1.4}  # 越大越慢
+SYNTH_TIMEOUT = 60  # 一次合成最多等多少秒
+
+
+def find_engine(engine, executable=None):
+    """
+    找到本地TTS程序的路径（espeak-ng 找不到时也接受旧版 espeak）
+    :return: 可执行文件路径，找不到时返回 None
+    """
+    if executable:
+        return shutil.which(executable)
+    names = ["espeak-ng", "espeak"] if engine == "espeak-ng" else [engine]
+    for name in names:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def describe_error(executable, error):
+    """合成失败的原因（一行）"""
+    if isinstance(error, subprocess.CalledProcessError):
+        stderr = error.stderr.decode("utf-8", "replace").strip().splitlines() if error.stderr else []
+        return f"{os.path.basename(executable)} 返回 {error.returncode}" + (f"：{stderr[-1]}" if stderr else "")
+    return str(error).split("\n")[0]
+
+
+def run_piper(executable, items, voice, speed):
+    lines = "\n".join(json.dumps({"text": word, "output_file": wav_path}, ensure_ascii=False)
+                      for word, wav_path in items)
+    subprocess.run([executable, "--model", voice, "--json-input", "--length_scale", str(PIPER_LENGTH_SCALE[speed])],
+                   input=(lines + "\n").encode("utf-8"), capture_output=True,
+                   timeout=SYNTH_TIMEOUT * max(1, len(items) // 10), check=True)
+
+
+def synthesize_wav(engine, executable, items, voice, speed):
+    """
+    调用本地TTS程序把每个单词合成为 WAV
+    - espeak-ng 启动很快，每个单词调用一次，出错只算这个单词失败
+    - piper 每次启动都要加载模型，一组单词用 --json-input 一次合成，每行指定自己的输出文件；
+      整组失败时再逐个重试，找出真正合成不了的单词（不连累同组的其他单词）
+    :param items: [(单词, wav路径), ...]
+    :return: 与 items 一一对应的 None（成功）或错误信息
+    """
+    errors = [None] * len(items)
+    if engine == "espeak-ng":
+        for i, (word, wav_path) in enumerate(items):
+            try:
+                subprocess.run([executable, "-v", voice, "-s", str(ESPEAK_WPM[speed]), "-w", wav_path, "--stdin"],
+                               input=word.encode("utf-8"), capture_output=True, timeout=SYNTH_TIMEOUT, check=True)
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+                errors[i] = describe_error(executable, e)
+        return errors
+    try:
+        run_piper(executable, items, voice, speed)
+        return errors
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+        if len(items) == 1 or isinstance(e, FileNotFoundError):
+            return [describe_error(executable, e)] * len(items)
+    for i, item in enumerate(items):
+        try:
+            run_piper(executable, [item], voice, speed)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+            errors[i] = describe_error(executable, e)
+    return errors
+
+
+def synthesize_batch(engine, executable, batch, voice, speed, bit_rate=32000, file_min_size=100):
+    """
+    进程池里执行：合成一组单词 → 解码 WAV → 编码成 MP3 直接写到保存路径（先写临时文件再原子重命名）
+    :param batch: [(序号, 单词, 保存路径), ...]
+    :return: 与 batch 一一对应的 None（成功）或错误信息
+    """
+    workdir = tempfile.mkdtemp(prefix="local_tts_")
+    try:
+        items = [(word, os.path.join(workdir, f"{i}.wav")) for i, (_, word, _) in enumerate(batch)]
+        errors = synthesize_wav(engine, executable, items, voice, speed)
+
+        results = []
+        for (index, word, save_path), (_, wav_path), error in zip(batch, items, errors):
+            if error is not None:
+                results.append(error)
+                continue
+            try:
+                if not os.path.exists(wav_path):
+                    raise Exception("没有生成 WAV 文件")
+                samples = audio_split.decode_mono(wav_path)
+                if not audio_split.validate_segment(samples, max_duration=10.0):
+                    raise Exception("合成的声音时长或音量异常")
+                audio_split.encode_mp3(samples, save_path, bit_rate=bit_rate)
+                size = os.path.getsize(save_path)
+                if size < file_min_size:
+                    os.remove(save_path)
+                    raise Exception(f"生成的文件过小（{size}字节），可能无效")
+                results.append(None)
+            except Exception as e:
+                results.append(str(e).split("\n")[0])
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def batch_download_local(word_file_path, save_dir, engine="espeak-ng", voice=None, slow=False, file_min_size=100,
+                         workers=None, batch_size=20, bit_rate=32000, executable=None, cache=None, processor=None,
+                         queue=None, resume=False, retry_failed=False, limit=None, max_wait=0):
+    """
+    用本地TTS程序（espeak-ng / piper）批量生成单词语音，不联网、不限速，和 batch_download_gtts 用法相同
+    - 按CPU核数开进程池，每个进程合成一组单词并编码成 MP3，速度只受CPU限制
+    - 输出到同样的 单词.mp3 目录结构，共用单词表检查、共享缓存、下载队列和下载后处理
+    :param engine: "espeak-ng" 或 "piper"
+    :param voice: espeak-ng 的语音名（默认 en-us），或 piper 的模型文件路径
+    :param workers: 合成进程数（默认CPU核数）
+    :param batch_size: 每个进程一次合成的单词数（piper 一组只加载一次模型）
+    :param executable: TTS程序路径，默认在 PATH 里找
+    :param max_wait: 剩下的单词都在等待重试时，最多等多少秒（本地合成失败一般不是临时问题，默认不等，下次运行再试）
+    其余参数同 batch_download_gtts
+    """
+    if engine not in ENGINES:
+        print(f"错误：不支持的合成引擎 {engine}（可用：{', '.join(ENGINES)}）")
+        return
+    program = find_engine(engine, executable)
+    if program is None:
+        print(f"错误：找不到 {executable or engine}，请先安装（例如 apt install espeak-ng / pip install piper-tts）")
+        return
+    voice = voice or DEFAULT_VOICES[engine]
+    if voice is None:
+        print("错误：piper 需要用 --voice 指定模型文件（.onnx）")
+        return
+    if not encode_support:
+        print("错误：未安装 av / numpy，无法把合成结果编码成 MP3")
+        return
+
+    speed = "slow" if slow else "normal"
+    if queue is None:
+        queue = JobQueue(":memory:", queue_name(engine, save_dir, voice, speed))
+    os.makedirs(save_dir, exist_ok=True)
+    print(f"保存目录：{os.path.abspath(save_dir)}")
+
+    plan = None
+    if not resume:
+        word_files = [word_file_path] if isinstance(word_file_path, str) else list(word_file_path)
+        missing = missing_sources(word_files)
+        if missing:
+            print(f"错误：单词文件 {missing[0]} 不存在！")
+            return
+
+        # 一次遍历所有单词表：去重、检查文件名冲突、过滤掉已有的有效文件
+        plan = build_plan(word_files, save_dir, file_min_size)
+        if not plan["words"]:
+            print("错误：未找到有效单词！")
+            return
+        print(describe_plan(plan))
+
+        jobs = []
+        invalid = set(plan["invalid"])
+        total = len(plan["words"])
+        pending = {save_path for _, _, save_path in plan["jobs"]}
+        skipped = [save_path for _, save_path in plan["words"] if save_path not in pending]  # 已有有效文件
+        for index, word, save_path in plan["jobs"]:
+            if save_path in invalid:
+                print(f"[{index}/{total}] 发现空文件，将重新生成：{word}")
+                os.remove(save_path)
+
+            if cache is not None:
+                cache_key = AudioCache.make_key(word, engine, voice, speed)
+                if cache.materialize(cache_key, save_path) and os.path.getsize(save_path) >= file_min_size:
+                    print(f"[{index}/{total}] 缓存命中，跳过合成：{word}")
+                    skipped.append(save_path)
+                    continue
+            jobs.append((index, word, save_path))
+        queue.add(jobs)
+        queue.skip(skipped)  # 之前中断时还没下载、这次已经有文件的单词
+
+    if retry_failed:
+        print(f"之前失败的 {queue.retry_failed()} 个单词重新排队")
+    progress = queue.progress()
+    print(describe_progress(progress))
+    if progress["failed"] and not retry_failed:
+        print(f"（{progress['failed']} 个单词之前多次失败，加 --retry-failed 重新生成）")
+    total = len(plan["words"]) if plan is not None else progress["total"]
+    workers = max(1, workers or os.cpu_count() or 1)
+    print(f"开始本地合成（{engine}，语音 {voice}，{workers}进程）...\n")
+
+    reporter = ProgressReporter(queue)
+    budget = float("inf") if limit is None else limit  # 本次还能领取的单词数
+    failed_words = {}
+    running = {}  # Future → 这一组的任务
+    start = time.perf_counter()
+    generated = 0
+
+    def finish(batch, results):
+        nonlocal generated
+        for (index, word, save_path), error in zip(batch, results):
+            if error is None:
+                generated += 1
+                queue.complete(save_path)
+                if cache is not None:
+                    cache.store(AudioCache.make_key(word, engine, voice, speed), save_path, word, engine, voice, speed)
+                print(f"[{index}/{total}] 成功生成：{os.path.basename(save_path)}（{os.path.getsize(save_path) // 1024}KB）")
+            else:
+                print(f"[{index}/{total}] 生成失败：{word}（{error}）")
+                if queue.fail(save_path, error) == "failed":
+                    failed_words[index] = word
+        reporter.maybe_report()
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            # 每个进程保持两组在排队，进程做完一组马上有下一组
+            while len(running) < workers * 2 and budget > 0:
+                claimed = queue.claim(int(min(batch_size, budget)))
+                if not claimed:
+                    break
+                budget -= len(claimed)
+                future = executor.submit(synthesize_batch, engine, program, claimed, voice, speed, bit_rate, file_min_size)
+                running[future] = claimed
+            if not running:
+                wait_time = queue.next_wait() if budget > 0 else None
+                if wait_time is None or wait_time > max_wait:
+                    break
+                time.sleep(min(max(wait_time, 0.1), 1.0))
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = running.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    results = [str(e).split("\n")[0] or type(e).__name__] * len(batch)
+                finish(batch, results)
+    except KeyboardInterrupt:
+        print("\n已中断，正在合成的单词放回队列，下次运行会继续")
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        queue.release()
+        if cache is not None:
+            cache.save()
+    elapsed = time.perf_counter() - start
+    print(describe_progress(queue.progress()))
+    if generated:
+        print(f"本次合成 {generated} 个单词，用时 {elapsed:.1f} 秒（{generated / elapsed:.1f} 个/秒）")
+
+    # 最终检查：如果所有尝试都失败，记录下来（方便后续手动处理），按原列表顺序写入
+    failed_file = os.path.join(save_dir, "failed_words.txt")
+    if failed_words:
+        with open(failed_file, "a", encoding="utf-8") as f:
+            for index in sorted(failed_words):
+                f.write(f"{failed_words[index]}\n")
+
+    if os.path.exists(failed_file) and os.path.getsize(failed_file) > 0:
+        print(f"\n注意：部分单词合成失败，已记录至 {failed_file}")
+    elif os.path.exists(failed_file):
+        os.remove(failed_file)  # 删除空的失败记录
+
+    # 合成后处理：去掉首尾静音、统一响度（已处理过的文件直接跳过）
+    if processor is not None:
+        paths = [path for _, path in plan["words"]] if plan is not None else queue.paths("done")
+        processor.run([path for path in paths if os.path.exists(path)])
+
+    print(f"\n全部处理完成！文件保存至：{os.path.abspath(save_dir)}")
+
+
+# 执行脚本
+if __name__ == "__main__":
+    WORD_FILE = "words.txt"
+    SAVE_DIRECTORY = "local_mp3"
+
+    parser = argparse.ArgumentParser(description="用本地TTS程序（espeak-ng / piper）批量生成单词语音，不需要联网")
+    parser.add_argument("--words", nargs="+", default=[WORD_FILE], help="单词文件路径（可以多个，也可以是压缩包，跨文件去重）")
+    parser.add_argument("--save-dir", default=SAVE_DIRECTORY, help="MP3保存目录")
+    parser.add_argument("--engine", choices=ENGINES, default="espeak-ng", help="合成引擎")
+    parser.add_argument("--voice", default=None, help="espeak-ng 的语音名（默认 en-us，英音用 en-gb），或 piper 的模型文件路径")
+    parser.add_argument("--executable", default=None, help="TTS程序路径（默认在 PATH 里找）")
+    parser.add_argument("--slow", action="store_true", help="慢速朗读")
+    parser.add_argument("--workers", type=int, default=None, help="合成进程数（默认CPU核数）")
+    parser.add_argument("--batch-size", type=int, default=20, help="每个进程一次合成的单词数")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="共享音频缓存目录")
+    parser.add_argument("--cache-size-mb", type=int, default=2048, help="缓存容量上限（MB），超出按LRU淘汰")
+    parser.add_argument("--no-cache", action="store_true", help="不使用共享缓存")
+    parser.add_argument("--process", action="store_true", help="合成后去掉首尾静音、统一响度、转成低码率MP3")
+    parser.add_argument("--process-workers", type=int, default=None, help="音频处理进程数（默认CPU核数）")
+    parser.add_argument("--bit-rate", type=int, default=32000, help="MP3码率")
+    parser.add_argument("--queue-db", default=QUEUE_DB_PATH, help="任务队列数据库（记录每个单词的合成状态）")
+    parser.add_argument("--no-queue", action="store_true", help="不保存进度（只在内存里排队）")
+    parser.add_argument("--resume", action="store_true", help="不读单词表，继续上次没合成完的单词")
+    parser.add_argument("--retry-failed", action="store_true", help="之前多次失败的单词重新合成")
+    parser.add_argument("--limit", type=int, default=None, help="本次最多合成多少个单词（大单词表分批合成）")
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error(f"--batch-size 必须大于等于1（当前 {args.batch_size}）")
+    if args.workers is not None and args.workers < 1:
+        parser.error(f"--workers 必须大于等于1（当前 {args.workers}）")
+
+    processor = None
+    if args.process:
+        from audio_normalize import AudioProcessor
+        processor = AudioProcessor(workers=args.process_workers, bit_rate=args.bit_rate)
+    voice = args.voice or DEFAULT_VOICES[args.engine]
+    queue = None
+    if not args.no_queue and voice is not None:
+        queue = JobQueue(args.queue_db, queue_name(args.engine, args.save_dir, voice, "slow" if args.slow else "normal"))
+
+    batch_download_local(
+        word_file_path=args.words,
+        save_dir=args.save_dir,
+        engine=args.engine,
+        voice=voice,
+        slow=args.slow,
+        file_min_size=200,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        bit_rate=args.bit_rate,
+        executable=args.executable,
+        cache=None if args.no_cache else AudioCache(args.cache_dir, args.cache_size_mb * 1024 * 1024),
+        processor=processor,
+        queue=queue,
+        resume=args.resume,
+        retry_failed=args.retry_failed,
+        limit=args.limit
+    )
@@ -1,11 +1,21 @@
 import os
 import sys
-import glob
-import pygame
 import tkinter as tk
 from tkinter import filedialog, scrolledtext
 import platform
 from ctypes import byref, windll, c_long
+from prefetch import Prefetcher
+from word_library import WordLibrary
+from folder_watch import FolderWatcher, DRAIN_INTERVAL_MS
+from scheduler import ReviewScheduler
+from session_journal import SessionJournal
+from answer_analysis import ConfusionIndex
+from practice_session import PracticeSession
+from console_log import LogBuffer, LOG_FLUSH_MS
+from telemetry import Telemetry, ANSWER_TO_AUDIO, OVERLAY_INTERVAL_MS, overlay_enabled
+from lazy_startup import warm_up_imports, startup_probe_path, write_startup_probe
+from audio_engine import create_engine
+from zip_source import audio_exists, is_zip_source
 
 # 尝试导入Windows标题栏修改所需模块
 try:
@@ -21,21 +31,33 @@ class SpellingApp:
     def __init__(self, root):
         # 初始化核心变量
         self.root = root
-        self.words = []
-        self.current_index = 0
-        self.error_count = 0
-        self.max_errors = 3
-        self.is_playing = False
-        self.is_completed = False
-        self.wrong_words = []
         self.current_folder = ""
-        
-        # 初始化音频模块
-        pygame.mixer.init()
+        self.library = WordLibrary()  # 持久化单词索引，文件夹没变化时不再扫描
+        self.watcher = None  # 练习中监视文件夹，边下载边练习
+        self.scheduler = ReviewScheduler()  # 间隔重复复习计划，决定单词出现顺序
+        self.journal = SessionJournal()  # 作答记录，崩溃或直接关闭后可以接着练
+        self.confusions = ConfusionIndex()  # 拼写错误统计（哪些字母常写错），跨练习累计
+        # 练习状态（当前单词、错误次数、错词）和判断逻辑，与练习服务器共用
+        self.session = PracticeSession(self.scheduler, self.journal, self.confusions, max_errors=3)
+        self.log_buffer = LogBuffer()  # 日志先进缓冲区，定时批量写进控制台
+        # 播放后端：自动选可用的最低延迟后端，第一次播放时才导入模块、打开设备
+        self.audio = create_engine(on_error=self.log)
+        # 答题到出声各阶段的耗时统计（一直开着，F12 显示浮层，退出时导出）
+        self.telemetry = Telemetry()
+        self.audio.telemetry = self.telemetry
+        self.latency_job = None  # 浮层定时刷新的 after id，隐藏时为 None
+        self.prefetcher = Prefetcher(self.audio.load)  # 用户输入时在后台准备接下来的单词
         
         # 初始化UI（含隐藏标题栏）
         self.init_ui()
+        self.root.after(LOG_FLUSH_MS, self.flush_log)
+        self.root.after(DRAIN_INTERVAL_MS, self.merge_folder_changes)
         self.log("请选择包含MP3文件的文件夹开始练习")
+        self.log(f"🔊 音频后端: {self.audio.name}")
+        if overlay_enabled():
+            self.toggle_latency_overlay()
+        # 先把界面显示出来，再恢复上次的练习（会触发第一次播放）
+        self.root.after_idle(self.resume_last_session)
 
     def init_ui(self):
         """初始化UI：隐藏标题栏、完全居中、纯黑背景"""
@@ -149,6 +171,9 @@ class SpellingApp:
         self.select_btn = tk.Button(button_frame, text="选择文件夹", **button_style, command=self.select_folder)
         self.select_btn.pack(side=tk.LEFT, padx=4)
         
+        self.zip_btn = tk.Button(button_frame, text="打开压缩包", **button_style, command=self.select_zip)
+        self.zip_btn.pack(side=tk.LEFT, padx=4)
+        
         self.replay_btn = tk.Button(button_frame, text="重新播放", **button_style, command=self.replay_current)
         self.replay_btn.pack(side=tk.LEFT, padx=4)
         
@@ -157,8 +182,14 @@ class SpellingApp:
 
         # 练习完成后显示的按钮（初始隐藏）
         self.restart_btn = tk.Button(button_frame, text="再来一次", **button_style, command=self.restart_practice)
+        self.wrong_only_btn = tk.Button(button_frame, text="练习错词", **button_style, command=self.practice_wrong_words)
         self.copy_btn = tk.Button(button_frame, text="复制错词", **button_style, command=self.copy_wrong_words)
 
+        # 延迟浮层（初始隐藏，F12 切换）
+        self.latency_label = tk.Label(main_frame, text="", font=("Consolas", 10), fg="#8fbc8f", bg="#000000",
+                                      anchor=tk.W, justify=tk.LEFT)
+        self.root.bind("<F12>", lambda event: self.toggle_latency_overlay())
+
         # 7. 窗口完全居中（上下+左右）
         self.center_window()
 
@@ -177,30 +208,48 @@ class SpellingApp:
 
     # ---------------------- 原有核心功能逻辑（保持不变） ----------------------
     def log(self, message):
-        self.console.config(state=tk.NORMAL)
-        self.console.insert(tk.END, message + "\n")
-        self.console.see(tk.END)
-        self.console.config(state=tk.DISABLED)
+        # 任何线程都可以调用，真正写控件在 flush_log 里
+        self.log_buffer.write(message)
+
+    def flush_log(self):
+        """定时把缓冲的日志一次性写进控制台，超过上限的旧行删掉"""
+        lines = self.log_buffer.drain()
+        if lines:
+            self.console.config(state=tk.NORMAL)
+            self.console.insert(tk.END, "\n".join(lines) + "\n")
+            excess = int(self.console.index("end-1c").split(".")[0]) - 1 - self.log_buffer.max_lines
+            if excess > 0:
+                self.console.delete("1.0", f"{excess + 1}.0")
+            self.console.see(tk.END)
+            self.console.config(state=tk.DISABLED)
+        self.root.after(LOG_FLUSH_MS, self.flush_log)
+
+    def ensure_audio_initialized(self):
+        """第一次播放时才打开音频设备，启动时先显示界面"""
+        try:
+            self.audio.open()
+            return True
+        except Exception as e:
+            self.log(f"❌ 音频初始化失败（{self.audio.name}）: {str(e)}")
+            return False
 
     def play_audio(self, file_path):
-        if not os.path.exists(file_path):
+        data = self.prefetcher.get(file_path)
+        if data is None and not audio_exists(file_path):
             self.log(f"❌ 文件不存在: {file_path}")
             return False
-        if self.is_playing:
-            self.stop_audio()
+        if not self.ensure_audio_initialized():
+            return False
         try:
-            pygame.mixer.music.load(file_path)
-            pygame.mixer.music.play()
-            self.is_playing = True
+            # 直接打断正在播放的内容；已预取的不读盘
+            self.audio.play_file(file_path, data)
             return True
         except Exception as e:
             self.log(f"❌ 播放错误: {str(e)}")
             return False
 
     def stop_audio(self):
-        if self.is_playing:
-            pygame.mixer.music.stop()
-            self.is_playing = False
+        self.audio.stop()
 
     def select_folder(self):
         folder = filedialog.askdirectory(title="选择包含MP3文件的文件夹")
@@ -208,114 +257,175 @@ class SpellingApp:
             self.current_folder = folder
             self.load_words(folder)
 
-    def load_words(self, folder):
-        self.words = []
-        self.is_completed = False
-        self.wrong_words = []
+    def select_zip(self):
+        """直接从单词包压缩包练习，不需要先解压"""
+        zip_path = filedialog.askopenfilename(title="选择单词压缩包", filetypes=[("压缩包", "*.zip")])
+        if zip_path:
+            self.current_folder = zip_path
+            self.load_words(zip_path)
+
+    def resume_last_session(self):
+        """上次练习没做完（程序崩溃或直接关闭）时，按作答记录接着练"""
+        state = self.journal.unfinished_session()
+        if state is None or not os.path.exists(state["source"]):
+            return
+        self.log("💾 发现上次没做完的练习，继续...")
+        self.current_folder = state["source"]
+        self.load_words(state["source"], resume=state, filters=state.get("filters"))
+
+    def load_words(self, folder, resume=None, filters=None):
+        self.prefetcher.cancel()
+        self.stop_watching()
+        self.session.clear()
         try:
-            mp3_files = set(glob.glob(os.path.join(folder, "*.mp3")) + glob.glob(os.path.join(folder, "*.MP3")))
-            for file_path in mp3_files:
-                word = os.path.splitext(os.path.basename(file_path))[0]
-                self.words.append({"word": word, "path": file_path})
-            self.words.sort(key=lambda x: x["word"].lower())
-            if self.words:
-                self.log(f"✅ 已加载 {len(self.words)} 个单词")
-                self.current_index = 0
-                self.error_count = 0
+            self.library.scan(folder)
+            words = self.session.load_words(self.library, folder, filters)
+            if words:
                 self.hide_completion_buttons()
-                self.play_current_word()
+                for message in self.session.start(folder, words, resume, filters):
+                    self.log(message)
+                self.show_current_word()
+                if not is_zip_source(folder):
+                    self.watcher = FolderWatcher(self.library, folder, on_error=self.log)
             else:
-                self.log("❌ 未找到MP3文件")
+                self.log("❌ 没有符合条件的单词" if filters else "❌ 未找到MP3文件")
         except Exception as e:
             self.log(f"❌ 加载错误: {str(e)}")
 
+    def stop_watching(self):
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+
+    def merge_folder_changes(self):
+        """把文件夹里新下载/删除的音频合并进正在进行的练习（UI 线程定时调用）"""
+        changes = self.watcher.drain() if self.watcher is not None else None
+        if changes is not None:
+            for message in self.session.merge_changes(changes):
+                self.log(message)
+        self.root.after(DRAIN_INTERVAL_MS, self.merge_folder_changes)
+
     def play_current_word(self):
-        if not self.is_completed and self.current_index < len(self.words):
-            word_data = self.words[self.current_index]
-            self.log(f"🔊 播放第 {self.current_index + 1}/{len(self.words)} 个单词...")
+        """播放当前单词的发音"""
+        word_data = self.session.current
+        if word_data is not None:
+            done, total = self.session.progress()
+            self.log(f"🔊 播放第 {done}/{total} 个单词...")
             self.play_audio(word_data["path"])
+            # 趁用户输入时预读接下来的单词（当前单词也留在窗口里，重播不用再读盘）
+            self.prefetcher.schedule(self.session.upcoming(self.prefetcher.depth))
+
+    def show_current_word(self):
+        """本轮结束就显示总结，否则播放当前单词"""
+        if self.session.is_completed:
+            self.complete_practice()
+        else:
+            self.play_current_word()
 
     def replay_current(self):
-        if not self.is_completed and self.current_index < len(self.words):
+        """重新播放当前单词"""
+        if self.session.current is not None:
             self.stop_audio()
             self.play_current_word()
 
     def check_spelling(self):
-        if self.is_completed:
+        """检查拼写（判断和记录在 PracticeSession 里，这里只负责显示和播放）"""
+        if self.session.current is None:
             return
         user_input = self.entry.get().strip()
-        if not user_input or not self.words:
+        if not user_input:
             return
+        self.telemetry.begin(ANSWER_TO_AUDIO)  # 声音真正开始输出时由播放后端结束
         self.entry.delete(0, tk.END)
         self.log(f"> {user_input}")
-        current_word = self.words[self.current_index]["word"]
-
-        if user_input.lower() == current_word.lower():
-            self.log("✅ 拼写正确！")
-            self.current_index += 1
-            self.error_count = 0
-            if self.current_index < len(self.words):
-                self.play_current_word()
-            else:
-                self.complete_practice()
+        with self.telemetry.span("ui.check"):
+            result = self.session.check(user_input)
+        for message in result["messages"]:
+            self.log(message)
+        if result["advance"]:
+            if self.session.is_completed:
+                self.telemetry.cancel(ANSWER_TO_AUDIO)
+            self.show_current_word()
         else:
-            self.error_count += 1
-            if self.error_count >= self.max_errors:
-                self.log(f"❌ 已连续{self.error_count}次错误")
-                self.log(f"💡 正确答案: {current_word}")
-                self.wrong_words.append(current_word)
-                self.current_index += 1
-                self.error_count = 0
-                if self.current_index < len(self.words):
-                    self.play_current_word()
-                else:
-                    self.complete_practice()
-            else:
-                self.log(f"❌ 拼写错误（第{self.error_count}次），请重新尝试")
-                self.replay_current()
+            self.replay_current()
 
     def complete_practice(self):
-        self.is_completed = True
-        self.log("🎉 所有单词练习完成！")
-        if self.wrong_words:
-            self.log("\n📝 最终答错的单词：")
-            for i, word in enumerate(self.wrong_words, 1):
-                self.log(f"  {i}. {word}")
-            self.log(f"\n总共答错 {len(self.wrong_words)} 个单词")
-        else:
-            self.log("🎊 太棒了！所有单词都答对了！")
+        for message in self.session.summary():
+            self.log(message)
         self.show_completion_buttons()
 
     def show_completion_buttons(self):
         self.restart_btn.pack(side=tk.LEFT, padx=4)
+        self.wrong_only_btn.pack(side=tk.LEFT, padx=4)
         self.copy_btn.pack(side=tk.LEFT, padx=4)
 
     def hide_completion_buttons(self):
         self.restart_btn.pack_forget()
+        self.wrong_only_btn.pack_forget()
         self.copy_btn.pack_forget()
 
     def restart_practice(self):
         if self.current_folder:
-            self.load_words(self.current_folder)
+            self.load_words(self.current_folder, filters=self.session.filters)
             self.log("🔄 重新开始练习...")
         else:
             self.log("❌ 请先选择文件夹")
 
+    def practice_wrong_words(self):
+        """只练错词本里的单词（以前最终没答对过的，不限于这一轮）"""
+        if self.current_folder:
+            self.load_words(self.current_folder, filters={"wrong_only": True})
+            self.log("📕 只练错词本里的单词...")
+        else:
+            self.log("❌ 请先选择文件夹")
+
     def copy_wrong_words(self):
-        if self.wrong_words:
-            wrong_text = "\n".join(self.wrong_words)
+        if self.session.wrong_words:
+            wrong_text = "\n".join(self.session.wrong_words)
             self.root.clipboard_clear()
             self.root.clipboard_append(wrong_text)
             self.log("✅ 错词已复制到剪贴板")
         else:
             self.log("💡 没有错词可复制")
 
+    def toggle_latency_overlay(self):
+        """显示/隐藏各阶段耗时的 p50/p95/p99"""
+        if self.latency_job is None:
+            self.latency_label.pack(fill=tk.X, pady=(6, 0))
+            self.update_latency_overlay()
+        else:
+            self.root.after_cancel(self.latency_job)
+            self.latency_job = None
+            self.latency_label.pack_forget()
+
+    def update_latency_overlay(self):
+        self.latency_label.config(text=self.telemetry.describe())
+        self.latency_job = self.root.after(OVERLAY_INTERVAL_MS, self.update_latency_overlay)
+
+    def export_latency(self):
+        try:
+            self.telemetry.export(backend=self.audio.name)
+        except OSError:
+            pass
+
     def cleanup_and_quit(self):
+        self.export_latency()
         self.stop_audio()
-        pygame.mixer.quit()
+        self.stop_watching()
+        self.prefetcher.close()
+        self.scheduler.close()
+        self.journal.close()
+        self.confusions.close()
+        self.library.close()
+        self.audio.close()
         self.root.destroy()
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = SpellingApp(root)
+    # 界面显示后在后台预先导入播放后端的模块，第一次播放就不用等
+    root.after_idle(warm_up_imports, app.audio.modules)
+    probe_path = startup_probe_path()
+    if probe_path:
+        root.after_idle(lambda: (write_startup_probe(probe_path), app.cleanup_and_quit()))
     root.mainloop()
@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+import struct
+import select
+import threading
+from collections import deque
+
+# inotify 事件（只关心写完、移入/移出、删除；IN_CREATE 时文件可能还没写完，不用）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+DRAIN_INTERVAL_MS = 500  # 界面多久取一次变化
+
+
+def _load_inotify():
+    """Linux 下通过 ctypes 调用 libc 的 inotify，不可用时返回 None"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+def parse_events(data):
+    """拆开 read() 读到的 inotify 事件：[(mask, 文件名), ...]"""
+    events = []
+    offset = 0
+    while offset + EVENT_HEADER.size <= len(data):
+        wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+        offset += EVENT_HEADER.size
+        name = data[offset:offset + length].rstrip(b"\0")
+        offset += length
+        events.append((mask, os.fsdecode(name)))
+    return events
+
+
+class FolderWatcher:
+    """
+    练习过程中监视单词文件夹，新下载/删除的音频直接合并进索引，不用重新扫描或重启练习
+    - Linux 用 inotify，只按事件里的文件名更新索引（WordLibrary.update_files），不列目录
+    - 其他系统每 interval 秒比较一次文件夹修改时间，变了才做增量扫描（WordLibrary.scan_changes）
+    - 一批事件等 debounce 秒没有新事件再处理，下载脚本连续写入时合并成一次
+    - 变化在后台线程算好放进队列，界面定时调用 drain() 取出（界面只在自己的线程里改单词列表）
+    """
+    def __init__(self, library, folder, interval=1.0, debounce=0.3, on_error=None):
+        self.library = library
+        self.folder = library.normalize_folder(folder)
+        self.interval = interval
+        self.debounce = debounce
+        self.on_error = on_error or (lambda message: None)
+        self._changes = deque()
+        self._stop = threading.Event()
+        self._fd = None
+        libc = _load_inotify()
+        if libc is not None:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                if libc.inotify_add_watch(fd, os.fsencode(self.folder), WATCH_MASK) >= 0:
+                    self._fd = fd
+                else:
+                    os.close(fd)
+        self.mode = "inotify" if self._fd is not None else "polling"
+        self._thread = threading.Thread(
+            target=self._run_inotify if self._fd is not None else self._run_polling, daemon=True)
+        self._thread.start()
+
+    def _publish(self, changes):
+        if changes["added"] or changes["removed"]:
+            self._changes.append(changes)
+
+    def _run_polling(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._publish(self.library.scan_changes(self.folder))
+            except FileNotFoundError:
+                self.on_error(f"⚠️ 文件夹已不存在，停止监视: {self.folder}")
+                return
+            except Exception as e:
+                self.on_error(f"⚠️ 监视文件夹出错: {str(e)}")
+
+    def _read_events(self):
+        try:
+            return parse_events(os.read(self._fd, 65536))
+        except BlockingIOError:
+            return []
+
+    def _run_inotify(self):
+        try:
+            while not self._stop.is_set():
+                readable, _, _ = select.select([self._fd], [], [], 0.5)
+                if not readable:
+                    continue
+                try:
+                    folder_mtime = os.stat(self.folder).st_mtime_ns  # 在读事件之前取，漏掉的变化下次 scan() 会补上
+                except FileNotFoundError:
+                    folder_mtime = None
+                names = []
+                overflow = gone = False
+                deadline = time.monotonic() + self.debounce * 5  # 一直有新事件时最多等这么久
+                while True:
+                    for mask, name in self._read_events():
+                        if mask & IN_Q_OVERFLOW:
+                            overflow = True
+                        elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                            gone = True
+                        elif name:
+                            names.append(name)
+                    if self._stop.is_set() or time.monotonic() >= deadline:
+                        break
+                    readable, _, _ = select.select([self._fd], [], [], self.debounce)
+                    if not readable:
+                        break
+                if gone or folder_mtime is None:
+                    self.on_error(f"⚠️ 文件夹已不存在，停止监视: {self.folder}")
+                    return
+                try:
+                    if overflow:
+                        self._publish(self.library.scan_changes(self.folder))  # 事件太多丢了一部分，整个文件夹增量扫描
+                    elif names:
+                        self._publish(self.library.update_files(self.folder, names, folder_mtime))
+                except Exception as e:
+                    self.on_error(f"⚠️ 监视文件夹出错: {str(e)}")
+        finally:
+            os.close(self._fd)
+
+    def drain(self):
+        """
+        取出到目前为止的变化（界面线程调用），合并成一份
+        :return: {"added": [{"word": ..., "path": ...}, ...], "removed": [路径, ...]}，没有变化时返回 None
+        """
+        if not self._changes:
+            return None
+        added = {}
+        removed = set()
+        while self._changes:
+            changes = self._changes.popleft()
+            for path in changes["removed"]:
+                added.pop(path, None)
+                removed.add(path)
+            for item in changes["added"]:
+                removed.discard(item["path"])
+                added[item["path"]] = item
+        return {"added": sorted(added.values(), key=lambda item: item["word"].lower()), "removed": sorted(removed)}
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
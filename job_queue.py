@@ -0,0 +1,280 @@
+import os
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".word_for_spelling_downloads.db")
+LEASE_SECONDS = 300       # 领取的任务多久没完成就视为下载进程已退出，可以被重新领取
+RETRY_BASE_DELAY = 30     # 失败后第一次重试的等待时间（秒），之后每次翻倍
+RETRY_MAX_DELAY = 3600
+MAX_ATTEMPTS = 3          # 超过这个次数标记为 failed，只有 retry_failed() 才会再试
+STATUSES = ("pending", "running", "done", "failed")
+
+
+def queue_name(provider, save_dir, *options):
+    """同一个保存目录、同一种语音设置共用一个队列，例如 gtts:en:normal:/path/gtts_mp3"""
+    return ":".join([provider, *map(str, options), os.path.abspath(save_dir)])
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}小时{seconds % 3600 // 60}分"
+    if seconds >= 60:
+        return f"{seconds // 60}分{seconds % 60}秒"
+    return f"{seconds}秒"
+
+
+class JobQueue:
+    """
+    持久化的下载任务队列（SQLite），每个单词一条：状态、尝试次数、最后的错误、下次可以重试的时间
+    - 下载脚本被杀掉后重新运行，只继续没完成的单词，不用重新读单词表、检查文件
+    - claim() 在 BEGIN IMMEDIATE 事务里领取任务，多个下载进程可以同时消费同一个队列
+    - 领取后 LEASE_SECONDS 秒没完成（进程被杀）的任务会被重新领取
+    - 失败按指数退避重试，超过 max_attempts 次标记为 failed，retry_failed() 之后才会再试
+    """
+    def __init__(self, db_path=DEFAULT_DB_PATH, name="default", max_attempts=MAX_ATTEMPTS, lease=LEASE_SECONDS):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        if db_path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")  # 读进度时不阻塞其他进程写入
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                queue TEXT NOT NULL,
+                path TEXT NOT NULL,
+                word TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                next_at REAL NOT NULL DEFAULT 0,
+                owner TEXT,
+                lease_until REAL,
+                finished_at REAL,
+                PRIMARY KEY (queue, path)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (queue, status, position);
+            CREATE INDEX IF NOT EXISTS jobs_by_finished ON jobs (queue, finished_at);
+        """)
+
+    def _transaction(self, sql_calls):
+        """在一个写事务里执行，返回最后一条语句的结果"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = sql_calls()
+                self.conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def add(self, jobs):
+        """
+        加入任务：[(序号, 单词, 保存路径), ...]
+        已在队列里的保留原来的状态；之前完成、但这次又需要下载（文件被删）的重新排队
+        :return: 队列里待下载的任务数
+        """
+        rows = [(self.name, save_path, word, index) for index, word, save_path in jobs]
+
+        def run():
+            self.conn.executemany("""
+                INSERT INTO jobs (queue, path, word, position, status) VALUES (?, ?, ?, ?, 'pending')
+                ON CONFLICT(queue, path) DO UPDATE SET
+                    word = excluded.word, position = excluded.position,
+                    status = CASE WHEN status = 'done' THEN 'pending' ELSE status END,
+                    attempts = CASE WHEN status = 'done' THEN 0 ELSE attempts END
+            """, rows)
+            return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE queue = ? AND status = 'pending'",
+                                     (self.name,)).fetchone()[0]
+        return self._transaction(run)
+
+    def claim(self, limit=1, now=None):
+        """
+        领取最多 limit 个可以下载的任务（按单词表顺序），领取的任务标记为 running
+        :return: [(序号, 单词, 保存路径), ...]
+        """
+        now = time.time() if now is None else now
+
+        def run():
+            # 领取后超时没完成的（下载进程被杀）放回队列
+            self.conn.execute("""
+                UPDATE jobs SET status = 'pending', owner = NULL, lease_until = NULL
+                WHERE queue = ? AND status = 'running' AND lease_until < ?
+            """, (self.name, now))
+            rows = self.conn.execute("""
+                SELECT position, word, path FROM jobs
+                WHERE queue = ? AND status = 'pending' AND next_at <= ?
+                ORDER BY position LIMIT ?
+            """, (self.name, now, limit)).fetchall()
+            self.conn.executemany("""
+                UPDATE jobs SET status = 'running', owner = ?, lease_until = ? WHERE queue = ? AND path = ?
+            """, [(self.owner, now + self.lease, self.name, path) for _, _, path in rows])
+            return [tuple(row) for row in rows]
+        return self._transaction(run)
+
+    def complete(self, path, now=None):
+        now = time.time() if now is None else now
+        self._transaction(lambda: self.conn.execute("""
+            UPDATE jobs SET status = 'done', last_error = NULL, owner = NULL, lease_until = NULL, finished_at = ?
+            WHERE queue = ? AND path = ?
+        """, (now, self.name, path)))
+
+    def skip(self, paths):
+        """
+        这次规划时发现已经有文件的单词（已有有效文件、缓存命中）直接标记完成：
+        之前中断的下载留下的待下载任务不再重复下载；不在队列里的忽略。不记完成时间，不算进下载速度
+        """
+        rows = [(self.name, path) for path in paths]
+        self._transaction(lambda: self.conn.executemany("""
+            UPDATE jobs SET status = 'done', last_error = NULL, owner = NULL, lease_until = NULL
+            WHERE queue = ? AND path = ? AND status != 'done'
+        """, rows))
+
+    def fail(self, path, error, now=None):
+        """记录一次失败：还没到 max_attempts 次的按指数退避重新排队，否则标记为 failed"""
+        now = time.time() if now is None else now
+
+        def run():
+            row = self.conn.execute("SELECT attempts FROM jobs WHERE queue = ? AND path = ?",
+                                    (self.name, path)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempts - 1))
+            status = "failed" if attempts >= self.max_attempts else "pending"
+            self.conn.execute("""
+                UPDATE jobs SET status = ?, attempts = ?, last_error = ?, next_at = ?, owner = NULL, lease_until = NULL
+                WHERE queue = ? AND path = ?
+            """, (status, attempts, str(error)[:500], now + delay, self.name, path))
+            return status
+        return self._transaction(run)
+
+    def release(self):
+        """把本进程领取了还没完成的任务放回队列（Ctrl+C 退出时调用）"""
+        self._transaction(lambda: self.conn.execute("""
+            UPDATE jobs SET status = 'pending', owner = NULL, lease_until = NULL
+            WHERE queue = ? AND status = 'running' AND owner = ?
+        """, (self.name, self.owner)))
+
+    def reset_running(self):
+        """确定没有其他下载进程在运行时，把所有 running 的任务放回队列，不用等超时"""
+        return self._transaction(lambda: self.conn.execute("""
+            UPDATE jobs SET status = 'pending', owner = NULL, lease_until = NULL WHERE queue = ? AND status = 'running'
+        """, (self.name,)).rowcount)
+
+    def retry_failed(self):
+        """
+        失败的任务重新排队（尝试次数清零）
+        :return: 重新排队的任务数
+        """
+        return self._transaction(lambda: self.conn.execute("""
+            UPDATE jobs SET status = 'pending', attempts = 0, next_at = 0 WHERE queue = ? AND status = 'failed'
+        """, (self.name,)).rowcount)
+
+    def next_wait(self, now=None):
+        """
+        离最早一个待重试任务可以领取还有多少秒；0 表示现在就有可领取的，None 表示没有待下载的任务
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self.conn.execute("SELECT MIN(next_at) FROM jobs WHERE queue = ? AND status = 'pending'",
+                                    (self.name,)).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - now)
+
+    def paths(self, status="done"):
+        with self._lock:
+            return [path for (path,) in self.conn.execute(
+                "SELECT path FROM jobs WHERE queue = ? AND status = ? ORDER BY position", (self.name, status))]
+
+    def failures(self):
+        """[(单词, 尝试次数, 最后的错误), ...]"""
+        with self._lock:
+            return self.conn.execute("""
+                SELECT word, attempts, last_error FROM jobs WHERE queue = ? AND status = 'failed' ORDER BY position
+            """, (self.name,)).fetchall()
+
+    def progress(self, window=120, now=None):
+        """
+        进度：各状态的任务数、最近 window 秒内（所有下载进程合计）的速度、预计剩余时间
+        :return: {"pending", "running", "done", "failed", "total", "rate": 个/秒, "eta": 秒或 None}
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            counts = dict(self.conn.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE queue = ? GROUP BY status", (self.name,)))
+            recent = self.conn.execute("""
+                SELECT COUNT(*), MIN(finished_at) FROM jobs WHERE queue = ? AND finished_at >= ?
+            """, (self.name, now - window)).fetchone()
+        progress = {status: counts.get(status, 0) for status in STATUSES}
+        progress["total"] = sum(progress.values())
+        done_recent, first = recent
+        elapsed = now - first if first is not None else 0
+        # 成批完成的任务（本地合成一组）几乎同时写入，不到1秒的样本算不出有意义的速度
+        progress["rate"] = done_recent / elapsed if done_recent > 1 and elapsed >= 1 else None
+        remaining = progress["pending"] + progress["running"]
+        progress["eta"] = remaining / progress["rate"] if progress["rate"] and remaining else None
+        return progress
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def describe_progress(progress):
+    text = (f"进度：完成 {progress['done']}/{progress['total']}，待下载 {progress['pending']}，"
+            f"下载中 {progress['running']}，失败 {progress['failed']}")
+    if progress["rate"]:
+        text += f"；{progress['rate'] * 60:.0f} 个/分钟"
+    if progress["eta"] is not None:
+        text += f"，预计还要 {format_duration(progress['eta'])}"
+    return text
+
+
+class ProgressReporter:
+    """下载线程完成任务后调用 maybe_report()，每 interval 秒最多打印一次进度（统计要扫索引，不每次都查）"""
+    def __init__(self, queue, interval=5.0):
+        self.queue = queue
+        self.interval = interval
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def maybe_report(self):
+        with self._lock:
+            if time.monotonic() - self._last < self.interval:
+                return
+            self._last = time.monotonic()
+        print(describe_progress(self.queue.progress()))
+
+
+if __name__ == "__main__":
+    # 查看/管理下载队列：python job_queue.py --list  或  python job_queue.py "gtts:en:normal:/path/gtts_mp3" --failures
+    parser = argparse.ArgumentParser(description="查看下载任务队列的进度")
+    parser.add_argument("queue", nargs="?", help="队列名（不给时列出所有队列）")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="队列数据库路径")
+    parser.add_argument("--failures", action="store_true", help="列出失败的单词和最后的错误")
+    parser.add_argument("--retry-failed", action="store_true", help="失败的单词重新排队")
+    parser.add_argument("--reset-running", action="store_true", help="把下载中的任务放回队列（确定没有下载进程在运行时用）")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db, args.queue or "default")
+    if args.queue is None:
+        for name, total, done in queue.conn.execute(
+                "SELECT queue, COUNT(*), SUM(status = 'done') FROM jobs GROUP BY queue ORDER BY queue"):
+            print(f"{name}：完成 {done}/{total}")
+    else:
+        if args.retry_failed:
+            print(f"已重新排队 {queue.retry_failed()} 个失败的单词")
+        if args.reset_running:
+            print(f"已放回队列 {queue.reset_running()} 个下载中的任务")
+        print(describe_progress(queue.progress()))
+        if args.failures:
+            for word, attempts, error in queue.failures():
+                print(f"  {word}（{attempts}次）：{error}")
+    queue.close()
@@ -0,0 +1,28 @@
+import os
+import time
+import threading
+import importlib
+
+# pyexe.py --report 测启动时间用：设置了这个环境变量时，界面显示出来后把时间戳写进该文件并退出
+STARTUP_PROBE_ENV = "SPELLING_STARTUP_PROBE"
+
+
+def warm_up_imports(module_names):
+    """界面显示后在后台线程预先导入音频相关模块，第一次播放时就不用再等导入"""
+    def run():
+        for name in module_names:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass  # 真正使用时会再导入一次并报错
+    threading.Thread(target=run, daemon=True).start()
+
+
+def startup_probe_path():
+    return os.environ.get(STARTUP_PROBE_ENV)
+
+
+def write_startup_probe(path):
+    """记录界面显示出来的时刻（秒级时间戳）"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(repr(time.time()))
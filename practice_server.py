@@ -0,0 +1,461 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import secrets
+import argparse
+from http import HTTPStatus
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from word_library import WordLibrary
+from scheduler import ReviewScheduler
+from session_journal import SessionJournal
+from answer_analysis import ConfusionIndex
+from practice_session import PracticeSession
+from zip_source import read_audio
+
+DEFAULT_DATA_DIR = os.path.join(os.path.expanduser("~"), ".word_for_spelling_server")
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+MAX_BODY_BYTES = 16 * 1024
+KEEP_ALIVE_TIMEOUT = 30       # 空闲连接多久关闭（秒）
+SESSION_IDLE_TIMEOUT = 3600   # 学习者多久没有请求就结束会话（进度已写进作答记录，重新连接会接着练）
+LEARNER_PATTERN = re.compile(r"^[\w\-]{1,64}$")
+AUDIO_TYPES = {".mp3": "audio/mpeg", ".ogg": "audio/ogg", ".wav": "audio/wav", ".m4a": "audio/mp4"}
+UPCOMING_AUDIO = 3            # 除了当前单词，还允许预取接下来几个到期单词的音频
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_range(header, size):
+    """
+    解析 Range 请求头（只支持单个区间：bytes=a-b / bytes=a- / bytes=-n）
+    :return: (起始, 结束)，结束位置包含在内；格式不支持时返回 None（按整个文件返回），区间超出文件时抛 HttpError(416)
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start = max(0, size - int(last))
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end or size == 0:
+        raise HttpError(416, "请求的区间超出文件大小")
+    return start, min(end, size - 1)
+
+
+class AudioStore:
+    """
+    所有学习者共用的音频内存缓存，按总字节数 LRU 淘汰
+    - 每个文件只读一次盘（在线程池里读），很多人同时请求同一个单词时共用同一次读取
+    - 同时算好 ETag，客户端重播时带 If-None-Match 直接返回 304
+    """
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, executor=None):
+        self.max_bytes = max_bytes
+        self.executor = executor
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()  # 路径 → (数据, ETag)
+        self._loading = {}           # 路径 → 正在读取的 Future
+
+    @staticmethod
+    def _read(path):
+        data = bytes(read_audio(path))
+        return data, '"' + hashlib.sha1(data).hexdigest()[:20] + '"'
+
+    async def get(self, path):
+        """:return: (数据, ETag)"""
+        item = self._items.get(path)
+        if item is not None:
+            self._items.move_to_end(path)
+            self.hits += 1
+            return item
+        future = self._loading.get(path)
+        if future is None:
+            self.misses += 1
+            future = asyncio.get_running_loop().run_in_executor(self.executor, self._read, path)
+            self._loading[path] = future
+            future.add_done_callback(lambda done: self._loaded(path, done))
+        else:
+            self.hits += 1
+        # shield：某个客户端断开取消等待时，不影响其他等同一个文件的请求
+        return await asyncio.shield(future)
+
+    def _loaded(self, path, future):
+        self._loading.pop(path, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        data, etag = future.result()
+        if len(data) > self.max_bytes:
+            return
+        self._items[path] = (data, etag)
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, (old, _) = self._items.popitem(last=False)
+            self.size -= len(old)
+
+
+class LearnerSession:
+    """服务器上的一个学习者：PracticeSession + 它自己的复习计划、作答记录（同一个学习者的请求按顺序处理）"""
+    def __init__(self, session_id, learner, session):
+        self.id = session_id
+        self.learner = learner
+        self.session = session
+        self.lock = asyncio.Lock()
+        self.last_seen = time.monotonic()
+
+    def close(self):
+        self.session.scheduler.close()
+        if self.session.journal is not None:
+            self.session.journal.close()
+        if self.session.confusions is not None:
+            self.session.confusions.close()
+
+
+class PracticeServer:
+    """
+    多人练习服务器（无界面）：一个 asyncio 事件循环处理所有连接，每个学习者一个 PracticeSession
+    - 单词表启动时从 WordLibrary 加载一次（可以合并多个来源、按单词表/前缀筛选），所有学习者共用同一个 WordTable；复习计划、作答记录、错误统计按学习者分开保存
+    - 音频从共用的内存缓存返回，支持 ETag（304）和 Range（206），浏览器的 <audio> 可以直接播放和拖动
+    - 复习计划和作答记录要写 SQLite / 日志文件，放到线程池里执行，不阻塞事件循环
+    - ephemeral=True 时所有数据只在内存里（压力测试用）
+    接口（JSON）：
+      POST   /api/sessions                 {"learner": "xiaoming"}  开始练习（这个学习者没做完的接着练）
+      GET    /api/sessions/<id>            会话状态
+      POST   /api/sessions/<id>/answer     {"answer": "..."}  作答，返回判断结果和新状态
+      POST   /api/sessions/<id>/restart    再来一次
+      DELETE /api/sessions/<id>            结束会话
+      GET    /api/sessions/<id>/audio/<序号> 这个会话当前单词的音频（序号在会话状态的 audio 里，不暴露单词本身），
+                                           接下来几个到期单词的音频也可以预取（会话状态的 upcoming_audio），其他的返回 404
+      GET    /api/stats                    在线人数、缓存命中情况
+    """
+    def __init__(self, sources, data_dir=DEFAULT_DATA_DIR, ephemeral=False, cache_bytes=DEFAULT_CACHE_BYTES,
+                 workers=8, max_errors=3, library=None, lists=None, prefix=None):
+        if isinstance(sources, str):
+            sources = [sources]
+        self.source = os.pathsep.join(sources)  # 作答记录里的来源，恢复进度时比较
+        self.filters = {key: value for key, value in (("lists", lists), ("prefix", prefix)) if value} or None
+        self.data_dir = data_dir
+        self.ephemeral = ephemeral
+        self.max_errors = max_errors
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.audio = AudioStore(cache_bytes, self.executor)
+        own_library = library is None
+        if own_library:
+            if not ephemeral:
+                os.makedirs(data_dir, exist_ok=True)
+            library = WordLibrary(":memory:" if ephemeral else os.path.join(data_dir, "library.db"))
+        for source in sources:
+            library.scan(source)
+        self.words = library.load(sources, lists=lists, prefix=prefix)
+        if own_library:
+            library.close()
+        self.sessions = {}    # 会话id → LearnerSession
+        self.by_learner = {}  # 学习者 → 会话id
+        self.started = time.monotonic()
+        self.answers = 0
+
+    # ---------------------- 会话 ----------------------
+    def _learner_dir(self, learner):
+        return os.path.join(self.data_dir, "learners", learner)
+
+    def _create_session(self, learner):
+        """在线程池里执行：打开这个学习者的复习计划、作答记录，开始练习（有没做完的就接着练）"""
+        if self.ephemeral:
+            session = PracticeSession(ReviewScheduler(":memory:"), None, ConfusionIndex(":memory:", learner),
+                                      self.max_errors)
+            session.start(self.source, self.words, filters=self.filters)
+            return session
+        folder = self._learner_dir(learner)
+        os.makedirs(folder, exist_ok=True)
+        journal = SessionJournal(os.path.join(folder, "journal"))
+        session = PracticeSession(ReviewScheduler(os.path.join(folder, "review.db")), journal,
+                                  ConfusionIndex(os.path.join(self.data_dir, "errors.db"), learner), self.max_errors)
+        resume = journal.unfinished_session()
+        if resume is not None and (resume["source"] != self.source or resume.get("filters") != self.filters):
+            resume = None
+        session.start(self.source, self.words, resume, self.filters)
+        return session
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def _state(self, entry):
+        session = entry.session
+        current, total = session.progress()
+        state = {
+            "session": entry.id,
+            "learner": entry.learner,
+            "completed": session.is_completed,
+            "progress": {"current": min(current, total), "total": total},
+            "errors": session.error_count,
+            "max_errors": session.max_errors,
+            "audio": None if session.current is None else f"/api/sessions/{entry.id}/audio/{session.current_index}",
+            "upcoming_audio": [] if session.current is None else [
+                f"/api/sessions/{entry.id}/audio/{index}" for index in session.scheduler.peek(UPCOMING_AUDIO)
+                if index != session.current_index],
+        }
+        if session.is_completed:
+            state["wrong_words"] = list(session.wrong_words)
+        return state
+
+    def _session(self, session_id):
+        entry = self.sessions.get(session_id)
+        if entry is None:
+            raise HttpError(404, "会话不存在或已过期")
+        entry.last_seen = time.monotonic()
+        return entry
+
+    async def open_session(self, learner):
+        if not isinstance(learner, str) or not LEARNER_PATTERN.match(learner):
+            raise HttpError(400, "learner 只能包含字母、数字、汉字、下划线和减号（最多64个字符）")
+        session_id = self.by_learner.get(learner)
+        if session_id in self.sessions:
+            return self._session(session_id)  # 同一个学习者重新连接，继续原来的会话
+        session = await self._run(self._create_session, learner)
+        if learner in self.by_learner and self.by_learner[learner] in self.sessions:
+            # 创建期间同一个学习者的另一个请求已经建好了会话
+            await self._run(LearnerSession(None, learner, session).close)
+            return self._session(self.by_learner[learner])
+        entry = LearnerSession(secrets.token_urlsafe(12), learner, session)
+        self.sessions[entry.id] = entry
+        self.by_learner[learner] = entry.id
+        return entry
+
+    async def close_session(self, entry):
+        self.sessions.pop(entry.id, None)
+        if self.by_learner.get(entry.learner) == entry.id:
+            del self.by_learner[entry.learner]
+        async with entry.lock:
+            await self._run(entry.close)
+
+    async def expire_sessions(self, interval=60):
+        while True:
+            await asyncio.sleep(interval)
+            deadline = time.monotonic() - SESSION_IDLE_TIMEOUT
+            for entry in [e for e in self.sessions.values() if e.last_seen < deadline]:
+                await self.close_session(entry)
+
+    # ---------------------- 请求处理 ----------------------
+    async def dispatch(self, method, path, headers, body):
+        """:return: (状态码, 响应头, 响应体)"""
+        parts = [part for part in path.split("/") if part]
+        if parts[:1] != ["api"]:
+            raise HttpError(404, "没有这个地址")
+        payload = {}
+        if body:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise HttpError(400, "请求体不是合法的 JSON")
+            if not isinstance(payload, dict):
+                raise HttpError(400, "请求体应该是 JSON 对象")
+
+        if parts == ["api", "stats"] and method == "GET":
+            return self.json(200, self.stats())
+        if parts == ["api", "sessions"] and method == "POST":
+            entry = await self.open_session(payload.get("learner"))
+            async with entry.lock:
+                return self.json(200, self._state(entry))
+        if len(parts) == 5 and parts[1] == "sessions" and parts[3] == "audio" and method in ("GET", "HEAD"):
+            return await self.serve_audio(self._session(parts[2]), parts[4], headers, method == "HEAD")
+        if len(parts) >= 3 and parts[1] == "sessions":
+            entry = self._session(parts[2])
+            action = parts[3] if len(parts) == 4 else None
+            if action is None and method == "GET":
+                async with entry.lock:  # peek() 要动复习计划的堆，不能和线程池里的 check() 同时进行
+                    return self.json(200, self._state(entry))
+            if action is None and method == "DELETE":
+                await self.close_session(entry)
+                return self.json(200, {"closed": True})
+            if action == "answer" and method == "POST":
+                answer = payload.get("answer")
+                if not isinstance(answer, str) or not answer.strip():
+                    raise HttpError(400, "缺少 answer")
+                async with entry.lock:
+                    if entry.session.current is None:
+                        raise HttpError(409, "本轮已经结束")
+                    result = await self._run(entry.session.check, answer.strip())
+                    self.answers += 1
+                    state = self._state(entry)
+                    if entry.session.is_completed and result["advance"]:
+                        state["summary"] = await self._run(entry.session.summary)
+                result = {key: result[key] for key in ("kind", "advance", "messages")}
+                return self.json(200, {**result, "state": state})
+            if action == "restart" and method == "POST":
+                async with entry.lock:
+                    await self._run(entry.session.start, self.source, self.words, None, self.filters)
+                    return self.json(200, self._state(entry))
+        raise HttpError(404, "没有这个地址")
+
+    async def serve_audio(self, entry, index, headers, head_only):
+        """只返回这个会话当前单词和接下来几个到期单词的音频（不能按序号遍历整个单词表）"""
+        if not (index.isascii() and index.isdigit()):
+            raise HttpError(404, "没有这个音频")
+        index = int(index)
+        async with entry.lock:
+            session = entry.session
+            allowed = session.current is not None and (
+                index == session.current_index or index in session.scheduler.peek(UPCOMING_AUDIO))
+        if not allowed:
+            raise HttpError(404, "没有这个音频")
+        path = self.words.path(index)
+        data, etag = await self.audio.get(path)
+        response_headers = {
+            "Content-Type": AUDIO_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream"),
+            "Accept-Ranges": "bytes",
+            "ETag": etag,
+            "Cache-Control": "private, max-age=86400",
+        }
+        if etag in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+            return 304, response_headers, b""
+        status, start, end = 200, 0, len(data) - 1
+        range_header = headers.get("range")
+        if range_header and headers.get("if-range", etag) == etag:
+            try:
+                byte_range = parse_range(range_header, len(data))
+            except HttpError:
+                response_headers["Content-Range"] = f"bytes */{len(data)}"
+                return 416, response_headers, b""
+            if byte_range is not None:
+                status, (start, end) = 206, byte_range
+                response_headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        response_headers["Content-Length"] = str(end - start + 1)
+        if head_only:
+            return status, response_headers, b""
+        return status, response_headers, memoryview(data)[start:end + 1]
+
+    @staticmethod
+    def json(status, obj):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        return status, {"Content-Type": "application/json; charset=utf-8"}, body
+
+    def stats(self):
+        return {
+            "sessions": len(self.sessions),
+            "words": len(self.words),
+            "answers": self.answers,
+            "uptime_s": round(time.monotonic() - self.started, 1),
+            "audio_cache": {"files": len(self.audio._items), "bytes": self.audio.size,
+                            "hits": self.audio.hits, "misses": self.audio.misses},
+        }
+
+    async def handle_connection(self, reader, writer):
+        """一个连接上可以连续处理多个请求（HTTP/1.1 keep-alive）"""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+                    return
+                try:
+                    request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                    method, target, version = request_line.split(" ")
+                    headers = {}
+                    for line in header_lines:
+                        if line:
+                            name, _, value = line.partition(":")
+                            headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length") or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self._send(writer, *self.json(400, {"error": "无法解析的请求"}), keep_alive=False)
+                    return
+                if length > MAX_BODY_BYTES:
+                    await self._send(writer, *self.json(413, {"error": "请求体太大"}), keep_alive=False)
+                    return
+                body = await reader.readexactly(length) if length else b""
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                try:
+                    status, response_headers, payload = await self.dispatch(
+                        method, urlsplit(target).path, headers, body)
+                except HttpError as e:
+                    status, response_headers, payload = self.json(e.status, {"error": str(e)})
+                except Exception as e:
+                    status, response_headers, payload = self.json(500, {"error": str(e)})
+                await self._send(writer, status, response_headers, payload, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _send(writer, status, headers, body, keep_alive=True):
+        headers = dict(headers)
+        headers.setdefault("Content-Length", str(len(body)))
+        headers["Connection"] = "keep-alive" if keep_alive else "close"
+        head = f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n" + "".join(
+            f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+        writer.write(head.encode("latin-1"))
+        if body:
+            writer.write(body)
+        await writer.drain()
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """开始监听，返回 asyncio.Server（port=0 时由系统分配端口）"""
+        self._expire_task = asyncio.ensure_future(self.expire_sessions())
+        return await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+
+    async def close(self):
+        self._expire_task.cancel()
+        for entry in list(self.sessions.values()):
+            await self.close_session(entry)
+        self.executor.shutdown(wait=True)
+
+
+async def serve(server, host, port):
+    listener = await server.start(host, port)
+    address = listener.sockets[0].getsockname()
+    print(f"练习服务器已启动：http://{address[0]}:{address[1]}（{len(server.words)} 个单词）")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    # 用法：python practice_server.py 雅思词汇真经_难词.zip --port 8765
+    #      python practice_server.py 13/gtts_mp3 14/gtts_mp3 词汇.zip --lists 13 14 --prefix ab
+    parser = argparse.ArgumentParser(description="多人拼写练习服务器（无界面，JSON 接口 + 音频）")
+    parser.add_argument("sources", nargs="+", help="单词文件夹或压缩包（可以多个，合并成一个单词表）")
+    parser.add_argument("--lists", nargs="*", default=None, help="只练这些单词表（编号，如 13 14）")
+    parser.add_argument("--prefix", default=None, help="只练以这个前缀开头的单词")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址（整个教室用时改成 0.0.0.0）")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="学习者的复习计划、作答记录保存位置")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_BYTES // (1024 * 1024), help="音频内存缓存上限（MB）")
+    parser.add_argument("--workers", type=int, default=8, help="写复习计划/作答记录的线程数")
+    parser.add_argument("--ephemeral", action="store_true", help="什么都不保存（测试用）")
+    args = parser.parse_args()
+
+    missing = [source for source in args.sources if not os.path.exists(source)]
+    if missing:
+        print(f"错误：{'、'.join(missing)} 不存在！")
+    else:
+        practice_server = PracticeServer([WordLibrary.normalize_folder(source) for source in args.sources],
+                                         args.data_dir, args.ephemeral, args.cache_mb * 1024 * 1024, args.workers,
+                                         lists=args.lists, prefix=args.prefix)
+        try:
+            asyncio.run(serve(practice_server, args.host, args.port))
+        except KeyboardInterrupt:
+            print("\n服务器已停止")
@@ -0,0 +1,202 @@
+import time
+from word_table import WordTable
+from answer_analysis import analyze_answer, describe_errors
+
+
+class PracticeSession:
+    """
+    一个学习者的一轮拼写练习，只管状态，不播放声音、不碰界面：两个界面和练习服务器共用
+    - start() 用单词列表开始一轮（或按作答记录接着练），next_word() 按复习计划出下一个单词
+    - check() 判断一次作答，更新复习计划、作答记录和错误统计，返回要显示的提示
+    - 调用方根据返回值决定播放哪个单词、显示什么
+    :param scheduler: ReviewScheduler 实例（每个学习者一个）
+    :param journal: SessionJournal 实例，None 表示不记录作答（不能恢复进度）
+    :param confusions: ConfusionIndex 实例，None 表示不统计拼写错误
+    """
+    def __init__(self, scheduler, journal=None, confusions=None, max_errors=3):
+        self.scheduler = scheduler
+        self.journal = journal
+        self.confusions = confusions
+        self.max_errors = max_errors
+        self.source = ""
+        self.filters = None
+        self.words = WordTable()
+        self.word_index = None  # 路径 → words 中的下标，合并文件夹变化时才建
+        self.current_index = 0
+        self.error_count = 0
+        self.wrong_words = []
+        self.is_completed = False
+        self.word_started_at = 0.0  # 当前单词开始的时间，用于记录作答耗时
+
+    def _record(self, event_type, **fields):
+        if self.journal is not None:
+            self.journal.record(event_type, **fields)
+
+    @property
+    def current(self):
+        """当前单词 {"word": ..., "path": ...}，练习结束或还没开始时为 None"""
+        if self.is_completed or self.current_index >= len(self.words):
+            return None
+        return self.words[self.current_index]
+
+    def progress(self):
+        """(当前是本轮第几个, 本轮到期总数)"""
+        return self.scheduler.session_done + 1, self.scheduler.session_total
+
+    def load_words(self, library, sources, filters=None):
+        """
+        从单词库取本轮的单词（WordTable）
+        :param filters: {"lists": [单词表编号, ...], "prefix": 单词前缀, "wrong_only": 只练错词本里的单词}，
+                        都可以省略；None 表示全部单词
+        """
+        filters = filters or {}
+        only = self.scheduler.lapsed_keys() if filters.get("wrong_only") else None
+        return library.load(sources, lists=filters.get("lists"), prefix=filters.get("prefix"), only=only)
+
+    def start(self, source, words, resume=None, filters=None):
+        """
+        开始一轮练习并出第一个单词；没有到期单词时直接结束（is_completed）
+        :param words: WordTable（已按字母排序），会被直接引用，不复制
+        :param resume: 作答记录里没做完的练习（SessionJournal.unfinished_session()），当前单词还在时接着练
+        :param filters: 选单词用的筛选条件（见 load_words()），记进作答记录，恢复时按同样的条件取单词；
+                        只练错词时不管到期时间，全部出题
+        :return: 要显示的提示
+        """
+        self.source = source
+        self.filters = filters
+        self.words = words
+        self.word_index = None
+        self.is_completed = False
+        self.wrong_words = []
+        self.error_count = 0
+        self.scheduler.start(words, cram=bool(filters and filters.get("wrong_only")))
+        messages = [f"✅ 已加载 {len(words)} 个单词", f"📅 本轮到期 {self.scheduler.session_total} 个单词"]
+        if resume is None or not self.restore(resume):
+            self._record("start", source=source, filters=filters)
+            self.next_word()
+        return messages
+
+    def clear(self):
+        """清空当前练习（换了一个没有单词的文件夹）"""
+        self.words = WordTable()
+        self.word_index = None
+        self.current_index = 0
+        self.error_count = 0
+        self.wrong_words = []
+        self.is_completed = False
+
+    def restore(self, state):
+        """恢复当前单词、错误次数和错词列表；当前单词已不在单词表里时返回 False"""
+        current = state["current_word"]
+        index = self.words.find(current)
+        if index is None:
+            return False
+        self.wrong_words = list(state["wrong_words"])
+        self.error_count = state["error_count"]
+        self.scheduler.resume(index)
+        self.current_index = index
+        self.word_started_at = time.monotonic()
+        return True
+
+    def next_word(self):
+        """按复习计划取下一个到期的单词；没有到期的单词时本轮结束，返回 None"""
+        index = self.scheduler.next_due()
+        if index is None:
+            self.is_completed = True
+            self._record("complete")
+            return None
+        self.current_index = index
+        self._record("present", word=self.words.word(index))
+        self.word_started_at = time.monotonic()
+        return index
+
+    def upcoming(self, count):
+        """当前单词和接下来 count 个到期单词的路径（预取用）"""
+        if self.current is None:
+            return []
+        window = [self.current_index] + self.scheduler.peek(count)
+        return [self.words.path(i) for i in window]
+
+    def check(self, answer):
+        """
+        判断一次作答，更新复习计划、作答记录和错误统计；答对或错满 max_errors 次就换下一个单词
+        :return: {"kind": "correct" / "near" / "miss", "advance": 是否换了单词, "word": 正确答案,
+                  "messages": [要显示的提示, ...]}
+        """
+        current_word = self.words.word(self.current_index)
+        analysis = analyze_answer(answer, current_word)
+        if self.confusions is not None:
+            self.confusions.record(current_word, analysis)
+        latency = round(time.monotonic() - self.word_started_at, 3)
+        messages = []
+        advance = True
+        if analysis["kind"] == "correct":
+            messages.append("✅ 拼写正确！")
+            self._record("attempt", word=current_word, input=answer, correct=True, latency=latency)
+            self.scheduler.review(self.current_index, self.error_count, self.max_errors)
+            self.error_count = 0
+        else:
+            self.error_count += 1
+            self._record("attempt", word=current_word, input=answer, correct=False, kind=analysis["kind"],
+                         latency=latency, gave_up=self.error_count >= self.max_errors)
+            if self.error_count >= self.max_errors:
+                messages.append(f"❌ 已连续{self.error_count}次错误")
+                messages.append(f"💡 正确答案: {current_word}")
+                if analysis["kind"] == "near":
+                    messages.append(f"🔍 {describe_errors(analysis)}")
+                self.wrong_words.append(current_word)
+                self.scheduler.review(self.current_index, self.error_count, self.max_errors)
+                self.error_count = 0
+            else:
+                advance = False
+                if analysis["kind"] == "near":
+                    messages.append(f"🤏 很接近了，差 {analysis['distance']} 处（第{self.error_count}次），请重新尝试")
+                else:
+                    messages.append(f"❌ 拼写错误（第{self.error_count}次），请重新尝试")
+        if advance:
+            self.next_word()
+        return {"kind": analysis["kind"], "advance": advance, "word": current_word, "messages": messages}
+
+    def summary(self):
+        """本轮结束时的总结：最终答错的单词、最常犯的错误"""
+        messages = ["🎉 所有单词练习完成！"]
+        if self.wrong_words:
+            messages.append("\n📝 最终答错的单词：")
+            messages += [f"  {i}. {word}" for i, word in enumerate(self.wrong_words, 1)]
+            messages.append(f"\n总共答错 {len(self.wrong_words)} 个单词")
+        else:
+            messages.append("🎊 太棒了！所有单词都答对了！")
+        confusions = self.confusions.top_confusions(3) if self.confusions is not None else []
+        if confusions:
+            messages.append("📊 最常犯的错误：" + "，".join(f"{expected or '∅'}→{typed or '∅'} ×{count}"
+                                                      for expected, typed, kind, count in confusions))
+        return messages
+
+    def merge_changes(self, changes):
+        """
+        把文件夹里新下载/删除的音频合并进这一轮（FolderWatcher.drain() 的结果）
+        按条件筛选的一轮（见 load_words()）只恢复本来就在的单词，不加入新下载的
+        :return: 要显示的提示
+        """
+        if self.word_index is None:
+            self.word_index = self.words.paths()
+        added = []
+        for item in changes["added"]:
+            index = self.word_index.get(item["path"])
+            if index is None:
+                if self.filters:
+                    continue
+                index = self.words.append(item["word"], item["path"])
+                self.word_index[item["path"]] = index
+            added.append(index)
+        removed = [self.word_index[path] for path in changes["removed"] if path in self.word_index]
+        self.scheduler.remove(removed)
+        due = self.scheduler.add(added)
+        messages = []
+        if added:
+            messages.append(f"📥 文件夹新增 {len(added)} 个单词（本轮到期 {due} 个）")
+        if removed:
+            messages.append(f"🗑️ 文件夹删除了 {len(removed)} 个单词，已移出本轮练习")
+        if self.is_completed and due:
+            messages.append("💡 点击“再来一次”练习新增的单词")
+        return messages
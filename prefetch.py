@@ -0,0 +1,60 @@
+import threading
+from collections import deque
+
+DEFAULT_DEPTH = 3  # 预取接下来几个单词
+
+
+class Prefetcher:
+    """
+    后台预取器：用户输入时提前加载接下来几个单词的音频，播放时不再读盘
+    - loader(path) 负责实际加载（读文件 / 解码），在后台线程执行
+    - schedule() 传入新的预取窗口：窗口外的排队任务和结果直接丢弃，
+      重新开始、换文件夹时调用 cancel() 即可
+    """
+    def __init__(self, loader, depth=DEFAULT_DEPTH):
+        self.loader = loader
+        self.depth = depth
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._wanted = set()
+        self._results = {}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def schedule(self, paths):
+        """按顺序（越靠前越优先）预取 paths，替换之前的窗口"""
+        with self._cond:
+            self._wanted = set(paths)
+            self._results = {p: data for p, data in self._results.items() if p in self._wanted}
+            self._pending = deque(p for p in paths if p not in self._results)
+            self._cond.notify()
+
+    def cancel(self):
+        self.schedule([])
+
+    def get(self, path):
+        """已预取好返回数据，否则返回 None（调用方自己加载）"""
+        with self._cond:
+            return self._results.get(path)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                path = self._pending.popleft()
+            try:
+                data = self.loader(path)
+            except Exception:
+                continue  # 预取失败不报错，播放时会按正常流程再加载一次
+            with self._cond:
+                if path in self._wanted:
+                    self._results[path] = data
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
@@ -2,6 +2,36 @@ import subprocess
 import sys
 import shutil
 import os
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from lazy_startup import STARTUP_PROBE_ENV
+
+# 按界面类型排除用不到的模块，减小体积、加快解包和启动
+PROFILES = {
+    "tk": {
+        "collect_all": ["pygame", "win32gui"],
+        "hidden_imports": ["pygame.mixer", "win32gui"],
+        "excludes": [
+            "tkinter.test", "tkinter.tix", "pygame.tests", "win32com.client",
+            "PySide6", "shiboken6", "av", "pyaudio", "numpy",
+            "gtts", "selenium", "requests", "urllib3",
+        ],
+    },
+    "qt": {
+        "collect_all": [],
+        "hidden_imports": ["av", "pyaudio"],
+        "excludes": [
+            "tkinter", "pygame", "gtts", "selenium", "requests", "urllib3",
+            "PySide6.QtNetwork", "PySide6.QtQml", "PySide6.QtQuick", "PySide6.QtPdf",
+            "PySide6.QtWebEngineCore", "PySide6.QtWebEngineWidgets", "PySide6.QtMultimedia",
+            "PySide6.Qt3DCore", "PySide6.QtCharts", "PySide6.QtDataVisualization", "PySide6.QtSql",
+        ],
+    },
+}
+
 
 def clean_old_files(target_script):
     """清理旧的打包文件，避免残留配置干扰"""
@@ -9,9 +39,9 @@ def clean_old_files(target_script):
     clean_items = [
         "dist",          # 旧的输出目录
         "build",         # 旧的临时构建目录
-        f"{target_script}.spec"  # 旧的打包配置文件
+        f"{os.path.splitext(target_script)[0]}.spec"  # 旧的打包配置文件
     ]
-    
+
     for item in clean_items:
         if os.path.exists(item):
             if os.path.isdir(item):
@@ -21,38 +51,47 @@ def clean_old_files(target_script):
                 os.remove(item)
                 print(f"已删除旧文件: {item}")
 
-def package_application():
-    """完整的应用打包逻辑，针对单词拼写练习应用优化"""
-    # 1. 配置核心参数（主程序文件名）
-    target_script = "exam_choose_dir.py"  # 确保与你的主程序文件名一致
+def built_exe_path(target_script, onedir):
+    """打包结果的可执行文件路径"""
+    name = os.path.splitext(os.path.basename(target_script))[0]
+    exe_name = name + (".exe" if os.name == "nt" else "")
+    if onedir:
+        return os.path.join("dist", name, exe_name)
+    return os.path.join("dist", exe_name)
+
+def build_command(target_script, onedir=False, profile="tk"):
+    """组装 pyinstaller 命令"""
+    settings = PROFILES[profile]
     command = [
         "pyinstaller",
-        "--onefile",                # 打包成单个exe
+        "--onedir" if onedir else "--onefile",  # onedir 不用每次启动都解包，启动更快
         "--noconsole",              # 隐藏控制台窗口
         "--strip",                  # 减小exe体积
         "--clean",                  # 清理临时文件
-        # 收集音频相关依赖
-        "--collect-all", "pygame",
-        # 收集Windows标题栏自定义依赖
-        "--collect-all", "win32gui",
-        # 排除无用模块，减小体积
-        "--exclude-module", "tkinter.test",
-        "--exclude-module", "tkinter.tix",
-        "--exclude-module", "pygame.tests",
-        "--exclude-module", "win32com.client",
-        # 隐藏导入确保兼容性
-        "--hidden-import", "pygame.mixer",
-        "--hidden-import", "win32gui",
-        # 主程序入口
-        target_script
     ]
-    
+    # 收集音频相关依赖
+    for package in settings["collect_all"]:
+        command += ["--collect-all", package]
+    # 排除无用模块，减小体积
+    for module in settings["excludes"]:
+        command += ["--exclude-module", module]
+    # 隐藏导入确保兼容性（音频模块是延迟导入的）
+    for module in settings["hidden_imports"]:
+        command += ["--hidden-import", module]
+    # 主程序入口
+    command.append(target_script)
+    return command
+
+def package_application(target_script, onedir=False, profile="tk"):
+    """完整的应用打包逻辑，针对单词拼写练习应用优化"""
+    command = build_command(target_script, onedir, profile)
+
     try:
         # 2. 先清理旧文件
         clean_old_files(target_script)
-        
+
         # 3. 执行打包命令
-        print(f"开始打包 {target_script}...")
+        print(f"开始打包 {target_script}（{'onedir' if onedir else 'onefile'}，{profile} 配置）...")
         result = subprocess.run(
             command,
             check=True,
@@ -61,17 +100,17 @@ def package_application():
             text=True,
             encoding="utf-8"
         )
-        
+
         # 4. 打包成功后的提示
         print("="*50)
         print("打包完成！✅")
-        print(f"生成的exe路径：dist/{target_script.replace('.py', '.exe')}")
+        print(f"生成的exe路径：{built_exe_path(target_script, onedir)}")
         print("提示：若运行闪退，可删除--noconsole参数重新打包查看错误")
         print("="*50)
         print("打包日志：")
         print(result.stdout)
         return True
-        
+
     except subprocess.CalledProcessError as e:
         print(f"打包失败！错误代码: {e.returncode}")
         print("错误详情：")
@@ -84,7 +123,73 @@ def package_application():
         print(f"未知错误：{str(e)}")
         return False
 
+def measure_startup(command, runs=5, timeout=120):
+    """
+    连续启动程序 runs 次，程序界面显示出来后写入时间戳并自动退出
+    :return: 每次从启动进程到界面显示的耗时（秒），失败的次数不计入
+    """
+    times = []
+    for run in range(runs):
+        probe_fd, probe_path = tempfile.mkstemp(suffix=".probe")
+        os.close(probe_fd)
+        os.remove(probe_path)
+        env = dict(os.environ, **{STARTUP_PROBE_ENV: probe_path})
+        start = time.time()
+        try:
+            subprocess.run(command, env=env, timeout=timeout, check=False)
+        except subprocess.TimeoutExpired:
+            print(f"第{run+1}次启动超时（{timeout}秒）")
+        if os.path.exists(probe_path):
+            with open(probe_path, "r", encoding="utf-8") as f:
+                times.append(float(f.read()) - start)
+            os.remove(probe_path)
+        else:
+            print(f"第{run+1}次启动没有显示界面，跳过")
+    return times
+
+def startup_report(target_script, onedir, runs, report_path="startup_report.json"):
+    """对比打包后的exe和直接运行脚本的启动时间，结果写入 report_path"""
+    targets = {
+        "exe": [built_exe_path(target_script, onedir)],
+        "script": [sys.executable, target_script],
+    }
+    report = {"script": target_script, "mode": "onedir" if onedir else "onefile", "runs": runs, "results": {}}
+    print("="*50)
+    print("启动时间报告（第一次接近冷启动，其余为热启动）：")
+    for name, command in targets.items():
+        if not os.path.exists(command[-1]):
+            print(f"  {name}: 未找到 {command[-1]}，跳过")
+            continue
+        times = measure_startup(command, runs)
+        if not times:
+            continue
+        result = {
+            "first": round(times[0], 3),
+            "median": round(statistics.median(times), 3),
+            "min": round(min(times), 3),
+            "max": round(max(times), 3),
+            "all": [round(t, 3) for t in times],
+        }
+        report["results"][name] = result
+        print(f"  {name}: 首次 {result['first']}s，中位数 {result['median']}s，最快 {result['min']}s，最慢 {result['max']}s")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"报告已保存：{report_path}")
+    print("="*50)
+
 if __name__ == "__main__":
-    success = package_application()
+    parser = argparse.ArgumentParser(description="打包单词拼写练习程序")
+    parser.add_argument("--script", default="exam_dir_small_exe.py", help="主程序文件（exam_dir_small_exe.py 或 exam_dir_bigger）")
+    parser.add_argument("--onedir", action="store_true", help="打包成文件夹（不用每次启动解包，启动更快）")
+    parser.add_argument("--profile", choices=sorted(PROFILES), help="模块排除配置，默认按主程序自动选择")
+    parser.add_argument("--report", type=int, default=0, metavar="N", help="打包后启动 N 次，统计启动时间")
+    parser.add_argument("--no-build", action="store_true", help="不打包，只对已有的exe做启动时间报告")
+    args = parser.parse_args()
+
+    profile = args.profile or ("qt" if "bigger" in args.script else "tk")
+    success = True
+    if not args.no_build:
+        success = package_application(args.script, args.onedir, profile)
+    if success and args.report > 0:
+        startup_report(args.script, args.onedir, args.report)
     sys.exit(0 if success else 1)
-    
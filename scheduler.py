@@ -0,0 +1,252 @@
+import os
+import time
+import heapq
+import bisect
+import sqlite3
+import threading
+from array import array
+from word_table import WordTable
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".word_for_spelling_review.db")
+DAY = 86400
+RELEARN_DELAY = 10 * 60  # 答错的单词 10 分钟后重新到期
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+
+def word_key(word):
+    """不同单词表里的同一个单词共用一份复习记录"""
+    return word.lower()
+
+
+def quality_from_errors(error_count, max_errors=3):
+    """把拼写错误次数换算成 SM-2 评分：一次答对 5 分，最终没答对 1 分"""
+    if error_count >= max_errors:
+        return 1
+    return max(3, 5 - error_count)
+
+
+class ReviewScheduler:
+    """
+    SM-2 间隔重复调度：每个单词持久保存 难度系数、间隔、到期时间、遗忘次数
+    - start() 用本次练习中练过的单词建小顶堆（按到期时间，再按字母顺序），O(n)
+    - 从没练过的单词视为立即到期，按字母顺序出现：只记下标（array，4字节），不进堆、不建状态，
+      出题时才建，几百万个单词的单词库也占不了多少内存
+    - next_due() / review() 都是 O(log n)，过期的堆元素惰性丢弃
+    - add() / remove() 在练习中途加入或移出单词（文件夹里新下载/删除的音频），下标保持不变
+    """
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS cards (
+                word_key TEXT PRIMARY KEY,
+                ease REAL NOT NULL,
+                interval REAL NOT NULL,
+                due REAL NOT NULL,
+                reps INTEGER NOT NULL,
+                lapses INTEGER NOT NULL
+            )
+        """)
+        self.words = WordTable()
+        self.states = {}
+        self.removed = set()
+        self._current = None
+        self._heap = []
+        self._fresh = array("I")  # start() 时从没练过的单词的下标（升序），出题时才放进 states
+        self._fresh_pos = 0
+        self.session_total = 0
+        self.session_done = 0
+        self.session_started = 0.0
+
+    def start(self, words, now=None, max_new=None, cram=False):
+        """
+        开始一轮练习
+        :param words: WordTable（已按字母排序）
+        :param max_new: 本轮最多引入的新单词数，None 表示不限
+        :param cram: 突击练习（如只练错词）：不管到期时间，所有单词本轮都出题，作答后照常更新复习计划
+        """
+        now = time.time() if now is None else now
+        self.words = words
+        self.states = {}
+        self.removed = set()
+        self._current = None
+        with self._lock:
+            stored = {row[0]: list(row[1:]) for row in self.conn.execute(
+                "SELECT word_key, ease, interval, due, reps, lapses FROM cards")}
+        heap = []
+        fresh = array("I")
+        for index, word in enumerate(words.words):
+            state = stored.get(word_key(word)) if stored else None
+            if state is None:
+                if max_new is None or len(fresh) < max_new:
+                    fresh.append(index)
+                continue
+            if cram:
+                state[2] = 0.0  # 只改内存里的到期时间，作答时 review() 会重新计算并写回
+            self.states[index] = state
+            heap.append((state[2], index))
+        heapq.heapify(heap)
+        self._heap = heap
+        self._fresh = fresh
+        self._fresh_pos = 0
+        self.session_total = len(fresh) + sum(1 for due, _ in heap if due <= now)
+        self.session_done = 0
+        self.session_started = now
+
+    def _is_fresh(self, index):
+        """start() 时的新单词，还没出过题（也没有被移出后重新加入）"""
+        if index in self.states:
+            return False
+        position = bisect.bisect_left(self._fresh, index)
+        return position < len(self._fresh) and self._fresh[position] == index
+
+    def add(self, indices, now=None):
+        """
+        练习中途加入单词（调用前已追加到 words 末尾），传入它们的下标
+        已移出又重新出现的单词恢复原来的进度；新单词立即到期，排在已有的新单词后面
+        :return: 其中已经到期的单词数
+        """
+        now = time.time() if now is None else now
+        fresh = [index for index in indices if index not in self.states and not self._is_fresh(index)]
+        stored = {}
+        if fresh:
+            keys = list(dict.fromkeys(word_key(self.words.word(index)) for index in fresh))
+            with self._lock:
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    stored.update((row[0], list(row[1:])) for row in self.conn.execute(
+                        "SELECT word_key, ease, interval, due, reps, lapses FROM cards WHERE word_key IN "
+                        f"({','.join('?' * len(chunk))})", chunk))
+        due_count = 0
+        for index in indices:
+            if (index in self.states or self._is_fresh(index)) and index not in self.removed:
+                continue
+            self.removed.discard(index)
+            state = self.states.get(index)
+            if state is None:
+                state = stored.get(word_key(self.words.word(index))) or [DEFAULT_EASE, 0.0, 0.0, 0, 0]
+                self.states[index] = state
+            heapq.heappush(self._heap, (state[2], index))
+            if state[2] <= now:
+                due_count += 1
+        self.session_total += due_count
+        return due_count
+
+    def remove(self, indices, now=None):
+        """练习中途移出单词（音频被删除），堆里的元素惰性丢弃；正在作答的单词仍可 review()"""
+        now = time.time() if now is None else now
+        for index in indices:
+            if index in self.removed:
+                continue
+            if index in self.states:
+                due = self.states[index][2]
+            elif self._is_fresh(index):
+                due = 0.0
+            else:
+                continue
+            self.removed.add(index)
+            if due <= now and index != self._current:
+                self.session_total -= 1  # 到期但还没练到的不再计入本轮
+
+    def _valid(self, entry):
+        due, index = entry
+        return index not in self.removed and self.states[index][2] == due
+
+    def _next_fresh(self):
+        """下一个还没出过题的新单词的下标，没有时返回 None（跳过已移出、已重新加入的）"""
+        while self._fresh_pos < len(self._fresh):
+            index = self._fresh[self._fresh_pos]
+            if index not in self.removed and index not in self.states:
+                return index
+            self._fresh_pos += 1
+        return None
+
+    def resume(self, index):
+        """
+        恢复进度：把作答记录里的当前单词设为正在作答（不经过 next_due()），之后可以直接 review()
+        还没出过题的新单词这时才建状态；堆里原来的元素在 review() 改了到期时间后惰性丢弃
+        """
+        if index not in self.states:
+            self.states[index] = [DEFAULT_EASE, 0.0, 0.0, 0, 0]  # _next_fresh() 会跳过它
+        self._current = index
+
+    def next_due(self, now=None):
+        """取出下一个到期单词的下标，没有到期的单词时返回 None"""
+        now = time.time() if now is None else now
+        while self._heap and not self._valid(self._heap[0]):
+            heapq.heappop(self._heap)
+        index = self._next_fresh()
+        if index is not None and (not self._heap or (0.0, index) < self._heap[0]):
+            self._fresh_pos += 1
+            self.states[index] = [DEFAULT_EASE, 0.0, 0.0, 0, 0]
+            self._current = index
+            return index
+        if not self._heap or self._heap[0][0] > now:
+            return None
+        due, index = heapq.heappop(self._heap)
+        self._current = index
+        if due > self.session_started:
+            self.session_total += 1  # 本轮中答错后重新到期的单词
+        return index
+
+    def peek(self, count, now=None):
+        """查看接下来 count 个到期单词（不取出），用于预取"""
+        now = time.time() if now is None else now
+        taken = []
+        while self._heap and len(taken) < count:
+            entry = heapq.heappop(self._heap)
+            if not self._valid(entry):
+                continue
+            taken.append(entry)
+            if entry[0] > now:
+                break
+        for entry in taken:
+            heapq.heappush(self._heap, entry)
+        position = self._fresh_pos
+        fresh = []
+        while position < len(self._fresh) and len(fresh) < count:
+            index = self._fresh[position]
+            if index not in self.removed and index not in self.states:
+                fresh.append((0.0, index))
+            position += 1
+        return [index for due, index in sorted(taken + fresh)[:count] if due <= now]
+
+    def lapsed_keys(self):
+        """遗忘过（最终没答对过）的单词，即错词本：{word_key, ...}，给 WordLibrary.load(only=...) 用"""
+        with self._lock:
+            return {key for (key,) in self.conn.execute("SELECT word_key FROM cards WHERE lapses > 0")}
+
+    def review(self, index, error_count, max_errors=3, now=None):
+        """记录一次作答结果，更新复习计划并立即写回"""
+        now = time.time() if now is None else now
+        quality = quality_from_errors(error_count, max_errors)
+        state = self.states[index]
+        ease, interval, due, reps, lapses = state
+        if quality >= 3:
+            if reps == 0:
+                interval = 1.0
+            elif reps == 1:
+                interval = 6.0
+            else:
+                interval = round(interval * ease, 2)
+            reps += 1
+            due = now + interval * DAY
+        else:
+            reps = 0
+            interval = 0.0
+            lapses += 1
+            due = now + RELEARN_DELAY
+        ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        state[:] = [ease, interval, due, reps, lapses]
+        heapq.heappush(self._heap, (due, index))
+        self.session_done += 1
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO cards (word_key, ease, interval, due, reps, lapses) VALUES (?, ?, ?, ?, ?, ?)",
+                    (word_key(self.words.word(index)), ease, interval, due, reps, lapses))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".word_for_spelling_sessions")
+
+
+def empty_state():
+    return {
+        "last_seq": 0,
+        "source": "",
+        "filters": None,  # 开始练习时选单词的筛选条件（PracticeSession.load_words），恢复时照用
+        "current_word": None,
+        "error_count": 0,
+        "wrong_words": [],
+        "completed": True,
+        "stats": {},  # 单词 → [作答次数, 答对次数]，跨所有练习累计
+    }
+
+
+def apply_event(state, event):
+    """把一条事件合并进状态（回放日志和实时记录用同一套逻辑）"""
+    kind = event["type"]
+    if kind == "start":
+        state["source"] = event["source"]
+        state["filters"] = event.get("filters")
+        state["current_word"] = None
+        state["error_count"] = 0
+        state["wrong_words"] = []
+        state["completed"] = False
+    elif kind == "present":
+        state["current_word"] = event["word"]
+        state["error_count"] = 0
+    elif kind == "attempt":
+        stats = state["stats"].setdefault(event["word"], [0, 0])
+        stats[0] += 1
+        if event["correct"]:
+            stats[1] += 1
+            state["error_count"] = 0
+        else:
+            state["error_count"] += 1
+            if event.get("gave_up"):
+                state["wrong_words"].append(event["word"])
+                state["error_count"] = 0
+    elif kind == "complete":
+        state["completed"] = True
+    state["last_seq"] = event["seq"]
+
+
+class SessionJournal:
+    """
+    练习记录：每次作答追加一行 JSON 到 journal.jsonl，程序崩溃也能恢复进度
+    - 每条都立即写给操作系统（程序崩溃不丢），每 fsync_every 条或每 fsync_interval 秒
+      才 fsync 一次（断电最多丢最后一小批）
+    - 日志超过 compact_every 条时，把状态压缩成 snapshot.json 并清空日志，
+      启动时只需读快照 + 少量日志
+    - 每条事件带递增序号，快照记录已包含的最后序号，压缩中途崩溃也不会重复计算
+    """
+    def __init__(self, root=DEFAULT_DIR, fsync_every=20, fsync_interval=2.0, compact_every=5000):
+        self.root = root
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.journal_path = os.path.join(root, "journal.jsonl")
+        self.snapshot_path = os.path.join(root, "snapshot.json")
+        os.makedirs(root, exist_ok=True)
+        self.state = self._load()
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        if self._journal_events > self.compact_every:
+            self.compact()
+
+    def _load(self):
+        state = empty_state()
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = empty_state()
+        self._journal_events = 0
+        if os.path.exists(self.journal_path):
+            good_size = 0
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        break  # 崩溃时写了一半的最后一行
+                    if not line.endswith(b"\n"):
+                        break
+                    good_size += len(line)
+                    self._journal_events += 1
+                    if event["seq"] > state["last_seq"]:
+                        apply_event(state, event)
+            # 截掉残缺的尾巴，之后追加的事件才能被正常读出
+            if good_size != os.path.getsize(self.journal_path):
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(good_size)
+        return state
+
+    def record(self, event_type, **fields):
+        event = {"seq": self.state["last_seq"] + 1, "type": event_type, "t": round(time.time(), 3)}
+        event.update(fields)
+        apply_event(self.state, event)
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._pending += 1
+        self._journal_events += 1
+        if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.flush()
+        if self._journal_events > self.compact_every:
+            self.compact()
+
+    def flush(self):
+        """fsync 已写入的事件"""
+        if self._pending:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def compact(self):
+        """把当前状态写成快照（原子替换），然后清空日志"""
+        self.flush()
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._file.close()
+        self._file = open(self.journal_path, "w", encoding="utf-8")
+        self._journal_events = 0
+
+    def unfinished_session(self):
+        """上次没做完的练习状态，没有则返回 None"""
+        if self.state["completed"] or not self.state["source"]:
+            return None
+        return self.state
+
+    def close(self):
+        self.flush()
+        self._file.close()
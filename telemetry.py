@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import bisect
+import argparse
+import threading
+
+DEFAULT_EXPORT_PATH = os.path.join(os.path.expanduser("~"), ".word_for_spelling_latency.json")
+OVERLAY_ENV = "SPELLING_LATENCY_OVERLAY"  # 设为 1 时启动就显示延迟浮层（F12 随时切换）
+OVERLAY_INTERVAL_MS = 1000
+ANSWER_TO_AUDIO = "answer_to_audio"  # 按回车 → 下一个声音开始输出
+TRACE_TIMEOUT = 10.0  # 超过这个时间还没出声的追踪直接丢弃（秒）
+# 直方图分桶：10µs ~ 60s 按 10% 递增，百分位误差不超过 10%
+BUCKET_BOUNDS = []
+_bound = 1e-5
+while _bound < 60:
+    BUCKET_BOUNDS.append(_bound)
+    _bound *= 1.1
+# 界面浮层按这个顺序显示（只显示有数据的）
+OVERLAY_STAGES = (
+    (ANSWER_TO_AUDIO, "答题→出声"),
+    ("ui.check", "判断+记录"),
+    ("audio.stop", "停止"),
+    ("audio.load", "加载"),
+    ("audio.mixer_load", "mixer.load"),
+    ("audio.play", "play()"),
+    ("audio.first_buffer", "首个缓冲"),
+)
+
+
+class LatencyHistogram:
+    """
+    固定对数分桶的耗时直方图：记录一次只是二分查找 + 计数加一，内存固定（约 140 个桶）
+    百分位取所在桶的上界（不超过实际最大值）
+    """
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        rank = max(1, int(self.count * p / 100 + 0.999999))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                bound = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        """{"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}"""
+        def ms(seconds):
+            return round(seconds * 1000, 3) if seconds is not None else None
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.total / self.count if self.count else None),
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+            "max_ms": ms(self.max if self.count else None),
+        }
+
+
+class Span:
+    """with telemetry.span("audio.stop"): ... 记录这段代码的耗时"""
+    __slots__ = ("telemetry", "name", "started")
+
+    def __init__(self, telemetry, name):
+        self.telemetry = telemetry
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.telemetry.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Telemetry:
+    """
+    答题 → 出声 热路径的耗时统计，开销很小，一直开着
+    - span(name) / record(name, 秒) 记录一个阶段的耗时，按阶段名各一个直方图
+    - begin(name) 开始一个跨线程的追踪（按回车时），播放后端真正出声时调用 end_pending() 结束
+    - 任何线程都可以记录（输出流回调线程也会调用），共用一把锁，锁内只做计数
+    - snapshot() 给界面浮层显示，export() 退出时写进 JSON 文件
+    """
+    def __init__(self):
+        self.histograms = {}
+        self.started = time.time()
+        self._pending = {}  # 追踪名 → 开始时间
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        return Span(self, name)
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._record(name, seconds)
+
+    def _record(self, name, seconds):
+        """调用方已持有 _lock"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def begin(self, name):
+        with self._lock:
+            self._pending[name] = time.perf_counter()
+
+    def cancel(self, name):
+        with self._lock:
+            self._pending.pop(name, None)
+
+    def end_pending(self):
+        """声音开始输出时调用：结束所有等待出声的追踪"""
+        if not self._pending:  # 输出流回调里每个缓冲都会调用，没有追踪时不拿锁
+            return
+        now = time.perf_counter()
+        with self._lock:
+            for name, started in self._pending.items():
+                if now - started < TRACE_TIMEOUT:
+                    self._record(name, now - started)
+            self._pending.clear()
+
+    def snapshot(self):
+        """{阶段名: LatencyHistogram.summary()}"""
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def describe(self):
+        """浮层显示的一行文字：各阶段的 p50 / p95 / p99（毫秒）"""
+        snapshot = self.snapshot()
+        parts = []
+        for name, label in OVERLAY_STAGES:
+            stats = snapshot.get(name)
+            if stats:
+                parts.append(f"{label} {stats['p50_ms']:.1f}/{stats['p95_ms']:.1f}/{stats['p99_ms']:.1f}")
+        if not parts:
+            return "⏱ 还没有数据"
+        return "⏱ p50/p95/p99 ms  " + "  ".join(parts)
+
+    def export(self, path=DEFAULT_EXPORT_PATH, **info):
+        """把统计结果写进 JSON 文件（先写临时文件再原子替换），info 是附加信息（如播放后端）"""
+        data = {
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "exported": time.strftime("%Y-%m-%d %H:%M:%S"),
+            **info,
+            "stages": self.snapshot(),
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+def overlay_enabled():
+    return os.environ.get(OVERLAY_ENV, "") not in ("", "0")
+
+
+if __name__ == "__main__":
+    # 查看练习程序退出时导出的耗时统计：python telemetry.py [文件]
+    parser = argparse.ArgumentParser(description="查看答题到出声各阶段的耗时统计")
+    parser.add_argument("path", nargs="?", default=DEFAULT_EXPORT_PATH)
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        print(f"错误：{args.path} 不存在（练习程序退出时才会写入）")
+        sys.exit(1)
+    with open(args.path, "r", encoding="utf-8") as f:
+        exported = json.load(f)
+    print(f"{exported['started']} ~ {exported['exported']}" +
+          (f"，播放后端 {exported['backend']}" if exported.get("backend") else ""))
+    print(f"{'阶段':<24}{'次数':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'最大':>10}  (ms)")
+    for name, stats in exported["stages"].items():
+        print(f"{name:<24}{stats['count']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+              f"{stats['max_ms']:>10}")
@@ -0,0 +1,32 @@
+from answer_analysis import analyze_answer, describe_errors
+
+
+def test_correct_ignores_case_and_spaces():
+    assert analyze_answer(" Apple ", "apple") == {"kind": "correct", "distance": 0, "errors": []}
+
+
+def test_near_miss_error_kinds():
+    cases = {
+        ("recieve", "receive"): ("transposition", 3, "ei", "ie"),
+        ("acommodate", "accommodate"): ("undoubled", 1, "c", ""),
+        ("begginning", "beginning"): ("doubled", 2, "", "g"),
+        ("banan", "banana"): ("omission", 5, "a", ""),
+        ("bananas", "banana"): ("insertion", 6, "", "s"),
+        ("bonana", "banana"): ("substitution", 1, "a", "o"),
+    }
+    for (typed, word), error in cases.items():
+        analysis = analyze_answer(typed, word)
+        assert analysis["kind"] == "near" and analysis["distance"] == 1, typed
+        assert analysis["errors"] == [error], typed
+
+
+def test_too_many_errors_is_a_miss():
+    # 6个字母最多错 2 处（1/4）
+    assert analyze_answer("bnnaa", "banana")["kind"] == "near"
+    assert analyze_answer("xyz", "banana") == {"kind": "miss", "distance": None, "errors": []}
+    assert analyze_answer("", "cat")["kind"] == "miss"
+
+
+def test_describe_errors():
+    assert describe_errors(analyze_answer("acommodate", "accommodate")) == "第2个字母 c 应该双写"
+    assert describe_errors(analyze_answer("recieve", "receive")) == "第4-5个字母 ei 写成了 ie（顺序颠倒）"
@@ -0,0 +1,26 @@
+import os
+import zipfile
+import pytest
+
+pytest.importorskip("av")
+from audio_verify import verify_audio
+
+SAMPLE_ZIP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "雅思词汇真经_难词.zip")
+SAMPLE_MEMBER = "18/gtts_mp3/camouflage.mp3"  # gTTS 下载的，没有 Xing/Info 头
+
+
+def sample_mp3():
+    with zipfile.ZipFile(SAMPLE_ZIP) as archive:
+        return archive.read(SAMPLE_MEMBER)
+
+
+def test_complete_file_is_ok():
+    assert verify_audio(sample_mp3())[1] == "ok"
+
+
+@pytest.mark.parametrize("ratio", [0.66, 0.33, 0.1])
+def test_truncated_file_is_broken(ratio):
+    data = sample_mp3()
+    duration, status, problem = verify_audio(data[:int(len(data) * ratio)])
+    assert status == "broken"
+    assert "截断" in problem
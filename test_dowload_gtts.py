@@ -0,0 +1,13 @@
+import time
+import pytest
+from dowload_gtts import TokenBucket
+
+
+def test_token_bucket_limits_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+    limiter = TokenBucket(rate=20)
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - started >= 4 / 20 * 0.9   # 第一个令牌立即可用，之后每 1/20 秒一个
@@ -0,0 +1,45 @@
+from job_queue import JobQueue, RETRY_BASE_DELAY
+
+NOW = 1_000_000.0
+JOBS = [(1, "apple", "/x/apple.mp3"), (2, "banana", "/x/banana.mp3"), (3, "cherry", "/x/cherry.mp3")]
+
+
+def test_claim_in_order_and_expired_lease_is_reclaimed():
+    queue = JobQueue(":memory:", "test", lease=60)
+    assert queue.add(JOBS) == 3
+    assert queue.claim(2, now=NOW) == JOBS[:2]
+    queue.complete("/x/apple.mp3", now=NOW)
+    assert queue.claim(5, now=NOW + 1) == JOBS[2:]          # banana 还在租期内
+    assert queue.claim(5, now=NOW + 61) == [JOBS[1]]        # 领取 banana 的进程被杀了，超时后重新领取
+    assert queue.paths() == ["/x/apple.mp3"]
+    queue.close()
+
+
+def test_failures_back_off_then_give_up():
+    queue = JobQueue(":memory:", "test", max_attempts=2)
+    queue.add(JOBS[:1])
+    queue.claim(1, now=NOW)
+    assert queue.fail("/x/apple.mp3", "timeout", now=NOW) == "pending"
+    assert queue.claim(1, now=NOW + 1) == []                # 还在退避
+    assert queue.next_wait(now=NOW + 1) == RETRY_BASE_DELAY - 1
+    assert queue.claim(1, now=NOW + RETRY_BASE_DELAY) == JOBS[:1]
+    assert queue.fail("/x/apple.mp3", "timeout again", now=NOW + RETRY_BASE_DELAY) == "failed"
+    assert queue.next_wait() is None
+    assert queue.failures() == [("apple", 2, "timeout again")]
+    assert queue.retry_failed() == 1
+    assert queue.claim(1, now=NOW + RETRY_BASE_DELAY) == JOBS[:1]
+    queue.close()
+
+
+def test_release_and_readd():
+    queue = JobQueue(":memory:", "test")
+    queue.add(JOBS)
+    queue.claim(3, now=NOW)
+    queue.release()                                          # Ctrl+C：领取的任务放回队列
+    assert queue.progress(now=NOW)["pending"] == 3
+    queue.complete("/x/apple.mp3", now=NOW)
+    queue.skip(["/x/banana.mp3", "/x/missing.mp3"])          # 这次规划时已经有文件
+    assert queue.progress(now=NOW)["done"] == 2
+    assert queue.add(JOBS[:1]) == 2                          # 完成后文件又被删了，重新排队
+    assert [job[1] for job in queue.claim(5, now=NOW)] == ["apple", "cherry"]
+    queue.close()
@@ -0,0 +1,41 @@
+import os
+from word_library import WordLibrary
+from scheduler import ReviewScheduler
+from session_journal import SessionJournal
+from practice_session import PracticeSession
+
+SAMPLE_ZIP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "雅思词汇真经_难词.zip")
+
+
+def open_session(tmp_path):
+    journal = SessionJournal(str(tmp_path / "journal"))
+    return PracticeSession(ReviewScheduler(str(tmp_path / "review.db")), journal)
+
+
+def test_resume_then_answer(tmp_path):
+    library = WordLibrary(":memory:")
+    library.scan(SAMPLE_ZIP)
+    session = open_session(tmp_path)
+    session.start(SAMPLE_ZIP, library.load(SAMPLE_ZIP))
+    for _ in range(3):
+        session.check(session.current["word"])
+    expected = session.current["word"]
+    session.journal.close()
+    session.scheduler.close()
+
+    session = open_session(tmp_path)
+    state = session.journal.unfinished_session()
+    session.start(state["source"], library.load(SAMPLE_ZIP), resume=state)
+    assert session.current["word"] == expected
+    result = session.check(expected)
+    assert result["kind"] == "correct" and result["advance"]
+    assert session.current["word"] != expected
+    # 恢复的单词答过之后不会再作为新单词出现
+    seen = set()
+    while session.current is not None and len(seen) < 20:
+        seen.add(session.current["word"])
+        session.check(session.current["word"])
+    assert expected not in seen
+    session.journal.close()
+    session.scheduler.close()
+    library.close()
@@ -0,0 +1,58 @@
+from word_table import WordTable
+from scheduler import ReviewScheduler, DAY, RELEARN_DELAY
+
+NOW = 1_000_000.0
+
+
+def make_words(*words):
+    table = WordTable()
+    for word in words:
+        table.append(word, f"/data/13/gtts_mp3/{word}.mp3", in_order=True)
+    return table
+
+
+def test_new_words_come_in_order_and_answers_reschedule(tmp_path):
+    scheduler = ReviewScheduler(str(tmp_path / "review.db"))
+    scheduler.start(make_words("apple", "banana", "cherry"), now=NOW)
+    assert scheduler.session_total == 3
+    assert scheduler.next_due(now=NOW) == 0
+    scheduler.review(0, 0, now=NOW)              # 一次答对：1天后到期
+    assert scheduler.states[0][2] == NOW + DAY
+    assert scheduler.next_due(now=NOW) == 1
+    scheduler.review(1, 3, now=NOW)              # 最终没答对：10分钟后重新到期，记一次遗忘
+    assert scheduler.states[1][2] == NOW + RELEARN_DELAY
+    assert scheduler.states[1][4] == 1
+    assert scheduler.next_due(now=NOW) == 2
+    scheduler.review(2, 0, now=NOW)
+    assert scheduler.next_due(now=NOW) is None
+    assert scheduler.next_due(now=NOW + RELEARN_DELAY) == 1
+    assert scheduler.lapsed_keys() == {"banana"}
+    scheduler.close()
+
+    # 复习记录写回了数据库，重新开始时只有到期的单词出题
+    scheduler = ReviewScheduler(str(tmp_path / "review.db"))
+    scheduler.start(make_words("apple", "banana", "cherry"), now=NOW + RELEARN_DELAY)
+    assert scheduler.session_total == 1
+    assert scheduler.next_due(now=NOW + RELEARN_DELAY) == 1
+    assert scheduler.next_due(now=NOW + RELEARN_DELAY) is None
+    scheduler.close()
+
+
+def test_resume_fresh_word_then_review(tmp_path):
+    scheduler = ReviewScheduler(str(tmp_path / "review.db"))
+    scheduler.start(make_words("apple", "banana", "cherry"), now=NOW)
+    scheduler.resume(1)                          # 作答记录里正在练 banana（还没建状态）
+    scheduler.review(1, 0, now=NOW)
+    assert [scheduler.next_due(now=NOW), scheduler.next_due(now=NOW), scheduler.next_due(now=NOW)] == [0, 2, None]
+    scheduler.close()
+
+
+def test_removed_words_are_skipped_and_restored(tmp_path):
+    scheduler = ReviewScheduler(str(tmp_path / "review.db"))
+    scheduler.start(make_words("apple", "banana", "cherry"), now=NOW)
+    scheduler.remove([0], now=NOW)
+    assert scheduler.session_total == 2
+    assert scheduler.peek(5, now=NOW) == [1, 2]
+    assert scheduler.add([0], now=NOW) == 1
+    assert [scheduler.next_due(now=NOW) for _ in range(4)] == [0, 1, 2, None]
+    scheduler.close()
@@ -0,0 +1,37 @@
+import os
+from word_library import WordLibrary
+
+SAMPLE_ZIP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "雅思词汇真经_难词.zip")
+
+
+def make_list(root, list_id, words):
+    folder = root / list_id / "gtts_mp3"
+    folder.mkdir(parents=True)
+    for word in words:
+        (folder / f"{word}.mp3").write_bytes(b"\xff\xfb" + bytes(100))
+    return str(folder)
+
+
+def test_union_of_overlapping_lists_has_each_word_once(tmp_path):
+    first = make_list(tmp_path, "13", ["apple", "arena", "cherry"])
+    second = make_list(tmp_path, "14", ["Arena", "banana", "cherry"])
+    library = WordLibrary(":memory:")
+    for folder in (first, second):
+        library.scan(folder)
+    table = library.load([first, second])
+    assert table.words == ["apple", "arena", "banana", "cherry"]
+    # 重复的单词取排在前面的来源里的
+    assert table.path(table.find("cherry")) == os.path.join(first, "cherry.mp3")
+    reversed_table = library.load([second, first])
+    assert reversed_table.path(reversed_table.find("cherry")) == os.path.join(second, "cherry.mp3")
+    assert library.load([first, second], lists=["14"]).words == ["Arena", "banana", "cherry"]
+    library.close()
+
+
+def test_sample_zip_words_are_unique():
+    library = WordLibrary(":memory:")
+    library.scan(SAMPLE_ZIP)
+    keys = [word.lower() for word in library.load(SAMPLE_ZIP).words]
+    assert "arena" in keys
+    assert len(keys) == len(set(keys))
+    library.close()
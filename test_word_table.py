@@ -0,0 +1,17 @@
+import pytest
+from word_table import WordTable
+
+
+def test_paths_share_templates_and_find_is_case_sensitive():
+    table = WordTable()
+    for word in ("Apple", "apple", "banana"):
+        table.append(word, f"/data/13/gtts_mp3/{word}.mp3", in_order=True)
+    odd = table.append("cherry", "/data/14/gtts_mp3/Cherry.mp3")   # 练习中途加入，文件名和单词对不上
+    assert len(table.templates) == 1
+    assert table.path(1) == "/data/13/gtts_mp3/apple.mp3"
+    assert table.path(odd) == "/data/14/gtts_mp3/Cherry.mp3"
+    assert (table.find("Apple"), table.find("apple"), table.find("cherry"), table.find("durian")) == (0, 1, 3, None)
+    assert table[-1] == {"word": "cherry", "path": "/data/14/gtts_mp3/Cherry.mp3"}
+    assert [item["word"] for item in table[1:3]] == ["apple", "banana"]
+    with pytest.raises(IndexError):
+        table.path(4)
@@ -0,0 +1,333 @@
+import os
+import sqlite3
+import threading
+import zip_source
+from word_table import WordTable
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".word_for_spelling_library.db")
+AUDIO_EXTENSIONS = (".mp3",)
+UPSERT_WORD_SQL = """
+    INSERT INTO words (path, folder, list_id, word, sort_key, size, mtime_ns, duration)
+    VALUES (?, ?, ?, ?, ?, ?, ?, NULL)
+    ON CONFLICT(path) DO UPDATE SET
+        size = excluded.size, mtime_ns = excluded.mtime_ns, duration = NULL, checksum = NULL, status = NULL,
+        problem = NULL
+"""
+SOURCE_FILTER = "(folder = ? OR folder IN (SELECT path FROM folders WHERE parent = ?))"
+
+
+def list_id_for(folder):
+    """单词表编号：NN/gtts_mp3 这种结构取 NN，否则取文件夹名"""
+    name = os.path.basename(folder)
+    if name.lower() in ("gtts_mp3", "tts_mp3"):
+        return os.path.basename(os.path.dirname(folder)) or name
+    return name
+
+
+class WordLibrary:
+    """
+    持久化的单词库索引（SQLite）：单词 → 路径、大小、修改时间、时长、所属单词表
+    - scan() 先比较文件夹的修改时间，没变就直接返回（增删文件都会改变文件夹修改时间）
+    - 变了才列目录，只更新新增/变化/删除的条目
+    - load() 直接从索引按字母顺序取出单词，不再 glob + 排序；可以合并多个来源并按单词表、前缀、错词筛选
+    - 来源可以是文件夹、压缩包，或放着压缩包的文件夹；压缩包成员的路径格式见 zip_source
+    - scan_changes() / update_files() 返回新增和删除的单词，练习中途可以直接合并（见 folder_watch）
+    - 校验结果（时长、sha1、status）也记在索引里，文件变了自动清空，见 audio_verify
+    """
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS folders (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                parent TEXT
+            );
+            CREATE TABLE IF NOT EXISTS words (
+                path TEXT PRIMARY KEY,
+                folder TEXT NOT NULL,
+                list_id TEXT NOT NULL,
+                word TEXT NOT NULL,
+                sort_key TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                duration REAL,
+                checksum TEXT,
+                status TEXT,
+                problem TEXT
+            );
+            CREATE INDEX IF NOT EXISTS words_by_folder ON words (folder, sort_key);
+        """)
+        # 旧版本的索引没有 parent 列（记录压缩包所在的文件夹）
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(folders)")]
+        if "parent" not in columns:
+            self.conn.execute("ALTER TABLE folders ADD COLUMN parent TEXT")
+        # 旧版本的索引没有校验结果：status 为 NULL 表示还没校验（或文件变了），"ok" / "broken" / "silent"
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(words)")]
+        for column in ("checksum", "status", "problem"):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE words ADD COLUMN {column} TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS folders_by_parent ON folders (parent)")
+
+    @staticmethod
+    def normalize_folder(folder):
+        return os.path.normpath(os.path.abspath(folder))
+
+    def scan(self, source):
+        """
+        增量扫描文件夹或压缩包，更新索引；文件夹里的压缩包一并扫描
+        :return: 索引是否有变化
+        """
+        return self.scan_changes(source)["changed"]
+
+    def scan_changes(self, source):
+        """
+        同 scan()，同时返回具体变化，正在进行的练习据此合并新增/删除的单词
+        :return: {"changed": 索引是否有变化, "added": [{"word": ..., "path": ...}, ...], "removed": [路径, ...]}
+                 内容变化（同名文件重新下载）的不算新增
+        """
+        source = self.normalize_folder(source)
+        changes = {"changed": False, "added": [], "removed": []}
+        with self._lock:
+            if zip_source.is_zip_source(source):
+                changes["changed"] = self._scan_zip(source, None, changes)
+                return changes
+            changed = self._scan_folder(source, changes)
+            child_zips = [path for (path,) in self.conn.execute(
+                "SELECT path FROM folders WHERE parent = ?", (source,))]
+            for zip_path in child_zips:
+                changed = self._scan_zip(zip_path, source, changes) or changed
+            changes["changed"] = changed
+        return changes
+
+    def update_files(self, folder, names, folder_mtime):
+        """
+        只更新文件夹里指定文件名的条目，不列目录（文件监视器收到具体文件的事件时用）
+        :param folder_mtime: 处理这批事件之前取的文件夹修改时间，记入索引，之后 scan() 不必重新列目录
+        :return: 同 scan_changes()
+        """
+        folder = self.normalize_folder(folder)
+        changes = {"changed": False, "added": [], "removed": []}
+        list_id = list_id_for(folder)
+        upserts = []
+        removed = []
+        with self._lock:
+            if self.conn.execute("SELECT 1 FROM folders WHERE path = ?", (folder,)).fetchone() is None:
+                return self.scan_changes(folder)  # 还没扫描过的文件夹
+            for name in dict.fromkeys(names):
+                path = os.path.join(folder, name)
+                lower = name.lower()
+                if lower.endswith(".zip"):
+                    if os.path.isfile(path):
+                        self._scan_zip(path, folder, changes)
+                    else:
+                        with self.conn:
+                            self._remove_zip(path, changes)
+                    continue
+                if not lower.endswith(AUDIO_EXTENSIONS):
+                    continue
+                row = self.conn.execute("SELECT size, mtime_ns FROM words WHERE path = ?", (path,)).fetchone()
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    stat = None
+                if stat is None or not os.path.isfile(path):
+                    if row is not None:
+                        removed.append((path,))
+                        changes["removed"].append(path)
+                    continue
+                if row is not None and tuple(row) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                word = os.path.splitext(name)[0]
+                upserts.append((path, folder, list_id, word, word.lower(), stat.st_size, stat.st_mtime_ns))
+                if row is None:
+                    changes["added"].append({"word": word, "path": path})
+            with self.conn:
+                self.conn.executemany(UPSERT_WORD_SQL, upserts)
+                self.conn.executemany("DELETE FROM words WHERE path = ?", removed)
+                self.conn.execute("INSERT OR REPLACE INTO folders (path, mtime_ns, parent) VALUES (?, ?, NULL)",
+                                  (folder, folder_mtime))
+        changes["changed"] = bool(upserts or removed or changes["added"] or changes["removed"])
+        return changes
+
+    def _scan_folder(self, folder, changes):
+        folder_mtime = os.stat(folder).st_mtime_ns
+        row = self.conn.execute("SELECT mtime_ns FROM folders WHERE path = ?", (folder,)).fetchone()
+        if row is not None and row[0] == folder_mtime:
+            return False
+
+        known = {path: (size, mtime) for path, size, mtime in self.conn.execute(
+            "SELECT path, size, mtime_ns FROM words WHERE folder = ?", (folder,))}
+        known_zips = {path for (path,) in self.conn.execute(
+            "SELECT path FROM folders WHERE parent = ?", (folder,))}
+        list_id = list_id_for(folder)
+        upserts = []
+        seen = set()
+        zips = set()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                name = entry.name.lower()
+                if name.endswith(".zip") and entry.is_file():
+                    zips.add(entry.path)
+                    continue
+                if not name.endswith(AUDIO_EXTENSIONS) or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                seen.add(entry.path)
+                old = known.get(entry.path)
+                if old == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                word = os.path.splitext(entry.name)[0]
+                upserts.append((entry.path, folder, list_id, word, word.lower(), stat.st_size, stat.st_mtime_ns))
+                if old is None:
+                    changes["added"].append({"word": word, "path": entry.path})
+        removed = [(path,) for path in known if path not in seen]
+        changes["removed"].extend(path for (path,) in removed)
+
+        with self.conn:
+            self.conn.executemany(UPSERT_WORD_SQL, upserts)
+            self.conn.executemany("DELETE FROM words WHERE path = ?", removed)
+            # 被删掉的压缩包整包移出索引；新出现的压缩包先登记（mtime 记 -1），随后由 scan() 扫描
+            for zip_path in known_zips - zips:
+                self._remove_zip(zip_path, changes)
+            self.conn.executemany("INSERT OR REPLACE INTO folders (path, mtime_ns, parent) VALUES (?, -1, ?)",
+                                  [(zip_path, folder) for zip_path in zips - known_zips])
+            self.conn.execute("INSERT OR REPLACE INTO folders (path, mtime_ns, parent) VALUES (?, ?, NULL)",
+                              (folder, folder_mtime))
+        return bool(upserts or removed or zips != known_zips)
+
+    def _remove_zip(self, zip_path, changes):
+        changes["removed"].extend(path for (path,) in self.conn.execute(
+            "SELECT path FROM words WHERE folder = ?", (zip_path,)))
+        self.conn.execute("DELETE FROM words WHERE folder = ?", (zip_path,))
+        self.conn.execute("DELETE FROM folders WHERE path = ?", (zip_path,))
+
+    def _scan_zip(self, zip_path, parent, changes):
+        zip_mtime = os.stat(zip_path).st_mtime_ns
+        row = self.conn.execute("SELECT mtime_ns FROM folders WHERE path = ?", (zip_path,)).fetchone()
+        if row is not None and row[0] == zip_mtime:
+            return False
+
+        # 压缩包整体替换：中央目录只读一次，成员全部重新登记
+        archive = zip_source.get_archive(zip_path)
+        default_list_id = os.path.splitext(os.path.basename(zip_path))[0]
+        known = {path for (path,) in self.conn.execute("SELECT path FROM words WHERE folder = ?", (zip_path,))}
+        rows = []
+        for member in archive.audio_members(AUDIO_EXTENSIONS):
+            member_dir = os.path.dirname(member)
+            word = os.path.splitext(os.path.basename(member))[0]
+            path = zip_source.make_member_path(zip_path, member)
+            rows.append((path, zip_path, list_id_for(member_dir) if member_dir else default_list_id,
+                         word, word.lower(), archive.members[member].file_size, zip_mtime))
+            if path not in known:
+                changes["added"].append({"word": word, "path": path})
+        current = {row[0] for row in rows}
+        changes["removed"].extend(path for path in known if path not in current)
+        with self.conn:
+            self.conn.execute("DELETE FROM words WHERE folder = ?", (zip_path,))
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO words (path, folder, list_id, word, sort_key, size, mtime_ns, duration)
+                VALUES (?, ?, ?, ?, ?, ?, ?, NULL)
+            """, rows)
+            self.conn.execute("INSERT OR REPLACE INTO folders (path, mtime_ns, parent) VALUES (?, ?, ?)",
+                              (zip_path, zip_mtime, parent))
+        return True
+
+    def load(self, sources, lists=None, prefix=None, only=None):
+        """
+        按字母顺序返回来源中的单词（WordTable）；来源可以是一个或多个文件夹/压缩包，文件夹含里面的压缩包
+        校验过、确定损坏或没有声音的文件不返回（播放只会出错），重新下载后自动回来
+        - 所有来源一条查询取出，由 SQLite 排序；同一个文件夹被多个来源包含时只取一次
+        - 同一个单词（不区分大小写）出现在多个单词表/文件夹里时只取一次，取排在前面的来源里的
+        :param lists: 只要这些单词表编号（list_id）的单词
+        :param prefix: 只要以这个前缀开头的单词（不区分大小写）
+        :param only: 只要这些单词（小写，如 ReviewScheduler.lapsed_keys() 的错词）
+        """
+        if isinstance(sources, str):
+            sources = [sources]
+        conditions = ["(w.status IS NULL OR w.status = 'ok')"]
+        params = []
+        if lists:
+            conditions.append(f"w.list_id IN ({', '.join('?' * len(lists))})")
+            params.extend(lists)
+        if prefix:
+            # sort_key 的前缀范围，可以用上索引
+            conditions.append("w.sort_key >= ? AND w.sort_key < ?")
+            params.extend((prefix.lower(), prefix.lower() + "\U0010ffff"))
+        table = WordTable()
+        with self._lock:
+            folders = []
+            for source in sources:
+                source = self.normalize_folder(source)
+                folders.append(source)
+                folders.extend(path for (path,) in self.conn.execute(
+                    "SELECT path FROM folders WHERE parent = ? ORDER BY path", (source,)))
+            # 同一文件夹的路径几乎都是 前缀 + 单词 + 扩展名：先用文件夹里的一个文件确定模板，
+            # 符合模板的行只取单词和模板编号（省掉大部分数据和拆路径的开销），不符合的才取出完整路径
+            templates = []
+            for folder in dict.fromkeys(folders):
+                sample = self.conn.execute("SELECT word, path FROM words WHERE folder = ? LIMIT 1", (folder,)).fetchone()
+                template = table.template_for(*sample) if sample else None
+                if template is not None:
+                    templates.append((folder, len(templates), template, *table.templates[template]))
+            if not templates:
+                return table
+            rows = self.conn.execute(f"""
+                WITH templates (folder, position, id, prefix, suffix) AS (VALUES {', '.join(['(?, ?, ?, ?, ?)'] * len(templates))})
+                SELECT w.word, t.id, CASE WHEN w.path = t.prefix || w.word || t.suffix THEN NULL ELSE w.path END
+                FROM words w JOIN templates t ON w.folder = t.folder
+                WHERE {' AND '.join(conditions)} ORDER BY w.sort_key, t.position
+            """, [value for template in templates for value in template] + params)
+            table.extend_sorted(((word, None if path else template, path) for word, template, path in rows), only)
+        return table
+
+    def unverified(self, source):
+        """来源里还没校验过（或校验后文件变了）的文件：[(路径, 大小, 修改时间), ...]"""
+        source = self.normalize_folder(source)
+        with self._lock:
+            return self.conn.execute(f"""
+                SELECT path, size, mtime_ns FROM words WHERE {SOURCE_FILTER} AND status IS NULL ORDER BY path
+            """, (source, source)).fetchall()
+
+    def record_verification(self, results):
+        """
+        写入校验结果：[(路径, 大小, 修改时间, 时长, sha1, status, 问题描述), ...]
+        只更新大小和修改时间还和校验时一样的条目（校验过程中文件被重新下载的，下次再校验）
+        """
+        with self._lock, self.conn:
+            self.conn.executemany("""
+                UPDATE words SET duration = ?, checksum = ?, status = ?, problem = ?
+                WHERE path = ? AND size = ? AND mtime_ns = ?
+            """, [(duration, checksum, status, problem, path, size, mtime)
+                  for path, size, mtime, duration, checksum, status, problem in results])
+
+    def reset_verification(self, source):
+        """清空来源里的校验结果，下次全部重新校验"""
+        source = self.normalize_folder(source)
+        with self._lock, self.conn:
+            self.conn.execute(f"""
+                UPDATE words SET duration = NULL, checksum = NULL, status = NULL, problem = NULL WHERE {SOURCE_FILTER}
+            """, (source, source))
+
+    def problems(self, source):
+        """来源里损坏或没有声音的文件：[(单词, 路径, status, 问题描述), ...]"""
+        source = self.normalize_folder(source)
+        with self._lock:
+            return self.conn.execute(f"""
+                SELECT word, path, status, problem FROM words
+                WHERE {SOURCE_FILTER} AND status IN ('broken', 'silent') ORDER BY sort_key
+            """, (source, source)).fetchall()
+
+    def verification_summary(self, source):
+        """{status: 文件数}，还没校验的记在 "unverified" 下"""
+        source = self.normalize_folder(source)
+        with self._lock:
+            rows = self.conn.execute(f"""
+                SELECT COALESCE(status, 'unverified'), COUNT(*) FROM words WHERE {SOURCE_FILTER} GROUP BY status
+            """, (source, source)).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
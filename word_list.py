@@ -0,0 +1,133 @@
+import os
+import argparse
+import zip_source
+from audio_cache import normalize_word
+
+# Windows 文件名里不能出现的字符：斜杠换成 -，其余直接去掉
+FILENAME_TABLE = str.maketrans({"/": "-", "\\": "-", "?": None, "*": None, ":": None,
+                                "\"": None, "<": None, ">": None, "|": None})
+
+
+def safe_filename(word, ext=".mp3"):
+    return word.translate(FILENAME_TABLE) + ext
+
+
+def normalize_entry(line):
+    """单词表的一行：去掉首尾空白、合并连续空白（词组中间只留一个空格）"""
+    return " ".join(line.split())
+
+
+def missing_sources(sources):
+    """不存在的单词表（压缩包内的写成 xxx.zip::18/18.txt）"""
+    return [path for path in sources if not zip_source.audio_exists(path)]
+
+
+def iter_lines(source):
+    """
+    逐行读取单词表：普通文本文件、压缩包内的单个文件，
+    或整个压缩包（按文件名顺序读取里面所有 .txt）
+    """
+    member = zip_source.split_member_path(source)
+    if member is not None:
+        yield from bytes(zip_source.read_audio(source)).decode("utf-8-sig").splitlines()
+    elif zip_source.is_zip_source(source):
+        archive = zip_source.get_archive(source)
+        for name in sorted(name for name in archive.members if name.lower().endswith(".txt")):
+            yield from bytes(archive.read(name)).decode("utf-8-sig").splitlines()
+    else:
+        with open(source, "r", encoding="utf-8-sig") as f:
+            yield from f
+
+
+def build_plan(sources, save_dir, min_size=1):
+    """
+    一次遍历所有单词表，生成下载计划（时间和内存都与总行数成线性）
+    - 规范化每一行，跨所有单词表去重（大小写、空白不同的算同一个单词，保留第一次出现的写法）
+    - 不同单词处理成文件名后相同（如 a/b 和 a-b，或 Windows 下只差大小写）时只保留第一个
+    - 保存目录只列一次，已有且不小于 min_size 字节的文件不再下载
+    :return: {
+        "words": [(单词, 保存路径), ...]   去重后的全部单词（按出现顺序）
+        "jobs": [(序号, 单词, 保存路径), ...]   需要下载的，序号对应 words 中的位置（从1开始）
+        "invalid": [保存路径, ...]   已存在但小于 min_size，需要删掉重新下载
+        "existing": 已有有效文件的数量
+        "lines": 读到的非空行数, "duplicates": 完全重复的行数, "case_variants": 只差大小写/空白的行数,
+        "collisions": [(单词, 已保留的单词, 文件名), ...]
+    }
+    """
+    on_disk = {}
+    if os.path.isdir(save_dir):
+        with os.scandir(save_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    on_disk[entry.name.casefold()] = (entry.name, entry.stat().st_size)
+
+    plan = {"words": [], "jobs": [], "invalid": [], "existing": 0,
+            "lines": 0, "duplicates": 0, "case_variants": 0, "collisions": []}
+    seen = {}       # 规范化单词 → 保留的写法
+    filenames = {}  # 文件名（忽略大小写）→ 保留的单词
+    for source in sources:
+        for line in iter_lines(source):
+            word = normalize_entry(line)
+            if not word:
+                continue
+            plan["lines"] += 1
+            key = normalize_word(word)
+            kept = seen.get(key)
+            if kept is not None:
+                plan["duplicates" if kept == word else "case_variants"] += 1
+                continue
+            seen[key] = word
+
+            filename = safe_filename(word)
+            other = filenames.get(filename.casefold())
+            if other is not None:
+                plan["collisions"].append((word, other, filename))
+                continue
+            filenames[filename.casefold()] = word
+
+            existing = on_disk.get(filename.casefold())
+            save_path = os.path.join(save_dir, existing[0] if existing else filename)
+            plan["words"].append((word, save_path))
+            if existing is not None and existing[1] >= min_size:
+                plan["existing"] += 1
+                continue
+            if existing is not None:
+                plan["invalid"].append(save_path)
+            plan["jobs"].append((len(plan["words"]), word, save_path))
+    return plan
+
+
+def describe_plan(plan):
+    """下载计划的摘要（多行文本）"""
+    lines = [f"共读取 {plan['lines']} 行，去重后 {len(plan['words'])} 个单词/词组"
+             f"（完全重复 {plan['duplicates']}，大小写/空白不同 {plan['case_variants']}）",
+             f"已存在 {plan['existing']} 个，需要下载 {len(plan['jobs'])} 个"
+             + (f"（其中 {len(plan['invalid'])} 个是无效文件，将重新下载）" if plan["invalid"] else "")]
+    if plan["collisions"]:
+        lines.append(f"注意：{len(plan['collisions'])} 个单词处理成文件名后与其他单词重名，已跳过：")
+        for word, other, filename in plan["collisions"][:20]:
+            lines.append(f"  {word} 与 {other} → {filename}")
+        if len(plan["collisions"]) > 20:
+            lines.append(f"  ……共 {len(plan['collisions'])} 个")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # 用法：python word_list.py words.txt 雅思词汇真经_难词.zip --save-dir gtts_mp3 --output todo.txt
+    parser = argparse.ArgumentParser(description="检查单词表：去重、检查文件名冲突、列出还没下载的单词")
+    parser.add_argument("sources", nargs="+", help="单词表：文本文件、压缩包，或 xxx.zip::18/18.txt")
+    parser.add_argument("--save-dir", default="gtts_mp3", help="MP3保存目录")
+    parser.add_argument("--min-size", type=int, default=100, help="小于这个字节数的已有文件视为无效")
+    parser.add_argument("--output", help="把需要下载的单词写进这个文件（一行一个），可直接交给下载脚本")
+    args = parser.parse_args()
+
+    missing = missing_sources(args.sources)
+    if missing:
+        print(f"错误：单词文件 {missing[0]} 不存在！")
+    else:
+        plan = build_plan(args.sources, args.save_dir, args.min_size)
+        print(describe_plan(plan))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.writelines(f"{word}\n" for _, word, _ in plan["jobs"])
+            print(f"需要下载的单词已写入：{args.output}")
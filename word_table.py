@@ -0,0 +1,133 @@
+import os
+from array import array
+
+
+class WordTable:
+    """
+    紧凑的单词表（几百万个单词也只占很少内存）：按下标取单词和路径
+    - 路径拆成 前缀 + 单词 + 扩展名，前缀和扩展名去重后只存一份，每个单词只记一个编号（array，4字节）
+    - 不给每个单词建 dict，也不保存完整路径；path(i) 用到时再拼
+    - WordLibrary.load() 按 sort_key（小写）顺序加入，find() 在这段有序区间里二分查找；
+      练习中途 append() 的单词排在后面，顺序查找
+    - table[i] 返回 {"word": ..., "path": ...}（界面、下载脚本等只取一个单词的地方沿用原来的写法），
+      table[a:b] 返回这样的 dict 列表；和列表一样支持负数下标
+    """
+    def __init__(self):
+        self.words = []               # 单词（文件名去掉扩展名）
+        self.templates = []           # (前缀, 扩展名)，如 ("/data/13/gtts_mp3/", ".mp3")
+        self.template_of = array("I")  # 每个单词用的 templates 编号
+        self.sorted_count = 0         # 前多少个单词按 sort_key 有序
+        self._template_ids = {}
+        self._odd_paths = {}          # 文件名和单词对不上的（不会出现，保险起见）：下标 → 完整路径
+        self._last = -1               # 上一个单词的模板编号，同一文件夹连续加入时不用再拆路径
+
+    def __len__(self):
+        return len(self.words)
+
+    def _position(self, index):
+        """负数下标换成正数，越界时抛 IndexError（_odd_paths 按正数下标记录）"""
+        if index < 0:
+            index += len(self.words)
+        if not 0 <= index < len(self.words):
+            raise IndexError("WordTable index out of range")
+        return index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.words)))]
+        index = self._position(index)
+        return {"word": self.words[index], "path": self.path(index)}
+
+    def word(self, index):
+        return self.words[index]
+
+    def path(self, index):
+        index = self._position(index)
+        if self._odd_paths and index in self._odd_paths:
+            return self._odd_paths[index]
+        prefix, suffix = self.templates[self.template_of[index]]
+        return prefix + self.words[index] + suffix
+
+    def template_for(self, word, path):
+        """路径拆成 前缀 + 单词 + 扩展名，返回（去重后的）模板编号；文件名和单词对不上时返回 None"""
+        if self._last >= 0:
+            prefix, suffix = self.templates[self._last]
+            if (len(path) == len(prefix) + len(word) + len(suffix) and path.startswith(prefix)
+                    and path.endswith(suffix) and path[len(prefix):len(prefix) + len(word)] == word):
+                return self._last
+        suffix = os.path.splitext(path)[1]
+        stem_end = len(path) - len(suffix)
+        if path[stem_end - len(word):stem_end] != word:
+            return None
+        key = (path[:stem_end - len(word)], suffix)
+        template = self._template_ids.get(key)
+        if template is None:
+            template = self._template_ids[key] = len(self.templates)
+            self.templates.append(key)
+        self._last = template
+        return template
+
+    def append(self, word, path=None, template=None, in_order=False):
+        """
+        加入一个单词，返回它的下标
+        :param template: 已知的模板编号（WordLibrary.load 按文件夹先算好），给了就不用传 path
+        :param in_order: 按 sort_key 顺序加入（WordLibrary.load 用），加入后仍可二分查找
+        """
+        index = len(self.words)
+        if template is None:
+            template = self.template_for(word, path)
+            if template is None:
+                self._odd_paths[index] = path
+                template = 0  # path() 先查 _odd_paths，不会用到这个编号
+        self.words.append(word)
+        self.template_of.append(template)
+        if in_order and self.sorted_count == index:
+            self.sorted_count += 1
+        return index
+
+    def extend_sorted(self, rows, only=None):
+        """
+        按 sort_key 顺序批量加入（WordLibrary.load 用），小写相同的单词只留第一个
+        :param rows: [(单词, 模板编号, None), ...]，路径不符合模板的行是 (单词, None, 完整路径)
+        :param only: 只加入这些单词（小写），None 表示全部
+        """
+        words_append = self.words.append
+        template_append = self.template_of.append
+        in_order = self.sorted_count == len(self.words)
+        last_key = self.words[-1].lower() if self.words else None
+        for word, template, path in rows:
+            key = word.lower()
+            if key == last_key or (only is not None and key not in only):
+                continue
+            last_key = key
+            if template is None:
+                self.append(word, path)
+            else:
+                words_append(word)
+                template_append(template)
+        if in_order:
+            self.sorted_count = len(self.words)
+
+    def find(self, word):
+        """单词（区分大小写）的下标，没有时返回 None"""
+        key = word.lower()
+        low, high = 0, self.sorted_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.words[middle].lower() < key:
+                low = middle + 1
+            else:
+                high = middle
+        for index in range(low, self.sorted_count):
+            if self.words[index].lower() != key:
+                break
+            if self.words[index] == word:
+                return index
+        for index in range(self.sorted_count, len(self.words)):
+            if self.words[index] == word:
+                return index
+        return None
+
+    def paths(self):
+        """路径 → 下标（合并文件夹变化时用，按需建）"""
+        return {self.path(index): index for index in range(len(self.words))}
@@ -0,0 +1,114 @@
+import os
+import io
+import mmap
+import struct
+import zipfile
+import threading
+
+MEMBER_SEPARATOR = "::"  # 压缩包内文件的路径写成 "xxx.zip::18/gtts_mp3/rifle.mp3"
+
+
+def is_zip_source(path):
+    return path.lower().endswith(".zip") and os.path.isfile(path)
+
+
+def make_member_path(zip_path, member):
+    return f"{zip_path}{MEMBER_SEPARATOR}{member}"
+
+
+def split_member_path(path):
+    """压缩包内的路径返回 (压缩包路径, 成员名)，普通文件返回 None"""
+    zip_path, sep, member = path.partition(MEMBER_SEPARATOR)
+    if not sep or not zip_path.lower().endswith(".zip"):
+        return None
+    return zip_path, member
+
+
+class ZipArchive:
+    """
+    打开一次压缩包，只读一次中央目录
+    - 未压缩（stored）的成员直接从内存映射里切片，不复制
+    - 压缩过的成员按需解压
+    """
+    def __init__(self, zip_path):
+        self.zip_path = zip_path
+        self.mtime_ns = os.stat(zip_path).st_mtime_ns
+        self._file = open(zip_path, "rb")
+        self.zip = zipfile.ZipFile(self._file)
+        self.members = {info.filename: info for info in self.zip.infolist() if not info.is_dir()}
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(zip_path) else None
+        self._lock = threading.Lock()
+
+    def _stored_slice(self, info):
+        # 本地文件头 30 字节 + 文件名 + 扩展字段之后就是数据
+        header = self._map[info.header_offset:info.header_offset + 30]
+        name_len, extra_len = struct.unpack("<HH", header[26:30])
+        start = info.header_offset + 30 + name_len + extra_len
+        return memoryview(self._map)[start:start + info.file_size]
+
+    def read(self, member):
+        """返回成员内容（bytes 或 memoryview）"""
+        info = self.members[member]
+        if info.compress_type == zipfile.ZIP_STORED and self._map is not None and not info.flag_bits & 0x1:
+            return self._stored_slice(info)
+        with self._lock:
+            return self.zip.read(info)
+
+    def audio_members(self, extensions=(".mp3",)):
+        return [name for name in self.members if name.lower().endswith(extensions)]
+
+    def close(self):
+        self.zip.close()
+        self._file.close()
+        # 可能还有 memoryview 在用，内存映射交给垃圾回收关闭
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive(zip_path):
+    """取得（并缓存）已打开的压缩包；压缩包被替换后自动重新打开"""
+    with _archives_lock:
+        archive = _archives.get(zip_path)
+        if archive is None or archive.mtime_ns != os.stat(zip_path).st_mtime_ns:
+            archive = ZipArchive(zip_path)
+            _archives[zip_path] = archive
+        return archive
+
+
+def audio_exists(path):
+    member_path = split_member_path(path)
+    if member_path is None:
+        return os.path.exists(path)
+    zip_path, member = member_path
+    return os.path.exists(zip_path) and member in get_archive(zip_path).members
+
+
+def read_audio(path):
+    """读取音频内容：普通文件读盘，压缩包成员从已打开的压缩包里取"""
+    member_path = split_member_path(path)
+    if member_path is None:
+        with open(path, "rb") as f:
+            return f.read()
+    zip_path, member = member_path
+    return get_archive(zip_path).read(member)
+
+
+def open_audio(path):
+    """返回可读、可 seek 的二进制文件对象，供解码器直接读取"""
+    member_path = split_member_path(path)
+    if member_path is None:
+        return open(path, "rb")
+    return io.BytesIO(read_audio(path))
+
+
+def stat_key(path):
+    """缓存用的版本标识：(路径, 修改时间, 大小)，压缩包成员用压缩包的修改时间"""
+    member_path = split_member_path(path)
+    if member_path is None:
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    zip_path, member = member_path
+    archive = get_archive(zip_path)
+    return (os.path.abspath(zip_path), member, archive.mtime_ns, archive.members[member].file_size)